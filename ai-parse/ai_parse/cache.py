@@ -0,0 +1,111 @@
+import hashlib
+import json
+import sqlite3
+
+
+def cache_key(model: str, request: str) -> str:
+    return hashlib.sha256(f"{model}\0{request}".encode()).hexdigest()
+
+
+class ResponseCache:
+    """Persistent LLM response cache, keyed by a hash of (model, rendered prompt).
+
+    Stores the raw completion and the post-processed dict. Because the key is
+    the prompt actually sent, changing the prompt template only misses for
+    the contexts whose rendered prompt changed. Holds at most `max_entries`
+    responses, evicting the least recently used once there are more.
+
+    Hits only bump `last_used` in memory; the bumps are written in one
+    statement with the next set(), every `flush_every` hits, and on close().
+    """
+
+    def __init__(self, file: str, max_entries: int = 10000, flush_every: int = 256):
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(file)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    raw TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    last_used INTEGER NOT NULL
+                )
+                """
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_used)")
+        row = self.conn.execute("SELECT COALESCE(MAX(last_used), 0), COUNT(*) FROM responses").fetchone()
+        self._clock, self._count = row
+        # key -> last_used of hits not yet written
+        self._used: dict[str, int] = {}
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def get(self, model: str, request: str) -> dict | None:
+        key = cache_key(model, request)
+        row = self.conn.execute("SELECT result FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used[key] = self._tick()
+        if len(self._used) >= self.flush_every:
+            with self.conn:
+                self._write_used()
+        return json.loads(row[0])
+
+    def _write_used(self):
+        if self._used:
+            self.conn.executemany(
+                "UPDATE responses SET last_used = ? WHERE key = ?",
+                [(last_used, key) for key, last_used in self._used.items()],
+            )
+            self._used.clear()
+
+    def set(self, model: str, request: str, raw: str, result: dict):
+        key = cache_key(model, request)
+        exists = self.conn.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone()
+        self._used.pop(key, None)
+        with self.conn:
+            self._write_used()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, raw, result, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, model, raw, json.dumps(result), self._tick()),
+            )
+            if not exists:
+                self._count += 1
+            if self._count > self.max_entries:
+                # Evict the least recently used entries beyond the limit, walking the index
+                self.conn.execute(
+                    """
+                    DELETE FROM responses WHERE key IN (
+                        SELECT key FROM responses ORDER BY last_used LIMIT ?
+                    )
+                    """,
+                    (self._count - self.max_entries,),
+                )
+                self._count = self.max_entries
+
+    def __len__(self) -> int:
+        return self._count
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self),
+        }
+
+    def close(self):
+        with self.conn:
+            self._write_used()
+        self.conn.close()
@@ -0,0 +1,31 @@
+import hashlib
+from collections.abc import Iterable, Iterator
+
+
+def context_key(context: str) -> str:
+    # Stable across reordering, insertions and unrelated edits elsewhere in the file
+    return hashlib.sha256(context.encode()).hexdigest()[:16]
+
+
+def iter_chunks(file: str) -> Iterator[str]:
+    """Yield the blank-line separated contexts of a dataset file, one at a time.
+
+    Trailing whitespace on each line is dropped and empty chunks are skipped,
+    so reformatting blank lines does not change any context's key.
+    """
+    lines: list[str] = []
+    with open(file) as f:
+        for line in f:
+            line = line.rstrip()
+            if line:
+                lines.append(line)
+            elif lines:
+                yield "\n".join(lines)
+                lines = []
+    if lines:
+        yield "\n".join(lines)
+
+
+def keyed(contexts: Iterable[str]) -> Iterator[tuple[str, str]]:
+    for context in contexts:
+        yield context_key(context), context
@@ -0,0 +1,140 @@
+"""Local stand-in for the chat-completions endpoint, for running the pipeline offline.
+
+    python -m ai_parse.fake_server --port 8765 --latency 0.2 --fail-rate 0.2
+    OPENAI_API_KEY=x python main.py --base-url http://127.0.0.1:8765/v1
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_REPLY = {
+    "version": 2,
+    "type": "lift",
+    "date": "May 8, 2025, 11:13:00 AM",
+    "data": {"duration": 40, "notes": "", "exercises": ["pull up: 6, 6, 6"]},
+}
+
+CANNED_PAIN_REPLY = {
+    "version": 2,
+    "type": "pain",
+    "date": "Feb 9, 2025",
+    "data": [{"description": "morning", "snapshots": ["left calf (2)", "lower back (1)"]}],
+}
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough rule of thumb for English and JSON: about 4 characters per token
+    return max(1, (len(text) + 3) // 4)
+
+
+class FakeChatServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        latency: float = 0.0,
+        fail_rate: float = 0.0,
+        reply: dict = CANNED_REPLY,
+        token_latency: float = 0.0,
+    ):
+        super().__init__(address, FakeChatHandler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.reply = reply
+        # Seconds per completion token, since real replies take longer the more they say
+        self.token_latency = token_latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+class FakeChatHandler(BaseHTTPRequestHandler):
+    server: FakeChatServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: dict, headers: dict | None = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with self.server._lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+
+        if not self.path.endswith("/chat/completions"):
+            self._send(404, {"error": {"message": "not found"}})
+            return
+        if random.random() < self.server.fail_rate:
+            if random.random() < 0.5:
+                self._send(429, {"error": {"message": "rate limited"}}, {"Retry-After": "0"})
+            else:
+                self._send(500, {"error": {"message": "server error"}})
+            return
+
+        prompt = "".join(m.get("content") or "" for m in request.get("messages", []))
+        reply = CANNED_PAIN_REPLY if '"type": "pain"' in prompt else self.server.reply
+        # Batch requests number their logs "### Log 1", "### Log 2", ...
+        count = len(re.findall(r"^### Log \d+$", prompt, re.MULTILINE))
+        content = "```json\n" + json.dumps([reply] * count if count else reply) + "\n```"
+        prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(content)
+        time.sleep(self.server.token_latency * completion_tokens)
+        self._send(200, {
+            "id": f"chatcmpl-fake-{self.server.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+
+def start_fake_server(port: int = 0, **kwargs) -> FakeChatServer:
+    # Serves from a background thread; call .shutdown() when done
+    server = FakeChatServer(("127.0.0.1", port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Fake chat-completions server")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    arg_parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of 429/500 replies")
+    arg_parser.add_argument("--token-latency", type=float, default=0.0, help="seconds per completion token")
+    args = arg_parser.parse_args()
+
+    server = FakeChatServer(
+        ("127.0.0.1", args.port),
+        latency=args.latency,
+        fail_rate=args.fail_rate,
+        token_latency=args.token_latency,
+    )
+    print(f"Serving on {server.base_url}")
+    server.serve_forever()
@@ -1,21 +1,175 @@
+import json
 from collections.abc import Callable
-from openai import OpenAI
-client = OpenAI()
+from openai import AsyncOpenAI, OpenAI
+
+from ai_parse.cache import ResponseCache
+
+MODEL = "gpt-4o"
+
+_client = None
+
+
+def get_client() -> OpenAI:
+    # Created on first use, so importing a parser does not need an API key
+    global _client
+    if _client is None:
+        _client = OpenAI()
+    return _client
+
+
+def make_async_client(base_url: str | None = None, timeout: float = 120) -> AsyncOpenAI:
+    # Retries are handled by the pipeline, so the client's own are turned off.
+    # base_url=None falls back to OPENAI_BASE_URL, then to the OpenAI API.
+    return AsyncOpenAI(base_url=base_url, timeout=timeout, max_retries=0)
+
+
+def strip_code_fence(response: str) -> str:
+    return response.replace("```json", "").replace("```", "").strip()
+
+
+def make_batch_request(contexts: list[str], batch_format: str) -> str:
+    logs = "\n\n".join(f"### Log {i + 1}\n{context}" for i, context in enumerate(contexts))
+    return f"""{logs}
+
+    Convert each of the {len(contexts)} logs above separately into the following format.
+    Return a JSON array with exactly {len(contexts)} objects, one per log in the same order, and nothing else.
+{batch_format}"""
+
+
+def split_batch_reply(content: str, count: int) -> list | None:
+    # A reply with the wrong number of items can't be matched back to its logs
+    try:
+        items = json.loads(strip_code_fence(content))
+    except json.JSONDecodeError as e:
+        print(f"Error decoding batch JSON: {e}")
+        return None
+    if not isinstance(items, list) or len(items) != count:
+        return None
+    return items
+
 
 class AiParser:
 
-    def __init__(self, make_req: Callable[[str], str], post_process: Callable[[str], dict]):
+    def __init__(
+        self,
+        make_req: Callable[[str], str],
+        post_process: Callable[[str], dict],
+        cache: ResponseCache | None = None,
+        rule_parse: Callable[[str], dict | None] | None = None,
+        batch_format: str | None = None,
+        validate: Callable[[dict], bool] | None = None,
+    ):
         self.make_req = make_req
         self.post_process = post_process
+        self.cache = cache
+        # Tried before the LLM; contexts it returns None for fall back to the model
+        self.rule_parse = rule_parse
+        # Output format spelled out once in batch requests, and the check each batch item must pass
+        self.batch_format = batch_format
+        self.validate = validate
+        self.rule_hits = 0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def _ruled(self, context: str) -> dict | None:
+        if self.rule_parse is None:
+            return None
+        result = self.rule_parse(context)
+        if result is not None:
+            self.rule_hits += 1
+        return result
+
+    def _cached(self, request: str) -> dict | None:
+        return self.cache.get(MODEL, request) if self.cache is not None else None
+
+    def _count_usage(self, response):
+        self.llm_calls += 1
+        if response.usage is not None:
+            self.prompt_tokens += response.usage.prompt_tokens
+            self.completion_tokens += response.usage.completion_tokens
+
+    def _finish(self, request: str, content: str | None) -> dict:
+        assert content is not None
+        result = self.post_process(content)
+        # Replies that failed to post-process are not cached, so they get retried
+        if self.cache is not None and "error" not in result:
+            self.cache.set(MODEL, request, content, result)
+        return result
 
     def parse(self, context: str) -> dict:
+        ruled = self._ruled(context)
+        if ruled is not None:
+            return ruled
         request = self.make_req(context)
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        cached = self._cached(request)
+        if cached is not None:
+            return cached
+        response = get_client().chat.completions.create(
+            model=MODEL,
             messages=[
                 {"role": "user", "content": request}
             ]
         )
-        content = response.choices[0].message.content
-        assert content is not None
-        return self.post_process(content)
+        self._count_usage(response)
+        return self._finish(request, response.choices[0].message.content)
+
+    async def aparse(self, context: str, client: AsyncOpenAI) -> dict:
+        ruled = self._ruled(context)
+        if ruled is not None:
+            return ruled
+        request = self.make_req(context)
+        cached = self._cached(request)
+        if cached is not None:
+            return cached
+        return await self._acomplete(request, client)
+
+    async def _acomplete(self, request: str, client: AsyncOpenAI) -> dict:
+        response = await client.chat.completions.create(
+            model=MODEL,
+            messages=[
+                {"role": "user", "content": request}
+            ]
+        )
+        self._count_usage(response)
+        return self._finish(request, response.choices[0].message.content)
+
+    async def aparse_batch(self, contexts: list[str], client: AsyncOpenAI) -> list[dict]:
+        """Parse several contexts with a single request.
+
+        The output format is sent once and the model answers with a JSON
+        array. Items that fail validation, or every item if the array can't
+        be matched back to the contexts, are re-sent one at a time. Valid
+        items are cached under their single-context prompt.
+        """
+        assert self.batch_format is not None and self.validate is not None
+        results: list[dict | None] = []
+        for context in contexts:
+            result = self._ruled(context)
+            if result is None:
+                result = self._cached(self.make_req(context))
+            results.append(result)
+
+        pending = [i for i, result in enumerate(results) if result is None]
+        if len(pending) > 1:
+            batch = [contexts[i] for i in pending]
+            response = await client.chat.completions.create(
+                model=MODEL,
+                messages=[
+                    {"role": "user", "content": make_batch_request(batch, self.batch_format)}
+                ]
+            )
+            self._count_usage(response)
+            content = response.choices[0].message.content or ""
+            items = split_batch_reply(content, len(batch)) or [None] * len(batch)
+            for i, item in zip(pending, items):
+                if item is None or not self.validate(item):
+                    continue
+                results[i] = item
+                if self.cache is not None:
+                    self.cache.set(MODEL, self.make_req(contexts[i]), json.dumps(item), item)
+
+        for i, result in enumerate(results):
+            if result is None:
+                results[i] = await self._acomplete(self.make_req(contexts[i]), client)
+        return results
@@ -1,17 +1,16 @@
 import json
-from ai_parse.interface import AiParser
+from ai_parse.interface import AiParser, strip_code_fence
+from ai_parse.lift_rules import parse_lift
 
-def make_lift_request(context: str) -> str:
-    return f"""{context}
-    Convert the above context into the following format, return nothing else.
-    Put any additional information that does not fit into the structured data below into the "notes" field.
+# Everything in the prompt after the instruction line; shared with batch requests
+LIFT_FORMAT = """    Put any additional information that does not fit into the structured data below into the "notes" field.
     Correct any obvious spelling errors.
     ```json
-        {{
+        {
         "version": 2,
         "type": "lift",
         "date": "May 8, 2025, 11:13:00 AM",
-        "data": {{
+        "data": {
             "duration": 40,
             "notes": "",
             "exercises": [
@@ -23,17 +22,40 @@ def make_lift_request(context: str) -> str:
                 "rdl: 6x55, 6x55, 7x55",
                 "tib raise: 15x10, 15x10"
             ]
-        }}
-    }}
+        }
+    }
     ```
     """
 
+def make_lift_request(context: str) -> str:
+    return f"""{context}
+    Convert the above context into the following format, return nothing else.
+{LIFT_FORMAT}"""
+
 def post_process_lift_request(response: str) -> dict:
-    response_str = response.replace("```json", "").replace("```", "").strip()
-    try: 
+    response_str = strip_code_fence(response)
+    try:
         return json.loads(response_str)
     except json.JSONDecodeError as e:
         print(f"Error decoding JSON: {e}")
         return {"error": str(e)}
 
-lift_parser = AiParser(make_lift_request, post_process_lift_request)
+def validate_lift(item) -> bool:
+    if not isinstance(item, dict) or item.get("type") != "lift" or item.get("version") != 2:
+        return False
+    data = item.get("data")
+    return (
+        isinstance(item.get("date"), str)
+        and isinstance(data, dict)
+        and isinstance(data.get("exercises"), list)
+        and all(isinstance(e, (str, dict)) for e in data["exercises"])
+    )
+
+# Logs already in the rep shorthand are parsed locally; only the rest reach the LLM
+lift_parser = AiParser(
+    make_lift_request,
+    post_process_lift_request,
+    rule_parse=parse_lift,
+    batch_format=LIFT_FORMAT,
+    validate=validate_lift,
+)
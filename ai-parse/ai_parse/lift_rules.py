@@ -0,0 +1,153 @@
+"""Rule-based parser for lift logs already written in the shorthand the frontend reads.
+
+A context like
+
+    May 8, 2025, 11:13 AM
+    40 min
+    dumbbell row: 8x70, 8x90, 8x90
+    pull up: 6, 6, 6
+    notes: felt good
+
+becomes a version-2 lift record without calling the LLM. Each rep is `reps`,
+`reps x weight` or `sets x reps x weight`, the same grammar as
+`natural_reps_parse` in front/src/parse/main.tsx. Exercise names must be ones
+the frontend's `parse_exercise` accepts (front/src/parse/exercise_names.json).
+Anything else, including a misspelled name, makes the whole context
+unparseable, so it can be sent to the LLM instead, which corrects spelling.
+"""
+
+import json
+import os
+import re
+from datetime import datetime
+
+EXERCISE_NAMES_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", "front", "src", "parse", "exercise_names.json"
+)
+
+
+def load_exercise_names(path: str = EXERCISE_NAMES_PATH) -> frozenset[str]:
+    """Lower-cased exercise names the frontend accepts (empty if the file is missing)."""
+    if not os.path.exists(path):
+        # Without the list nothing is parsed locally; every context goes to the LLM
+        return frozenset()
+    with open(path, "r") as f:
+        return frozenset(json.load(f))
+
+
+EXERCISE_NAMES = load_exercise_names()
+
+# Units accepted by parse_unit in the frontend; a bare number is pounds
+UNITS = ("lbs", "kg", "s", "m", "meters", "mi", "miles", "k")
+
+_NUMBER = r"\d+(?:\.\d+)?"
+_QUANTITY = rf"{_NUMBER}\s*(?:{'|'.join(sorted(UNITS, key=len, reverse=True))})?"
+# reps | reps x units | sets x reps x units, where units may be "(a|b)".
+# Bare reps may carry a unit too, e.g. "20s" for a 20 second hold.
+_REP = re.compile(
+    rf"(?:(\d+)\s*x\s*)?({_QUANTITY})(?:\s*x\s*({_QUANTITY}|\(\s*{_QUANTITY}(?:\s*\|\s*{_QUANTITY})*\s*\)))?"
+)
+_EXERCISE = re.compile(r"([a-z0-9][a-z0-9 ,'&/-]*?)\s*:\s*(.*)", re.IGNORECASE)
+# "40 min" or "duration: 40"; a bare number is too ambiguous to count
+_DURATION = re.compile(rf"duration\s*:?\s*({_NUMBER})\s*(?:min|mins|minutes)?|({_NUMBER})\s*(?:min|mins|minutes)")
+_NOTES = re.compile(r"notes?\s*:\s*(.*)", re.IGNORECASE)
+
+DATE_FORMATS = (
+    "%B %d, %Y, %I:%M:%S %p",
+    "%B %d, %Y, %I:%M %p",
+    "%B %d, %Y %I:%M %p",
+    "%B %d, %Y",
+    "%b %d, %Y, %I:%M:%S %p",
+    "%b %d, %Y, %I:%M %p",
+    "%b %d, %Y %I:%M %p",
+    "%b %d, %Y",
+    "%m/%d/%Y %I:%M %p",
+    "%m/%d/%Y",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+)
+
+
+def parse_date(line: str) -> str | None:
+    line = re.sub(r"\s+", " ", line.strip())
+    for fmt in DATE_FORMATS:
+        try:
+            date = datetime.strptime(line, fmt)
+        except ValueError:
+            continue
+        # Same shape most of log.json uses, e.g. "Dec 23, 2024, 5:23:00 PM"
+        return f"{date:%b} {date.day}, {date.year}, {date.hour % 12 or 12}:{date:%M:%S %p}"
+    return None
+
+
+def parse_duration(line: str) -> int | float | None:
+    match = _DURATION.fullmatch(line.lower())
+    if match is None:
+        return None
+    minutes = float(match.group(1) or match.group(2))
+    return int(minutes) if minutes.is_integer() else minutes
+
+
+def _normalize_rep(match: re.Match) -> str:
+    sets, reps, units = match.groups()
+    return "x".join(re.sub(r"\s+", "", p) for p in (sets, reps, units) if p)
+
+
+def parse_exercise_line(line: str) -> str | None:
+    """Canonical "exercise: rep, rep" string, or None if the line is not in the rep grammar.
+
+    The exercise has to be one the frontend knows (see EXERCISE_NAMES). An
+    exercise with no reps is kept as "exercise: ", which the frontend skips.
+    """
+    match = _EXERCISE.fullmatch(line)
+    if match is None:
+        return None
+    name, reps = match.groups()
+    name = " ".join(name.split())
+    if name.lower() not in EXERCISE_NAMES:
+        return None
+    parsed = []
+    for rep in reps.split(","):
+        rep = rep.strip()
+        if not rep:
+            continue
+        rep_match = _REP.fullmatch(rep.lower())
+        if rep_match is None:
+            return None
+        parsed.append(_normalize_rep(rep_match))
+    return f"{name}: {', '.join(parsed)}"
+
+
+def parse_lift(context: str) -> dict | None:
+    """Parse a lift context into a version-2 lift record.
+
+    Returns None unless every line is a date, a duration, notes or an exercise,
+    and the context has a date and at least one exercise.
+    """
+    date, duration, notes, exercises = None, None, [], []
+    for line in context.strip().splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if date is None and (parsed_date := parse_date(line)) is not None:
+            date = parsed_date
+        elif duration is None and (minutes := parse_duration(line)) is not None:
+            duration = minutes
+        elif (note := _NOTES.fullmatch(line)) is not None:
+            notes.append(note.group(1).strip())
+        elif (exercise := parse_exercise_line(line)) is not None:
+            exercises.append(exercise)
+        else:
+            return None
+    if date is None or not exercises:
+        return None
+    return {
+        "version": 2,
+        "type": "lift",
+        "date": date,
+        "data": {
+            "duration": duration,
+            "notes": " ".join(notes),
+            "exercises": exercises,
+        },
+    }
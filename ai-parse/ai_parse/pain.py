@@ -0,0 +1,70 @@
+import json
+from ai_parse.interface import AiParser, strip_code_fence
+
+# The pain v2 prompt from prompt.md
+PAIN_FORMAT = """    ```json
+    {
+        "version": 2,
+        "type": "pain",
+        "date": "Feb 9, 2025",
+        "data": [
+            {
+                "description": "morning",
+                "snapshots": [
+                    "both bicep (2)",
+                    "both pecs (2)",
+                    "both tricep (1)",
+                    "left calf (2)",
+                    "lower back (2)",
+                    "left knee (1)",
+                    "upper back (1)",
+                    "both shoulders (1)"
+                ]
+            },
+            {
+                "description": "post run",
+                "snapshots": [
+                    "core (1)",
+                    "both quads (1)",
+                    "right glute (1)"
+                ]
+            }
+        ]
+    }
+    ```
+    """
+
+def make_pain_request(context: str) -> str:
+    return f"""{context}
+    Convert the above context into the following format, return nothing else.
+{PAIN_FORMAT}"""
+
+def post_process_pain_request(response: str) -> dict:
+    try:
+        return json.loads(strip_code_fence(response))
+    except json.JSONDecodeError as e:
+        print(f"Error decoding JSON: {e}")
+        return {"error": str(e)}
+
+def validate_pain(item) -> bool:
+    if not isinstance(item, dict) or item.get("type") != "pain" or item.get("version") != 2:
+        return False
+    data = item.get("data")
+    return (
+        isinstance(item.get("date"), str)
+        and isinstance(data, list)
+        and all(
+            isinstance(d, dict)
+            and isinstance(d.get("description"), str)
+            and isinstance(d.get("snapshots"), list)
+            and all(isinstance(s, str) for s in d["snapshots"])
+            for d in data
+        )
+    )
+
+pain_parser = AiParser(
+    make_pain_request,
+    post_process_pain_request,
+    batch_format=PAIN_FORMAT,
+    validate=validate_pain,
+)
@@ -0,0 +1,113 @@
+import asyncio
+import random
+from collections.abc import Awaitable, Callable, Iterable
+from typing import TypeVar
+
+import openai
+from openai import AsyncOpenAI
+
+from ai_parse.interface import AiParser
+from ai_parse.state import Checkpoint
+
+# Failures worth retrying: rate limits, timeouts, dropped connections and 5xx
+RETRYABLE = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+T = TypeVar("T")
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    # "Full jitter": spreads retries out so parallel requests don't retry in lockstep
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+async def with_retries(
+    call: Callable[[], Awaitable[T]],
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+) -> T:
+    for attempt in range(max_retries + 1):
+        try:
+            return await call()
+        except RETRYABLE as e:
+            if attempt == max_retries:
+                raise
+            delay = backoff_delay(attempt, base_delay)
+            print(f"  {type(e).__name__}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+async def run_pipeline(
+    parser: AiParser,
+    contexts: Iterable[tuple[str, str]],
+    checkpoint: Checkpoint,
+    client: AsyncOpenAI,
+    concurrency: int = 8,
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    batch_size: int = 1,
+) -> dict[str, dict]:
+    """Parse every (key, context) pair not yet marked done in the checkpoint.
+
+    Contexts are consumed lazily, and at most `concurrency` requests are in
+    flight at once. Each result is appended to the checkpoint under the
+    context's key as soon as it arrives, so rerunning after a crash or Ctrl-C,
+    or after editing the dataset, only sends contexts that never finished.
+    With `batch_size` > 1, that many contexts are packed into each request.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks: list[asyncio.Task] = []
+    seen: set[str] = set()
+    done = 0
+
+    def record(key: str, result: dict):
+        if "error" in result:
+            # The reply was not valid JSON; retried on the next run
+            checkpoint.record(key, "error", error=result["error"])
+        else:
+            checkpoint.record(key, "done", result=result)
+        print(f"Context {key} parsed.")
+
+    async def parse_group(group: list[tuple[str, str]]):
+        keys = [key for key, _ in group]
+        texts = [context for _, context in group]
+        try:
+            if len(texts) == 1:
+                results = [await with_retries(lambda: parser.aparse(texts[0], client), max_retries, base_delay)]
+            else:
+                results = await with_retries(lambda: parser.aparse_batch(texts, client), max_retries, base_delay)
+        except (openai.OpenAIError, AssertionError) as e:
+            for key in keys:
+                print(f"Context {key} failed: {e}")
+                checkpoint.record(key, "error", error=str(e))
+            return
+        finally:
+            semaphore.release()
+        for key, result in zip(keys, results):
+            record(key, result)
+
+    async def submit(group: list[tuple[str, str]]):
+        # Waiting here keeps the dataset from being read further ahead than needed
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(parse_group(group)))
+
+    group: list[tuple[str, str]] = []
+    for key, context in contexts:
+        if key in seen or checkpoint.status(key) in ("done", "skip"):
+            done += 1
+            continue
+        seen.add(key)
+        group.append((key, context))
+        if len(group) == batch_size:
+            await submit(group)
+            group = []
+    if group:
+        await submit(group)
+    await asyncio.gather(*tasks)
+    print(f"{done} contexts already done or repeated, {len(seen)} parsed")
+    return checkpoint.results()
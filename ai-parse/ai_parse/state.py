@@ -12,3 +12,52 @@ class State:
     def save_state(self, file: str):
         with open(file, 'w') as f:
             json.dump(self.state, f)
+
+
+class Checkpoint:
+    """Append-only JSONL log of parse results, one line per finished context.
+
+    Entries are keyed by the context's content hash, so they stay valid when
+    the dataset is reordered or edited. Every line is flushed and fsynced as
+    soon as it is written, so a crash or Ctrl-C loses at most the requests
+    still in flight. On load, the last line for each key wins; a torn final
+    line from a crash is ignored.
+    """
+
+    def __init__(self, file: str):
+        self.file = file
+        self.entries: dict[str, dict] = {}
+        if os.path.exists(file):
+            with open(file, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if "key" not in entry:
+                        # Older entries were keyed by position in the file, which
+                        # can't be trusted; the response cache makes redoing them cheap
+                        continue
+                    self.entries[entry["key"]] = entry
+        self._f = open(file, 'a')
+
+    def status(self, key: str) -> str | None:
+        entry = self.entries.get(key)
+        return entry["status"] if entry else None
+
+    def record(self, key: str, status: str, result: dict | None = None, error: str | None = None):
+        entry = {"key": key, "status": status}
+        if result is not None:
+            entry["result"] = result
+        if error is not None:
+            entry["error"] = error
+        self._f.write(json.dumps(entry) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self.entries[key] = entry
+
+    def results(self) -> dict[str, dict]:
+        return {k: e["result"] for k, e in self.entries.items() if e["status"] == "done"}
+
+    def close(self):
+        self._f.close()
@@ -0,0 +1,123 @@
+"""Benchmark request packing: tokens and wall-clock time per context for each batch size.
+
+Runs against the in-process fake server unless --base-url is given. Contexts
+come from --input (blank-line separated), or are rendered from the records
+in front/src/data/log.json.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from ai_parse.dataset import iter_chunks, keyed
+from ai_parse.fake_server import start_fake_server
+from ai_parse.interface import AiParser, make_async_client
+from ai_parse.lift import lift_parser
+from ai_parse.pain import pain_parser
+from ai_parse.pipeline import run_pipeline
+from ai_parse.state import Checkpoint
+
+PARSERS = {"lift": lift_parser, "pain": pain_parser}
+LOG_PATH = os.path.join("..", "front", "src", "data", "log.json")
+
+
+def render_log_contexts(kind: str) -> list[str]:
+    # Plain-text versions of already parsed records, close to what gets typed into the notes app
+    with open(LOG_PATH) as f:
+        records = [r for r in json.load(f) if r.get("type") == kind and r.get("version") == 2]
+    contexts = []
+    for record in records:
+        lines = [record["date"]]
+        if kind == "lift":
+            data = record["data"]
+            if data.get("duration"):
+                lines.append(f"took {data['duration']} minutes")
+            lines += [e for e in data["exercises"] if isinstance(e, str)]
+            if data.get("notes"):
+                lines.append(data["notes"])
+        else:
+            lines += [f"{d['description']}: {', '.join(d['snapshots'])}" for d in record["data"]]
+        contexts.append("\n".join(lines))
+    return contexts
+
+
+async def bench(kind: str, contexts: list[str], batch_size: int, client, concurrency: int) -> dict:
+    template = PARSERS[kind]
+    # No rule parser or cache, so every context is actually sent
+    parser = AiParser(
+        template.make_req,
+        template.post_process,
+        batch_format=template.batch_format,
+        validate=template.validate,
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint = Checkpoint(os.path.join(tmp, "checkpoint.jsonl"))
+        start = time.perf_counter()
+        results = await run_pipeline(
+            parser, keyed(contexts), checkpoint, client,
+            concurrency=concurrency, batch_size=batch_size,
+        )
+        elapsed = time.perf_counter() - start
+        checkpoint.close()
+    n = len(contexts)
+    return {
+        "format": kind,
+        "batch_size": batch_size,
+        "contexts": n,
+        "parsed": len(results),
+        "requests": parser.llm_calls,
+        "prompt_tokens_per_context": parser.prompt_tokens / n,
+        "completion_tokens_per_context": parser.completion_tokens / n,
+        "ms_per_context": 1000 * elapsed / n,
+    }
+
+
+async def main(args):
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = start_fake_server(latency=args.latency, token_latency=args.token_latency)
+        base_url = server.base_url
+    client = make_async_client(base_url)
+
+    rows = []
+    try:
+        for kind in args.formats:
+            if args.input:
+                contexts = list(iter_chunks(args.input))
+            else:
+                contexts = render_log_contexts(kind)
+            contexts = contexts[: args.limit]
+            for batch_size in args.sizes:
+                rows.append(await bench(kind, contexts, batch_size, client, args.concurrency))
+    finally:
+        await client.close()
+        if server is not None:
+            server.shutdown()
+
+    print(f"\n{'format':<6} {'K':>3} {'requests':>8} {'prompt tok/ctx':>15} {'compl tok/ctx':>14} {'ms/ctx':>8}")
+    for row in rows:
+        print(
+            f"{row['format']:<6} {row['batch_size']:>3} {row['requests']:>8} "
+            f"{row['prompt_tokens_per_context']:>15.1f} {row['completion_tokens_per_context']:>14.1f} "
+            f"{row['ms_per_context']:>8.1f}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=4)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark multi-context request packing")
+    parser.add_argument("--formats", nargs="+", choices=sorted(PARSERS), default=sorted(PARSERS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1, 2, 4, 8, 16], help="batch sizes K")
+    parser.add_argument("--input", default=None, help="blank-line separated contexts (default: rendered from log.json)")
+    parser.add_argument("--limit", type=int, default=48, help="contexts per run")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--base-url", default=None, help="benchmark a real endpoint instead of the fake server")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake server seconds per request")
+    parser.add_argument("--token-latency", type=float, default=0.002, help="fake server seconds per completion token")
+    parser.add_argument("--output", default=None, help="also write the results as JSON")
+    asyncio.run(main(parser.parse_args()))
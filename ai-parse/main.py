@@ -1,37 +1,74 @@
+import argparse
+import asyncio
 import json
+from ai_parse.cache import ResponseCache
+from ai_parse.dataset import iter_chunks, keyed
+from ai_parse.interface import make_async_client
 from ai_parse.lift import lift_parser
-from ai_parse.state import State
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import sys
+from ai_parse.pain import pain_parser
+from ai_parse.pipeline import run_pipeline
+from ai_parse.state import Checkpoint, State
+
+PARSERS = {"lift": lift_parser, "pain": pain_parser}
+
+
+def migrate_progress(file: str, dataset: str, checkpoint: Checkpoint):
+    # The old progress file is keyed by chunk position, which is only right for
+    # the file it was written against, so it is carried over into a new checkpoint once
+    progress = State(file).state
+    for i, key in enumerate(key for key, _ in keyed(iter_chunks(dataset))):
+        if progress.get(str(i)) in ("done", "skip"):
+            checkpoint.record(key, "skip")
+
+
+async def main(args):
+    ai_parser = PARSERS[args.format]
+    checkpoint = Checkpoint(args.checkpoint)
+    if not checkpoint.entries:
+        migrate_progress("progress.json", args.input, checkpoint)
+
+    # Keys in dataset order, collected as the file is streamed
+    order: list[str] = []
+
+    def contexts():
+        for key, context in keyed(iter_chunks(args.input)):
+            order.append(key)
+            yield key, context
+
+    client = make_async_client(args.base_url)
+    ai_parser.cache = ResponseCache(args.cache, max_entries=args.cache_entries)
+    try:
+        results = await run_pipeline(
+            ai_parser, contexts(), checkpoint, client,
+            concurrency=args.concurrency, max_retries=args.max_retries,
+            batch_size=args.batch_size,
+        )
+    finally:
+        print(f"Rule parser: {ai_parser.rule_hits} contexts, LLM: {ai_parser.llm_calls} requests, "
+              f"{ai_parser.prompt_tokens} prompt + {ai_parser.completion_tokens} completion tokens")
+        print(f"Response cache: {ai_parser.cache.stats()}")
+        ai_parser.cache.close()
+        checkpoint.close()
+        await client.close()
+
+    # Only chunks still in the dataset, in file order; results for edited or
+    # removed chunks stay in the checkpoint but are left out
+    output = [results[key] for key in dict.fromkeys(order) if key in results]
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=4)
+    print(f"{len(output)} results written to {args.output}")
 
-def parse_context(index_context):
-    i, context = index_context
-    response = lift_parser.parse(context)
-    return i, response
 
 if __name__ == "__main__":
-    progress_state = State("progress.json")
-
-    with open("input.txt") as f:
-        dataset = f.read()
-    dataset = dataset.split("\n\n")
-    print(len(dataset))
-
-    # Prepare contexts to parse (skip those already done or skipped)
-    to_parse = [ (i, context) for i, context in enumerate(dataset)
-                if progress_state.state.get(str(i), None) not in ["done", "skip"] ]
-
-    todo = ([i for i, _ in to_parse])
-    print(len(todo))
-    sys.exit(0)
-    results = {}
-    with ThreadPoolExecutor() as executor:
-        future_to_index = {executor.submit(parse_context, ic): ic[0] for ic in to_parse}
-        for future in as_completed(future_to_index):
-            i, response = future.result()
-            print(f"Context {i} parsed.")
-            print(json.dumps(response, indent=4))
-            progress_state.state[i] = "done"
-            results[i] = response
-
-    progress_state.save_state("progress.json")
+    parser = argparse.ArgumentParser(description="Parse lift or pain logs with an LLM")
+    parser.add_argument("--input", default="input.txt")
+    parser.add_argument("--format", choices=sorted(PARSERS), default="lift")
+    parser.add_argument("--checkpoint", default="checkpoint.jsonl", help="append-only log of results")
+    parser.add_argument("--output", default="output.json")
+    parser.add_argument("--cache", default="response_cache.sqlite3", help="LLM response cache")
+    parser.add_argument("--cache-entries", type=int, default=10000, help="max cached responses")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=1, help="contexts packed into each request")
+    parser.add_argument("--base-url", default=None, help="chat-completions API base URL (default: OPENAI_BASE_URL or OpenAI)")
+    asyncio.run(main(parser.parse_args()))
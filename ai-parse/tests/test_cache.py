@@ -0,0 +1,47 @@
+from ai_parse.cache import ResponseCache
+
+
+def make_cache(tmp_path, **kwargs):
+    return ResponseCache(str(tmp_path / "cache.sqlite3"), **kwargs)
+
+
+def test_round_trip(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("m", "prompt", "raw", {"a": 1})
+    assert cache.get("m", "prompt") == {"a": 1}
+    assert cache.get("other", "prompt") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_evicts_least_recently_used_beyond_the_limit(tmp_path):
+    cache = make_cache(tmp_path, max_entries=3)
+    for prompt in "abc":
+        cache.set("m", prompt, "raw", {"prompt": prompt})
+    cache.get("m", "a")  # Now more recent than b and c
+    cache.set("m", "d", "raw", {"prompt": "d"})
+    assert len(cache) == 3
+    assert cache.get("m", "b") is None
+    assert all(cache.get("m", prompt) is not None for prompt in "acd")
+
+
+def test_replacing_an_entry_does_not_count_twice(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.set("m", "a", "raw", {})
+    cache.set("m", "a", "raw", {"again": True})
+    cache.set("m", "b", "raw", {})
+    assert len(cache) == 2
+    assert cache.get("m", "a") == {"again": True}
+
+
+def test_recency_survives_reopening(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.set("m", "a", "raw", {})
+    cache.set("m", "b", "raw", {})
+    cache.get("m", "a")
+    cache.close()
+
+    cache = make_cache(tmp_path, max_entries=2)
+    assert len(cache) == 2
+    cache.set("m", "c", "raw", {})
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a") is not None
@@ -0,0 +1,82 @@
+from ai_parse.lift_rules import parse_date, parse_duration, parse_exercise_line, parse_lift
+
+
+def test_reps_only():
+    assert parse_exercise_line("pull up: 6, 6, 6") == "pull up: 6, 6, 6"
+
+
+def test_reps_times_weight():
+    assert parse_exercise_line("dumbbell row: 8x70, 8 x 90") == "dumbbell row: 8x70, 8x90"
+
+
+def test_sets_times_reps_times_weight():
+    assert parse_exercise_line("rdl: 3x6x55") == "rdl: 3x6x55"
+
+
+def test_units_and_alternatives():
+    assert parse_exercise_line("bench: 5x20kg, 5x(40|45 lbs)") == "bench: 5x20kg, 5x(40|45lbs)"
+    assert parse_exercise_line("plank: 60s, 45 s") == "plank: 60s, 45s"
+
+
+def test_exercise_without_reps_is_kept():
+    assert parse_exercise_line("pull up:") == "pull up: "
+
+
+def test_exercise_name_is_case_insensitive_and_spacing_is_collapsed():
+    assert parse_exercise_line("Pull  Up: 6") == "Pull Up: 6"
+
+
+def test_unknown_or_misspelled_exercise_is_rejected():
+    assert parse_exercise_line("dumbell rowe: 8x70") is None
+    assert parse_exercise_line("my knee: 3") is None
+
+
+def test_reps_outside_the_grammar_are_rejected():
+    assert parse_exercise_line("pull up: 6 then 5") is None
+    assert parse_exercise_line("bench: 5x20 stones") is None
+
+
+def test_parse_date():
+    assert parse_date("May 8, 2025, 11:13 AM") == "May 8, 2025, 11:13:00 AM"
+    assert parse_date("2025-05-08") == "May 8, 2025, 12:00:00 AM"
+    assert parse_date("December 23, 2024, 5:23 PM") == "Dec 23, 2024, 5:23:00 PM"
+    assert parse_date("sometime in May") is None
+
+
+def test_parse_duration():
+    assert parse_duration("40 min") == 40
+    assert parse_duration("duration: 42.5") == 42.5
+    assert parse_duration("40") is None
+
+
+def test_parse_lift():
+    context = """
+    May 8, 2025, 11:13 AM
+    40 min
+    dumbbell row: 8x70, 8x90, 8x90
+    pull up: 6, 6, 6
+    notes: felt good
+    """
+    assert parse_lift(context) == {
+        "version": 2,
+        "type": "lift",
+        "date": "May 8, 2025, 11:13:00 AM",
+        "data": {
+            "duration": 40,
+            "notes": "felt good",
+            "exercises": ["dumbbell row: 8x70, 8x90, 8x90", "pull up: 6, 6, 6"],
+        },
+    }
+
+
+def test_parse_lift_leaves_unknown_exercises_to_the_llm():
+    assert parse_lift("May 8, 2025, 11:13 AM\n40 min\ndumbell rowe: 8x70\nmy knee: 3") is None
+
+
+def test_parse_lift_needs_a_date_and_an_exercise():
+    assert parse_lift("40 min\npull up: 6") is None
+    assert parse_lift("May 8, 2025\n40 min") is None
+
+
+def test_parse_lift_rejects_free_text():
+    assert parse_lift("May 8, 2025\npull up: 6\nfelt tired today") is None
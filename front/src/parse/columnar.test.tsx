@@ -0,0 +1,35 @@
+import { ColumnarExport, decode_columnar } from "./columnar";
+
+describe("Test columnar decode", () => {
+    it('Should rebuild records, keeping null fields and dropping absent ones', () => {
+        const payload: ColumnarExport = {
+            version: 2,
+            count: 2,
+            dictionaries: { type: ["run"], title: ["Morning Run"], shoe: ["Novablast 4"] },
+            columns: { version: [2, 2], type: [0, 0], date: ["Jan 26, 2026, 12:29:09 PM", "Jan 25, 2026, 8:00:00 AM"] },
+            data: {
+                title: [0, 0],
+                distance: [5012.3, 8000],
+                temperature: [null, 4],
+                shoe: [0, null],
+                intervals: [null, null],
+            },
+            absent: { columns: {}, data: { temperature: [[0, 1]], shoe: [[1, 2]], intervals: [[1, 2]] } },
+        }
+        const records = decode_columnar(payload)
+        expect(records).toEqual([
+            {
+                version: 2, type: "run", date: "Jan 26, 2026, 12:29:09 PM",
+                data: { title: "Morning Run", distance: 5012.3, shoe: "Novablast 4", intervals: null },
+            },
+            {
+                version: 2, type: "run", date: "Jan 25, 2026, 8:00:00 AM",
+                data: { title: "Morning Run", distance: 8000, temperature: 4 },
+            },
+        ])
+    })
+
+    it('Should reject unknown versions', () => {
+        expect(() => decode_columnar({ version: 99, count: 0, dictionaries: {}, columns: {}, data: {}, absent: { columns: {}, data: {} } })).toThrow()
+    })
+})
@@ -0,0 +1,62 @@
+// Decoder for strava_export.columns.json, the compact columnar twin of
+// strava_export.json written by import-strava-api (import_strava/columnar.py).
+// Every field is one array with an entry per record; repeated strings are
+// stored once in a dictionary and referenced by index. Records lacking a
+// field are listed under "absent" as [start, stop) ranges, so a null value and
+// a missing field decode differently.
+
+export const COLUMNAR_VERSION = 2
+
+type AbsentRanges = { [field: string]: [number, number][] }
+
+export interface ColumnarExport {
+    version: number
+    count: number
+    dictionaries: { [field: string]: string[] }
+    columns: { [field: string]: unknown[] }
+    data: { [field: string]: unknown[] }
+    absent: { columns: AbsentRanges, data: AbsentRanges }
+}
+
+function decode_value(dictionaries: ColumnarExport["dictionaries"], field: string, value: unknown): unknown {
+    const dictionary = dictionaries[field]
+    if (dictionary && typeof value === "number") {
+        return dictionary[value]
+    }
+    return value
+}
+
+function decode_rows(dictionaries: ColumnarExport["dictionaries"], columns: { [field: string]: unknown[] }, absent: AbsentRanges, count: number): { [field: string]: unknown }[] {
+    const rows: { [field: string]: unknown }[] = []
+    for (let i = 0; i < count; i++) {
+        rows.push({})
+    }
+    for (const field in columns) {
+        const present = new Array<boolean>(count).fill(true)
+        for (const [start, stop] of absent[field] ?? []) {
+            present.fill(false, start, stop)
+        }
+        const values = columns[field]
+        for (let i = 0; i < count; i++) {
+            if (present[i]) {
+                rows[i][field] = decode_value(dictionaries, field, values[i])
+            }
+        }
+    }
+    return rows
+}
+
+// Rebuilds the record-per-object form that parse() expects
+export function decode_columnar(payload: ColumnarExport): unknown[] {
+    if (payload.version !== COLUMNAR_VERSION) {
+        throw `Unsupported columnar version: ${payload.version}`
+    }
+    const records = decode_rows(payload.dictionaries, payload.columns, payload.absent.columns, payload.count)
+    const data = decode_rows(payload.dictionaries, payload.data, payload.absent.data, payload.count)
+    records.forEach((record, i) => {
+        record.data = data[i]
+    })
+    return records
+}
+
+export default decode_columnar
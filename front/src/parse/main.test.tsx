@@ -1,10 +1,11 @@
 import { kilograms } from "@buge/ts-units/mass";
 import { Exercise, LiftData, NoteTopic, PainLogData, per_minute, pounds, RowData } from "../types";
-import parse, { data_if_in_parens, extract_paren_data, natural_reps_parse, parse_body_location, parse_interval, parse_notev1, parse_unit, parse_units } from "./main";
+import parse, { data_if_in_parens, exercise_names, extract_paren_data, natural_reps_parse, parse_body_location, parse_interval, parse_notev1, parse_unit, parse_units } from "./main";
 import { Foot, Calf, FootMetatarsals, AchillesTendon, BodyLocationWithSide } from "../pt/body_location";
 import { Side } from "../types";
 import { meters, miles } from "@buge/ts-units/length";
 import { minutes, seconds } from "@buge/ts-units/time";
+import shared_exercise_names from "./exercise_names.json";
 
 describe("Test parse unit", () => {
     it('Should parse kg', () => {
@@ -451,3 +452,9 @@ describe("parse interval", () => {
         expect(res.distance?.in(meters).amount).toEqual(0)
     });
 })
+
+describe("Test exercise names", () => {
+    it('Should match the copy ai-parse reads', () => {
+        expect(exercise_names()).toEqual(shared_exercise_names)
+    })
+})
@@ -86,8 +86,8 @@ function parse_run_v2(data: any, date: Date): RunData {
     const moving_time = seconds(parseFloat(data.moving_time));
     const elapsed_time = seconds(parseFloat(data.elapsed_time));
 
-    const temperature = data.temperature !== '' ? celsius(parseFloat(data.temperature)) : undefined;
-    const feels_like = data.feels_like !== '' ? celsius(parseFloat(data.feels_like)) : undefined;
+    const temperature = data.temperature != null && data.temperature !== '' ? celsius(parseFloat(data.temperature)) : undefined;
+    const feels_like = data.feels_like != null && data.feels_like !== '' ? celsius(parseFloat(data.feels_like)) : undefined;
 
     let workout: RunningWorkoutData | undefined = undefined;
     if (data.intervals) {
@@ -223,6 +223,12 @@ const exercise_map: Map<string, Exercise> = new Map(
     ],
 );
 
+// Every name parse_exercise accepts. ai-parse reads the copy in exercise_names.json
+// to decide which lift logs it can parse without the LLM; a test keeps them in sync.
+export function exercise_names(): string[] {
+    return [...exercise_map.keys()].sort()
+}
+
 function parse_exercise(exercise: string): Exercise {
     const res = exercise_map.get(exercise.toLowerCase())
     if (res) return res
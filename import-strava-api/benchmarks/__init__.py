@@ -0,0 +1 @@
+"""Synthetic-load benchmarks for the import pipeline (run with python -m benchmarks.bench_import)."""
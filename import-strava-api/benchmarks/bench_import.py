@@ -0,0 +1,403 @@
+"""Time each stage of the import pipeline on synthetic activities and check for regressions.
+
+Stages, each reported in microseconds per activity:
+
+- normalize_activity: StravaAPI.normalize_activity on detailed API activities,
+  naming gear through a warm GearLookup
+- parse_date: utils.parse_date on bulk-export "Activity Date" strings
+- cache_lookup: workout-interval cache contains/get for every activity, as
+  parse_run_for_workout does
+- extract: extract_relevant_activities over the normalized activities, with
+  workout runs queued for review instead of prompting
+- dedup: filtering fetched activities against the IDs already in the store
+- store_extend: appending the new half of the activities to a store already
+  holding the older half (the sorted index insert and segment writes)
+- export_json: writing the full store to strava_export.json
+
+Every timed run is paired with a run of a fixed calibration workload right
+before it, and a stage's result is the median of its runs relative to their
+calibration runs. A shared or virtual machine that speeds up or slows down
+during the suite then moves both together, instead of failing the stages
+that happened to run during a slow spell.
+
+Results are compared against benchmarks/baseline.json and the run fails
+(exit status 1) if any stage is slower than its baseline by more than that
+stage's tolerance. --update-baseline runs the suite several times and sets
+each stage's tolerance from how much its result varied between those rounds.
+Baselines are machine-specific: record one on the machine that runs the
+comparison.
+
+Usage (from import-strava-api):
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --sizes 10000 100000 1000000
+    python -m benchmarks.bench_import --update-baseline --rounds 5
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from import_strava.cache import SqliteCache
+from import_strava.gear import GEAR_CACHE_VERSION, GearLookup
+from import_strava.import_strava import extract_relevant_activities
+from import_strava.rate_limit import RateLimiter
+from import_strava.run import CACHE_VERSION_STRING
+from import_strava.store import ActivityStore, ReviewQueue
+from import_strava.strava_api import StravaAPI
+from import_strava.synthetic import GEAR, api_activities, csv_rows
+from import_strava.utils import _display_offset, parse_date
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Stages faster than this many microseconds per activity are too noisy to flag
+NOISE_FLOOR_US = 0.5
+
+# A stage's tolerance is this many times the spread seen while recording the
+# baseline, but never below MIN_TOLERANCE
+SPREAD_FACTOR = 3
+MIN_TOLERANCE = 0.15
+
+# Used for stages the baseline has no tolerance for
+DEFAULT_TOLERANCE = 0.3
+
+# Share of runs that already have cached workout intervals
+CACHED_INTERVAL_EVERY = 10
+
+
+_CALIBRATION_RECORDS = [
+    {"id": i, "title": f"Run {i}", "distance": i * 1.5, "tags": ["a", "b"]} for i in range(10_000)
+]
+
+
+def calibration_workload():
+    """Fixed pure-Python workload that every timed run is measured against."""
+    data = json.loads(json.dumps(_CALIBRATION_RECORDS))
+    sorted(data, key=lambda r: (r["distance"] % 7, r["id"]))
+    {r["title"]: r for r in data}
+
+
+def time_once(func: Callable[[], object]) -> float:
+    """Wall-clock time of one run of func, in seconds."""
+    gc.collect()
+    # Like timeit, keep collector pauses out of the measurement
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+class Timer:
+    """Times stages against the calibration workload and keeps every calibration time."""
+
+    def __init__(self, repeat: int):
+        self.repeat = repeat
+        self.calibrations: List[float] = []
+
+    def relative_time(
+        self, func: Callable[[], object], setup: Optional[Callable[[], None]] = None
+    ) -> float:
+        """Median time of func relative to a calibration run just before each run.
+
+        Args:
+            func: Work to time
+            setup: Untimed preparation run before every timed run (optional)
+
+        Returns:
+            Median of (run time / calibration time) over the repeats
+        """
+        ratios = []
+        for _ in range(self.repeat):
+            calibration = time_once(calibration_workload)
+            self.calibrations.append(calibration)
+            if setup is not None:
+                setup()
+            ratios.append(time_once(func) / calibration)
+        return statistics.median(ratios)
+
+    def calibration_ms(self) -> float:
+        return 1e3 * statistics.median(self.calibrations)
+
+
+def clear_date_caches():
+    """Forget UTC offsets memoized by earlier repeats, which a real import computes afresh."""
+    _display_offset.cache_clear()
+
+
+def seed_cache(cache: SqliteCache, activities: List[Dict]):
+    """Fill a cache with gear names and the intervals of every tenth run, in one transaction."""
+    rows = [(f"gear:{gear_id}", GEAR_CACHE_VERSION, json.dumps(name), 0) for gear_id, name in GEAR.items()]
+    rows += [
+        (str(a["id"]), CACHE_VERSION_STRING, json.dumps([{"distance": 800, "time": 160}]), 0)
+        for a in activities[::CACHED_INTERVAL_EVERY]
+        if a["type"] == "Run"
+    ]
+    with cache.conn:
+        cache.conn.executemany(
+            "INSERT OR REPLACE INTO cache (key, version, value, updated) VALUES (?, ?, ?, ?)", rows
+        )
+
+
+def bench_size(count: int, timer: Timer, seed: int) -> Dict[str, float]:
+    """Run every stage on count synthetic activities.
+
+    Args:
+        count: Number of activities
+        timer: Timer to measure the stages with
+        seed: Seed for the synthetic generator
+
+    Returns:
+        Dictionary mapping stage name to its time per activity, relative to
+        the calibration workload (see to_microseconds)
+    """
+    print(f"\nGenerating {count} synthetic activities...")
+    activities = api_activities(count, seed)
+    rows = csv_rows(count, seed)
+    results: Dict[str, float] = {}
+
+    def record(stage: str, relative: float):
+        results[stage] = relative / count
+        print(f"  {stage:<20} {relative:>9.2f}x calibration")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SqliteCache(os.path.join(tmp, "cache.sqlite3"))
+        seed_cache(cache, activities)
+
+        # No auth is needed: nothing here makes a request
+        api = StravaAPI(None, rate_limiter=RateLimiter(state_file=None))
+        gear = GearLookup(cache)
+        normalized: List[Dict] = []
+
+        def normalize():
+            normalized[:] = [api.normalize_activity(a, gear) for a in activities]
+
+        record("normalize_activity", timer.relative_time(normalize))
+        record(
+            "parse_date",
+            timer.relative_time(lambda: [parse_date(r["Activity Date"]) for r in rows], clear_date_caches),
+        )
+
+        def lookup():
+            for a in activities:
+                if cache.contains(a["id"], CACHE_VERSION_STRING):
+                    cache.get(a["id"], CACHE_VERSION_STRING)
+
+        record("cache_lookup", timer.relative_time(lookup))
+
+        processed: List[Dict] = []
+
+        def extract():
+            review_queue = ReviewQueue(os.path.join(tmp, "review_queue.json"))
+            processed[:] = extract_relevant_activities(normalized, cache, review_queue=review_queue)
+
+        record("extract", timer.relative_time(extract, clear_date_caches))
+        cache.close()
+
+        # extract yields newest first; the store holds the older half before a sync
+        processed.reverse()
+        half = len(processed) // 2
+        base_dir = os.path.join(tmp, "base_store")
+        ActivityStore(base_dir).extend(processed[:half])
+        base_store = ActivityStore(base_dir)
+        record(
+            "dedup",
+            timer.relative_time(lambda: [a for a in activities if str(a.get("id", "")) not in base_store]),
+        )
+
+        store_dir = os.path.join(tmp, "store")
+        stores: List[ActivityStore] = []
+
+        def fresh_store():
+            shutil.rmtree(store_dir, ignore_errors=True)
+            shutil.copytree(base_dir, store_dir)
+            stores[:] = [ActivityStore(store_dir)]
+
+        record("store_extend", timer.relative_time(lambda: stores[0].extend(processed[half:]), fresh_store))
+
+        export_path = os.path.join(tmp, "strava_export.json")
+        record("export_json", timer.relative_time(lambda: stores[0].export_json(export_path)))
+    return results
+
+
+def to_microseconds(relative: Dict[str, Dict[str, float]], calibration_ms: float) -> Dict[str, Dict[str, float]]:
+    """Turn relative results into microseconds per activity at a calibration time."""
+    return {
+        size: {stage: round(1e3 * value * calibration_ms, 3) for stage, value in stages.items()}
+        for size, stages in relative.items()
+    }
+
+
+def run_suite(sizes: List[int], repeat: int, seed: int) -> Tuple[Dict[str, Dict[str, float]], float]:
+    """Run every stage at every size.
+
+    Returns:
+        (size -> stage -> time per activity relative to the calibration
+        workload, median calibration time in milliseconds)
+    """
+    timer = Timer(repeat)
+    relative = {str(size): bench_size(size, timer, seed) for size in sizes}
+    return relative, timer.calibration_ms()
+
+
+def record_baseline(
+    rounds: List[Dict[str, Dict[str, float]]], calibration_ms: float
+) -> Tuple[Dict[str, Dict[str, float]], Dict[str, Dict[str, float]]]:
+    """Combine several rounds of relative results into baseline numbers and tolerances.
+
+    Args:
+        rounds: Relative results of each round (see run_suite)
+        calibration_ms: Calibration time to express the baseline at
+
+    Returns:
+        (size -> stage -> microseconds per activity, size -> stage -> tolerance)
+    """
+    medians: Dict[str, Dict[str, float]] = {}
+    tolerances: Dict[str, Dict[str, float]] = {}
+    for size, stages in rounds[0].items():
+        medians[size], tolerances[size] = {}, {}
+        for stage in stages:
+            values = [r[size][stage] for r in rounds]
+            median = statistics.median(values)
+            spread = max(abs(v / median - 1) for v in values) if median else 0.0
+            medians[size][stage] = median
+            tolerances[size][stage] = round(max(MIN_TOLERANCE, SPREAD_FACTOR * spread), 3)
+    return to_microseconds(medians, calibration_ms), tolerances
+
+
+def load_baseline(path: str) -> Dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict,
+    calibration: float,
+    tolerance: Optional[float] = None,
+) -> List[str]:
+    """Check results against the baseline.
+
+    Args:
+        results: Size (as a string) -> stage -> microseconds per activity
+        baseline: Contents of the baseline file
+        calibration: This run's calibration time in milliseconds
+        tolerance: Allowed slowdown for every stage, as a fraction (0.25 = 25%
+            slower); by default each stage's tolerance from the baseline
+
+    Returns:
+        Description of every regression found
+    """
+    regressions = []
+    speed = calibration / baseline.get("calibration_ms", calibration)
+    print(f"\nMachine speed vs. baseline: {1 / speed:.2f}x (baselines scaled by {speed:.2f})")
+    print(f"\n{'size':>8} {'stage':<20} {'baseline':>10} {'now':>10} {'ratio':>7} {'allowed':>8}")
+    for size, stages in results.items():
+        base_stages = baseline.get("results", {}).get(size, {})
+        stage_tolerances = baseline.get("tolerances", {}).get(size, {})
+        for stage, now in stages.items():
+            base = base_stages.get(stage)
+            if base is None:
+                print(f"{size:>8} {stage:<20} {'-':>10} {now:>10.2f} {'new':>7}")
+                continue
+            base *= speed
+            allowed = tolerance if tolerance is not None else stage_tolerances.get(stage, DEFAULT_TOLERANCE)
+            ratio = now / base if base else float("inf")
+            flag = ""
+            if now > base * (1 + allowed) and now - base > NOISE_FLOOR_US:
+                flag = "  REGRESSION"
+                regressions.append(
+                    f"{stage} at {size}: {base:.2f} -> {now:.2f} us/activity (allowed +{allowed:.0%})"
+                )
+            print(f"{size:>8} {stage:<20} {base:>10.2f} {now:>10.2f} {ratio:>7.2f} {1 + allowed:>7.2f}x{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the import pipeline on synthetic activities")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000], help="activity counts to run")
+    parser.add_argument("--repeat", type=int, default=9, help="timed runs per stage (the median is kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=None,
+        help="allowed slowdown for every stage (default: each stage's tolerance from the baseline)",
+    )
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument(
+        "--rounds", type=int, default=5, help="suite runs to record a baseline from (with --update-baseline)"
+    )
+    args = parser.parse_args(argv)
+
+    # Runs that look like workouts are queued for review, but never prompt regardless
+    os.environ["NO_INPUT"] = "1"
+
+    baseline = load_baseline(args.baseline)
+
+    if args.update_baseline:
+        rounds, calibrations = [], []
+        for i in range(args.rounds):
+            print(f"\nRound {i + 1} of {args.rounds}")
+            relative, calibration = run_suite(args.sizes, args.repeat, args.seed)
+            rounds.append(relative)
+            calibrations.append(calibration)
+        calibration = statistics.median(calibrations)
+        results, tolerances = record_baseline(rounds, calibration)
+
+        # Sizes not run this time keep their numbers, rescaled to this run's calibration
+        speed = calibration / baseline.get("calibration_ms", calibration)
+        merged = {
+            size: {stage: round(us * speed, 3) for stage, us in stages.items()}
+            for size, stages in baseline.get("results", {}).items()
+        }
+        merged.update(results)
+        merged_tolerances = {**baseline.get("tolerances", {}), **tolerances}
+        with open(args.baseline, "w") as f:
+            json.dump(
+                {
+                    "machine": platform.platform(),
+                    "python": platform.python_version(),
+                    "seed": args.seed,
+                    "repeat": args.repeat,
+                    "rounds": args.rounds,
+                    "calibration_ms": round(calibration, 3),
+                    "unit": "us/activity",
+                    "results": merged,
+                    "tolerances": merged_tolerances,
+                },
+                f,
+                indent=2,
+            )
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        for size, stages in tolerances.items():
+            for stage, tolerance in stages.items():
+                print(f"  {size:>8} {stage:<20} +{tolerance:.0%}")
+        return 0
+
+    relative, calibration = run_suite(args.sizes, args.repeat, args.seed)
+    regressions = compare(to_microseconds(relative, calibration), baseline, calibration, args.tolerance)
+    if regressions:
+        print(f"\n✗ {len(regressions)} regression(s):")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\n✓ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+"""Decoders for the per-activity files in the Strava bulk export (FIT, GPX, TCX)."""
+
+import argparse
+import gzip
+import os
+import struct
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .csv_import import read_activities_csv
+from .streams import StreamStore
+from .utils import parallel_map
+
+SEMICIRCLES_TO_DEGREES = 180.0 / 2**31
+EARTH_RADIUS_METERS = 6371000.0
+
+_GPX_NS = "{http://www.topografix.com/GPX/1/1}"
+_TCX_NS = "{http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2}"
+
+
+def _parse_time(value: str) -> float:
+    return datetime.fromisoformat(value.strip().replace("Z", "+00:00")).timestamp()
+
+
+def _float(value) -> float:
+    return np.nan if value is None else float(value)
+
+
+def _haversine_distance(lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    """Cumulative distance in meters along a track, carrying over missing points."""
+    lat_r, lng_r = np.radians(lat), np.radians(lng)
+    dlat, dlng = np.diff(lat_r), np.diff(lng_r)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat_r[:-1]) * np.cos(lat_r[1:]) * np.sin(dlng / 2) ** 2
+    steps = 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(a))
+    return np.concatenate([[0.0], np.cumsum(np.nan_to_num(steps))])
+
+
+def _to_streams(samples: Dict[str, List[float]]) -> Dict[str, np.ndarray]:
+    """Convert per-sample lists to arrays, dropping streams with no data."""
+    times = np.asarray(samples.pop("time"), dtype=np.float64)
+    streams = {"time": np.rint(times - times[0]).astype(np.int64) if len(times) else times}
+    for name, values in samples.items():
+        arr = np.asarray(values, dtype=np.float64)
+        if arr.size and not np.all(np.isnan(arr)):
+            if name in ("heartrate", "cadence"):
+                arr = np.nan_to_num(arr)
+            streams[name] = arr
+    return streams
+
+
+# Record message (global number 20) fields we keep: field number -> (name, struct code)
+_FIT_RECORD = 20
+_FIT_TIMESTAMP = 253
+_FIT_RECORD_FIELDS = {
+    _FIT_TIMESTAMP: ("time", "I"),
+    0: ("lat", "i"),
+    1: ("lng", "i"),
+    2: ("altitude", "H"),
+    78: ("enhanced_altitude", "I"),
+    3: ("heartrate", "B"),
+    4: ("cadence", "B"),
+    5: ("distance", "I"),
+}
+_FIT_INVALID = {"B": 0xFF, "H": 0xFFFF, "I": 0xFFFFFFFF, "i": 0x7FFFFFFF}
+
+
+def _fit_definition(data: bytes, pos: int, developer: bool) -> Tuple[Tuple, int]:
+    """Parse a FIT definition message into (global number, struct, field names, size)."""
+    endian = ">" if data[pos + 1] else "<"
+    global_num = struct.unpack_from(f"{endian}H", data, pos + 2)[0]
+    num_fields = data[pos + 4]
+    pos += 5
+
+    wanted = _FIT_RECORD_FIELDS if global_num == _FIT_RECORD else {_FIT_TIMESTAMP: ("time", "I")}
+    fmt, names, size = endian, [], 0
+    for _ in range(num_fields):
+        field_num, field_size = data[pos], data[pos + 1]
+        pos += 3
+        size += field_size
+        field = wanted.get(field_num)
+        # Fields with an unexpected size (seen in some newer devices) are skipped
+        if field and struct.calcsize(field[1]) == field_size:
+            fmt += field[1]
+            names.append(field)
+        else:
+            fmt += f"{field_size}x"
+    if developer:
+        num_dev_fields = data[pos]
+        pos += 1
+        for _ in range(num_dev_fields):
+            size += data[pos + 1]
+            fmt += f"{data[pos + 1]}x"
+            pos += 3
+    return (global_num, struct.Struct(fmt), names, size), pos
+
+
+def decode_fit(data: bytes) -> Dict[str, np.ndarray]:
+    """Decode the record messages of a FIT file into streams.
+
+    Only the fields needed for the stream store are decoded; everything else is
+    skipped by size, which makes this tolerant of unknown and oddly sized fields.
+    """
+    samples = {k: [] for k in ("time", "distance", "heartrate", "cadence", "altitude", "lat", "lng")}
+    definitions = {}
+    last_timestamp = 0
+    pos = 0
+    # A file may contain several chained FIT files
+    while pos + 12 <= len(data) and data[pos + 8 : pos + 12] == b".FIT":
+        header_size = data[pos]
+        end = pos + header_size + struct.unpack_from("<I", data, pos + 4)[0]
+        pos += header_size
+        while pos < end:
+            header = data[pos]
+            pos += 1
+            if header & 0x80:
+                # Compressed timestamp header: 5-bit offset from the last timestamp
+                local_num = (header >> 5) & 0x3
+                offset = header & 0x1F
+                timestamp = (last_timestamp & ~0x1F) + offset
+                if offset < (last_timestamp & 0x1F):
+                    timestamp += 0x20
+            else:
+                local_num = header & 0x0F
+                timestamp = None
+                if header & 0x40:
+                    definitions[local_num], pos = _fit_definition(data, pos, bool(header & 0x20))
+                    continue
+
+            if local_num not in definitions:
+                raise ValueError(f"FIT data message at byte {pos - 1} uses undefined local type {local_num}")
+            global_num, layout, names, size = definitions[local_num]
+            if pos + size > len(data):
+                raise ValueError(f"FIT file truncated at byte {len(data)}")
+            values = dict(zip((name for name, _ in names), layout.unpack_from(data, pos)))
+            pos += size
+            for name, code in names:
+                if values[name] == _FIT_INVALID[code]:
+                    values[name] = None
+            if values.get("time") is not None:
+                timestamp = values["time"]
+            if timestamp is None:
+                continue
+            last_timestamp = timestamp
+            if global_num != _FIT_RECORD:
+                continue
+
+            lat, lng = values.get("lat"), values.get("lng")
+            altitude = values.get("enhanced_altitude", values.get("altitude"))
+            samples["time"].append(timestamp)
+            samples["distance"].append(_float(values.get("distance")) / 100)
+            samples["heartrate"].append(_float(values.get("heartrate")))
+            samples["cadence"].append(_float(values.get("cadence")))
+            samples["altitude"].append(np.nan if altitude is None else altitude / 5 - 500)
+            samples["lat"].append(np.nan if lat is None else lat * SEMICIRCLES_TO_DEGREES)
+            samples["lng"].append(np.nan if lng is None else lng * SEMICIRCLES_TO_DEGREES)
+        pos = end + 2  # CRC
+    return _to_streams(samples)
+
+
+def decode_gpx(data: bytes) -> Dict[str, np.ndarray]:
+    """Decode the track points of a GPX file into streams."""
+    samples = {k: [] for k in ("time", "heartrate", "cadence", "altitude", "lat", "lng")}
+    root = ET.fromstring(data)
+    for point in root.iter(f"{_GPX_NS}trkpt"):
+        time = point.find(f"{_GPX_NS}time")
+        if time is None:
+            continue
+        hr = cad = None
+        for el in point.iter():
+            tag = el.tag.rsplit("}", 1)[-1]
+            if tag == "hr":
+                hr = el.text
+            elif tag == "cad":
+                cad = el.text
+        ele = point.find(f"{_GPX_NS}ele")
+        samples["time"].append(_parse_time(time.text))
+        samples["heartrate"].append(_float(hr))
+        samples["cadence"].append(_float(cad))
+        samples["altitude"].append(_float(None if ele is None else ele.text))
+        samples["lat"].append(_float(point.get("lat")))
+        samples["lng"].append(_float(point.get("lon")))
+    streams = _to_streams(samples)
+    if "lat" in streams:
+        streams["distance"] = _haversine_distance(streams["lat"], streams["lng"])
+    return streams
+
+
+def decode_tcx(data: bytes) -> Dict[str, np.ndarray]:
+    """Decode the track points of a TCX file into streams."""
+    samples = {k: [] for k in ("time", "distance", "heartrate", "cadence", "altitude", "lat", "lng")}
+    root = ET.fromstring(data.strip())
+    for point in root.iter(f"{_TCX_NS}Trackpoint"):
+        fields = {}
+        for el in point.iter():
+            fields.setdefault(el.tag.rsplit("}", 1)[-1], el.text)
+        if fields.get("Time") is None:
+            continue
+        samples["time"].append(_parse_time(fields["Time"]))
+        samples["distance"].append(_float(fields.get("DistanceMeters")))
+        samples["heartrate"].append(_float(fields.get("Value")))
+        samples["cadence"].append(_float(fields.get("RunCadence", fields.get("Cadence"))))
+        samples["altitude"].append(_float(fields.get("AltitudeMeters")))
+        samples["lat"].append(_float(fields.get("LatitudeDegrees")))
+        samples["lng"].append(_float(fields.get("LongitudeDegrees")))
+    return _to_streams(samples)
+
+
+def decode_activity_file(path: str) -> Dict[str, np.ndarray]:
+    """Decode an activity file from the bulk export, gzipped or not.
+
+    Args:
+        path: Path to a .fit, .gpx or .tcx file, optionally with a .gz suffix
+
+    Returns:
+        Mapping of stream name to array, in the units of streams.STREAM_SCHEMA
+        (lat/lng in degrees)
+
+    Raises:
+        ValueError: If the file type is not supported
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        data = f.read()
+
+    if name.endswith(".fit"):
+        return decode_fit(data)
+    if name.endswith(".gpx"):
+        return decode_gpx(data)
+    if name.endswith(".tcx"):
+        return decode_tcx(data)
+    raise ValueError(f"Unsupported activity file: {path}")
+
+
+def _decode_job(job: Tuple[str, str]) -> Tuple[str, Optional[Dict[str, np.ndarray]], Optional[str]]:
+    strava_id, path = job
+    try:
+        return strava_id, decode_activity_file(path), None
+    except Exception as e:
+        return strava_id, None, f"{type(e).__name__}: {e}"
+
+
+def archive_files(csv_path: str) -> Iterator[Tuple[str, str]]:
+    """List (strava_id, file path) pairs for the bulk export's activity files.
+
+    Args:
+        csv_path: Path to activities.csv; filenames are relative to its directory
+
+    Yields:
+        Tuples of Strava activity ID and absolute-or-relative file path
+    """
+    base_dir = os.path.dirname(csv_path)
+    for row in read_activities_csv(csv_path, columns=("Activity ID", "Filename")):
+        filename = row["Filename"]
+        path = os.path.join(base_dir, filename)
+        if filename and os.path.exists(path):
+            yield row["Activity ID"], path
+
+
+def build_stream_store(csv_path: str, store: StreamStore, workers: Optional[int] = None):
+    """Decode every archived activity file not yet in the store.
+
+    Decompression and decoding run across a process pool; only this process
+    writes to the store.
+
+    Args:
+        csv_path: Path to activities.csv
+        store: Stream store to write into
+        workers: Number of decoder processes (default: CPU count)
+    """
+    jobs = [job for job in archive_files(csv_path) if job[0] not in store]
+    print(f"Decoding {len(jobs)} activity files ({len(store)} already stored)...")
+
+    written = failed = 0
+    for strava_id, streams, error in parallel_map(_decode_job, jobs, workers=workers, chunksize=8):
+        if error is not None:
+            failed += 1
+            print(f"  Warning: could not decode activity {strava_id}: {error}")
+            continue
+        if not streams or len(streams["time"]) == 0:
+            continue
+        store.write(strava_id, streams)
+        written += 1
+        if written % 100 == 0:
+            store.flush()
+            print(f"  {written} activities decoded")
+
+    store.flush()
+    print(f"\n✓ Complete! Stored {written} activities ({failed} failed)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decode bulk export activity files into the stream store")
+    parser.add_argument("--csv", default=os.path.join("..", "data", "activities.csv"))
+    parser.add_argument("--store", default=os.path.join("..", "data", "streams"))
+    parser.add_argument("--workers", type=int, default=None, help="decoder processes (default: CPU count)")
+    args = parser.parse_args()
+
+    build_stream_store(args.csv, StreamStore(args.store), workers=args.workers)
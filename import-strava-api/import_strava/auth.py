@@ -2,21 +2,38 @@
 
 import json
 import os
+import threading
 import time
 from typing import Optional
 import requests
 
+from .metrics import METRICS
+
+
+DEFAULT_BASE_URL = "https://www.strava.com"
+
+
+def strava_base_url(base_url: Optional[str] = None) -> str:
+    """Server the client talks to: base_url, else $STRAVA_BASE_URL, else Strava itself.
+
+    Pointing STRAVA_BASE_URL at the fake server (python -m import_strava.fake_strava)
+    runs the importer offline.
+    """
+    return (base_url or os.getenv("STRAVA_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+
 
 class StravaAuth:
     """Manages OAuth2 tokens for Strava API authentication."""
 
-    def __init__(self, token_file: str = ".strava_tokens.json"):
+    def __init__(self, token_file: str = ".strava_tokens.json", base_url: Optional[str] = None):
         """Initialize the auth manager.
 
         Args:
             token_file: Path to file for storing OAuth tokens
+            base_url: Server to refresh tokens against (default: see strava_base_url)
         """
         self.token_file = token_file
+        self.base_url = strava_base_url(base_url)
         self.client_id = os.getenv("STRAVA_CLIENT_ID")
         self.client_secret = os.getenv("STRAVA_CLIENT_SECRET")
 
@@ -26,6 +43,9 @@ class StravaAuth:
                 "Please set STRAVA_CLIENT_ID and STRAVA_CLIENT_SECRET environment variables."
             )
 
+        # Serializes token refreshes when requests are made from several threads
+        self._lock = threading.Lock()
+
     def load_tokens(self) -> Optional[dict]:
         """Load tokens from file.
 
@@ -77,7 +97,7 @@ class StravaAuth:
         Raises:
             requests.exceptions.RequestException: If refresh fails
         """
-        url = "https://www.strava.com/oauth/token"
+        url = f"{self.base_url}/oauth/token"
         payload = {
             "client_id": self.client_id,
             "client_secret": self.client_secret,
@@ -85,7 +105,7 @@ class StravaAuth:
             "refresh_token": refresh_token,
         }
 
-        response = requests.post(url, data=payload)
+        response = requests.post(url, data=payload, timeout=30)
         response.raise_for_status()
 
         data = response.json()
@@ -105,6 +125,10 @@ class StravaAuth:
             FileNotFoundError: If no tokens file exists (need to run auth setup first)
             requests.exceptions.RequestException: If token refresh fails
         """
+        with METRICS.span("get_access_token"), self._lock:
+            return self._get_access_token()
+
+    def _get_access_token(self) -> str:
         tokens = self.load_tokens()
 
         if not tokens:
@@ -118,7 +142,8 @@ class StravaAuth:
 
         # Token expired, refresh it
         print("Access token expired, refreshing...")
-        new_tokens = self.refresh_access_token(tokens["refresh_token"])
+        with METRICS.span("token_refresh"):
+            new_tokens = self.refresh_access_token(tokens["refresh_token"])
         self.save_tokens(new_tokens)
         print("Token refreshed successfully")
 
@@ -1,6 +1,13 @@
 import json
 import os
-from typing import Any
+import sqlite3
+from typing import Any, Optional
+
+from .metrics import METRICS
+
+# Interval and gear lookups run once per activity, so they are tallied cheaply
+_LOOKUPS = METRICS.tally("cache_lookups", "version")
+_HITS = METRICS.tally("cache_hits", "version")
 
 
 class Cache:
@@ -18,17 +25,21 @@ class Cache:
         with open(self.cache_file, "w") as file:
             json.dump(self.cache, file, indent=4)
 
-    def get(self, key):
+    def get(self, key, version: Optional[str] = None):
         key = str(key)
         data = self.cache[key]
+        if version is not None and data["version"] != version:
+            raise KeyError(key)
         return data["value"]
 
     def contains(self, key: str, version: str):
         key = str(key)
         data = self.cache.get(key, None)
-        if not data:
-            return False
-        return bool(data["version"] == version)
+        hit = bool(data) and data["version"] == version
+        _LOOKUPS.add(version)
+        if hit:
+            _HITS.add(version)
+        return hit
 
     def set(self, key: str, version: str, value):
         key = str(key)
@@ -36,3 +47,124 @@ class Cache:
             "version": version,
             "value": value,
         }
+
+
+class SqliteCache(Cache):
+    """Cache backed by a SQLite database, mirrored to a JSON file.
+
+    Entries are keyed by (key, version) and read on demand. Every set() is
+    committed immediately, so nothing is lost if the import is interrupted.
+    The JSON file stays the tracked copy: on open, entries that were added or
+    changed there (by a pull or a hand edit) are loaded into the database,
+    and save() writes the database back out in the same format as Cache. The
+    "updated" sequence number is kept in memory, so a write does not have to
+    look at the rest of the table.
+    """
+
+    def __init__(self, db_file: str, json_file: Optional[str] = None):
+        self.db_file = db_file
+        self.json_file = json_file
+        self.conn = sqlite3.connect(db_file)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    updated INTEGER NOT NULL,
+                    PRIMARY KEY (key, version)
+                )
+                """
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS cache_updated ON cache (updated)")
+        row = self.conn.execute("SELECT COALESCE(MAX(updated), 0) FROM cache").fetchone()
+        self._clock = row[0]
+        self._dirty = False
+        if json_file is not None:
+            self.load_json(json_file)
+
+    def load_json(self, cache_file: str):
+        """Load entries from a JSON cache file that are missing from, or differ in, the database."""
+        if not os.path.exists(cache_file):
+            return
+        with open(cache_file, "r") as file:
+            entries = json.load(file)
+        stored = {
+            (key, version): value
+            for key, version, value in self.conn.execute("SELECT key, version, value FROM cache")
+        }
+        rows = []
+        for key, data in entries.items():
+            value = json.dumps(data["value"])
+            if stored.get((key, data["version"])) != value:
+                rows.append((key, data["version"], value, self._tick()))
+        if not rows:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, version, value, updated) VALUES (?, ?, ?, ?)", rows
+            )
+        print(f"Loaded {len(rows)} cache entries from {cache_file}")
+
+    def save(self):
+        """Write the latest entry of every key back to the JSON file, if anything was set."""
+        if self.json_file is None or not self._dirty:
+            return
+        # A key keeps the position of its oldest row, so the file diffs cleanly
+        entries = {}
+        for key, version, value in self.conn.execute(
+            "SELECT key, version, value FROM cache ORDER BY updated"
+        ):
+            entries[key] = {"version": version, "value": json.loads(value)}
+        tmp_path = self.json_file + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(entries, file, indent=4)
+        os.replace(tmp_path, self.json_file)
+        self._dirty = False
+
+    def close(self):
+        self.conn.close()
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def get(self, key, version: Optional[str] = None):
+        key = str(key)
+        if version is None:
+            row = self.conn.execute(
+                "SELECT value FROM cache WHERE key = ? ORDER BY updated DESC LIMIT 1", (key,)
+            ).fetchone()
+        else:
+            row = self.conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND version = ?", (key, version)
+            ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return json.loads(row[0])
+
+    def contains(self, key: str, version: str):
+        key = str(key)
+        row = self.conn.execute(
+            "SELECT 1 FROM cache WHERE key = ? AND version = ?", (key, version)
+        ).fetchone()
+        _LOOKUPS.add(version)
+        if row is None:
+            return False
+        _HITS.add(version)
+        return True
+
+    def set(self, key: str, version: str, value):
+        key = str(key)
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO cache (key, version, value, updated)
+                VALUES (?, ?, ?, ?)
+                """,
+                (key, version, json.dumps(value), self._tick()),
+            )
+        self._dirty = True
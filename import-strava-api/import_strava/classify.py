@@ -0,0 +1,83 @@
+"""Keyword classification of activity text (workout flags, Workout-type routing, search)."""
+
+import re
+from typing import Dict, FrozenSet, Hashable, Iterable, Mapping, Optional, Sequence, Tuple
+
+# Category -> keywords; matching is a case-insensitive substring search
+KEYWORD_TABLE: Dict[str, Tuple[str, ...]] = {
+    # Runs that may be workouts (searched in description, private note and title)
+    "workout": ("workout", "strides", "tempo", "x(", "race", "mile", "4x4", "800m"),
+    # "Workout" activities that are rowing sessions (searched in the title)
+    "row": ("erg", "row"),
+}
+
+
+class KeywordClassifier:
+    """Label text with keyword categories using one precompiled regex per category.
+
+    Each category's keywords are combined into a single alternation, so a
+    text is scanned once per category no matter how many keywords it has.
+    Results are not memoized: a scan is cheap, and an activity's text can
+    change between imports.
+    """
+
+    def __init__(self, table: Mapping[str, Sequence[str]] = KEYWORD_TABLE):
+        """Compile a keyword table.
+
+        Args:
+            table: Mapping of category name to keywords
+        """
+        # Text is lower-cased once per lookup instead of matching with re.IGNORECASE,
+        # which makes Python's regex engine several times slower
+        self.patterns = {
+            category: re.compile(
+                # Longest first, so a keyword is never shadowed by its own prefix
+                "|".join(re.escape(k.lower()) for k in sorted(keywords, key=len, reverse=True))
+            )
+            for category, keywords in table.items()
+        }
+
+    def matches(self, category: str, text: str) -> bool:
+        """Whether text contains any keyword of a category.
+
+        Args:
+            category: Category name from the keyword table
+            text: Text to search
+
+        Returns:
+            True if any keyword of the category occurs in the text
+        """
+        return self.patterns[category].search(text.lower()) is not None
+
+    def labels(self, text: str, categories: Optional[Iterable[str]] = None) -> FrozenSet[str]:
+        """All categories whose keywords occur in text.
+
+        Args:
+            text: Text to search
+            categories: Categories to check (default: all)
+
+        Returns:
+            Set of matching category names
+        """
+        names = self.patterns if categories is None else categories
+        text = text.lower()
+        return frozenset(c for c in names if self.patterns[c].search(text) is not None)
+
+    def classify_batch(
+        self, records: Iterable[Tuple[Hashable, str]], categories: Optional[Iterable[str]] = None
+    ) -> Dict[Hashable, FrozenSet[str]]:
+        """Label a batch of (strava_id, text) records.
+
+        Args:
+            records: Pairs of Strava ID and text
+            categories: Categories to check (default: all)
+
+        Returns:
+            Mapping of Strava ID to its set of matching categories
+        """
+        names = list(self.patterns if categories is None else categories)
+        return {strava_id: self.labels(text, names) for strava_id, text in records}
+
+
+# Shared classifier built from the default keyword table
+CLASSIFIER = KeywordClassifier()
@@ -0,0 +1,142 @@
+"""Compact columnar encoding of the site export.
+
+Instead of one object per record, every field becomes one array with an entry
+per record. Repetitive strings (activity type, title, shoe) are stored once in
+a shared dictionary and referenced by index, and the field names appear once
+instead of once per record. Which records lack a field is stored separately
+from the values, so a field that is null and a field that is missing both
+survive the round trip. The front decodes it back into ordinary records.
+"""
+
+import json
+import os
+from typing import Dict, Iterable, List, Tuple
+
+COLUMNAR_VERSION = 2
+
+# Fields whose values repeat a lot and are worth interning
+DICTIONARY_FIELDS = ("type", "title", "shoe")
+
+
+def _encode(value, dictionary: Dict[str, int]):
+    if not isinstance(value, str):
+        return value
+    if value not in dictionary:
+        dictionary[value] = len(dictionary)
+    return dictionary[value]
+
+
+def _ranges(indices: Iterable[int]) -> List[List[int]]:
+    """Collapse ascending indices into [start, stop) ranges."""
+    ranges: List[List[int]] = []
+    for i in indices:
+        if ranges and ranges[-1][1] == i:
+            ranges[-1][1] = i + 1
+        else:
+            ranges.append([i, i + 1])
+    return ranges
+
+
+def to_columns(records: Iterable[Dict]) -> Dict:
+    """Turn a list of records into one array per field.
+
+    Top-level fields go under "columns" and the fields of each record's data
+    under "data". A record without a field gets null in that column, and its
+    index is listed for that field under "absent" (as [start, stop) ranges),
+    so it can be told apart from a field that is present with a null value.
+
+    Args:
+        records: Records as written to strava_export.json
+
+    Returns:
+        JSON-serializable columnar payload
+    """
+    records = list(records)
+    dictionaries: Dict[str, Dict[str, int]] = {name: {} for name in DICTIONARY_FIELDS}
+
+    def columns_of(rows: List[Dict]) -> Tuple[Dict[str, List], Dict[str, List[List[int]]]]:
+        names: Dict[str, None] = {}
+        for row in rows:
+            names.update(dict.fromkeys(row))
+        columns = {}
+        absent = {}
+        for name in names:
+            values = [row.get(name) for row in rows]
+            if name in dictionaries:
+                values = [_encode(value, dictionaries[name]) for value in values]
+            columns[name] = values
+            # Fields come and go with the record format, so records lacking
+            # one are mostly consecutive and listed as ranges
+            missing = _ranges(i for i, row in enumerate(rows) if name not in row)
+            if missing:
+                absent[name] = missing
+        return columns, absent
+
+    data_rows = [record.get("data") or {} for record in records]
+    top_rows = [{k: v for k, v in record.items() if k != "data"} for record in records]
+    columns, absent_columns = columns_of(top_rows)
+    data, absent_data = columns_of(data_rows)
+    return {
+        "version": COLUMNAR_VERSION,
+        "count": len(records),
+        # Dicts keep insertion order, so each string's position is its index
+        "dictionaries": {name: list(values) for name, values in dictionaries.items()},
+        "columns": columns,
+        "data": data,
+        "absent": {"columns": absent_columns, "data": absent_data},
+    }
+
+
+def from_columns(payload: Dict) -> List[Dict]:
+    """Rebuild records from a columnar payload.
+
+    A record gets every field it had, including fields whose value was null,
+    and none of the fields listed as absent for it.
+
+    Args:
+        payload: Output of to_columns
+
+    Returns:
+        List of records in their original order
+
+    Raises:
+        ValueError: If the payload has an unknown version
+    """
+    if payload.get("version") != COLUMNAR_VERSION:
+        raise ValueError(f"Unsupported columnar version: {payload.get('version')}")
+    dictionaries = payload["dictionaries"]
+
+    def decode(name: str, value):
+        if name in dictionaries and isinstance(value, int) and not isinstance(value, bool):
+            return dictionaries[name][value]
+        return value
+
+    def rows_of(columns: Dict[str, List], absent: Dict[str, List[List[int]]]) -> List[Dict]:
+        rows = [{} for _ in range(payload["count"])]
+        for name, values in columns.items():
+            present = [True] * payload["count"]
+            for start, stop in absent.get(name, ()):
+                present[start:stop] = [False] * (stop - start)
+            for row, value, has in zip(rows, values, present):
+                if has:
+                    row[name] = decode(name, value)
+        return rows
+
+    absent = payload["absent"]
+    records = rows_of(payload["columns"], absent["columns"])
+    for record, data in zip(records, rows_of(payload["data"], absent["data"])):
+        record["data"] = data
+    return records
+
+
+def export_columnar(records: Iterable[Dict], path: str):
+    """Write records as a compact columnar JSON file.
+
+    Args:
+        records: Records as written to strava_export.json
+        path: Output path, conventionally strava_export.columns.json
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(to_columns(records), f, separators=(",", ":"))
+    os.replace(tmp_path, path)
@@ -0,0 +1,195 @@
+"""Streaming importer for the Strava bulk export (data/activities.csv)."""
+
+import argparse
+import csv
+import os
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .cache import Cache, SqliteCache
+from .import_strava import REVIEW_QUEUE_PATH, extract_relevant_activities, open_store
+from .metrics import METRICS, add_metrics_arguments
+from .site_export import add_publish_argument, publish_if_requested
+from .store import ActivityStore, ReviewQueue, activity_key
+from .streams import StreamStore
+
+# Fields the activity parsers read, i.e. the same shape StravaAPI.normalize_activity produces
+NORMALIZED_COLUMNS = (
+    "Activity ID",
+    "Activity Date",
+    "Activity Name",
+    "Activity Type",
+    "Activity Description",
+    "Activity Private Note",
+    "Distance",
+    "Moving Time",
+    "Elapsed Time",
+    "Average Heart Rate",
+    "Max Heart Rate",
+    "Average Temperature",
+    "Apparent Temperature",
+    "Activity Gear",
+)
+
+
+def resolve_columns(
+    header: List[str], columns: Sequence[str] = NORMALIZED_COLUMNS
+) -> Dict[str, Tuple[int, ...]]:
+    """Map each requested field to its column indices in the export header.
+
+    The bulk export repeats some column names (Distance, Elapsed Time, Max Heart
+    Rate, Relative Effort, Commute). The first occurrence is the rounded display
+    value (e.g. distance in km) and the last is the raw value in SI units, which
+    is what the parsers expect, so the last occurrence comes first. Some raw
+    columns are only filled for newer activities, so earlier occurrences are
+    kept as fallbacks (in the current export, 815 rows have Max Heart Rate only
+    in its first column).
+
+    Args:
+        header: Header row of the CSV export
+        columns: Field names to resolve
+
+    Returns:
+        Dictionary mapping each requested name to its column indices, in the
+        order they should be tried
+
+    Raises:
+        ValueError: If a required column is missing from the header
+    """
+    indices: Dict[str, List[int]] = {}
+    for i, name in enumerate(header):
+        indices.setdefault(name, []).insert(0, i)
+    missing = [name for name in columns if name not in indices]
+    if missing:
+        raise ValueError(f"Activities CSV is missing columns: {', '.join(missing)}")
+    return {name: tuple(indices[name]) for name in columns}
+
+
+def _first_filled(row: List[str], indices: Tuple[int, ...]) -> str:
+    for i in indices:
+        if row[i]:
+            return row[i]
+    return ""
+
+
+def read_activities_csv(
+    csv_path: str, columns: Sequence[str] = NORMALIZED_COLUMNS
+) -> Iterator[Dict[str, str]]:
+    """Stream normalized activity rows from a Strava bulk export CSV.
+
+    Columns are resolved once from the header; rows are read one at a time so
+    memory use does not depend on the size of the export. A repeated column
+    takes its value from the first occurrence that is filled in for the row
+    (see resolve_columns).
+
+    Args:
+        csv_path: Path to activities.csv
+        columns: Field names to read (default: the fields the parsers expect)
+
+    Yields:
+        Activity dictionaries in the CSV format expected by the parsers
+    """
+    # Universal newlines on purpose: multi-line descriptions are stored with \r\n
+    with open(csv_path, "r", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        resolved = resolve_columns(next(reader), columns)
+        single = [(name, indices[0]) for name, indices in resolved.items() if len(indices) == 1]
+        repeated = [(name, indices) for name, indices in resolved.items() if len(indices) > 1]
+        for row in reader:
+            if not row:
+                continue
+            activity = {name: row[i] for name, i in single}
+            for name, indices in repeated:
+                activity[name] = _first_filled(row, indices)
+            yield activity
+
+
+def import_activities_csv(
+    csv_path: str,
+    store: ActivityStore,
+    cache: Cache,
+    workers: Optional[int] = None,
+    streams: Optional[StreamStore] = None,
+    review_queue: Optional[ReviewQueue] = None,
+) -> int:
+    """Rebuild the activity store from the bulk export CSV.
+
+    Activities from the CSV supersede stored entries for the same activity;
+    activities only present in the store (e.g. newer API imports) are kept.
+
+    Args:
+        csv_path: Path to activities.csv
+        store: ActivityStore holding the processed activities
+        cache: Cache instance for storing workout intervals
+        workers: Number of worker processes to parse with (default: CPU count;
+            1 parses inline)
+        streams: Stream store used to detect workout intervals (optional)
+        review_queue: Queue runs needing interval review here instead of
+            prompting (optional)
+
+    Returns:
+        Number of activities imported
+    """
+    print(f"Reading activities from {csv_path}...")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    # Some older entries predate strava_id and are keyed by type and date instead
+    superseded = []
+
+    def find_legacy(activities: Iterator[Dict]) -> Iterator[Dict]:
+        for activity in activities:
+            legacy = activity_key({"type": activity["type"], "date": activity["date"], "data": {}})
+            if legacy in store:
+                superseded.append(legacy)
+            yield activity
+
+    processed = store.extend(
+        find_legacy(
+            extract_relevant_activities(
+                read_activities_csv(csv_path),
+                cache,
+                workers=workers,
+                streams=streams,
+                review_queue=review_queue,
+            )
+        )
+    )
+    store.remove(*superseded)
+    print(f"  {processed} activities processed successfully")
+    if review_queue is not None:
+        review_queue.save()
+        print(f"  {len(review_queue)} runs waiting for interval review")
+
+    print(f"\n✓ Complete! Total activities: {len(store)}")
+    return processed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import the Strava bulk export CSV")
+    parser.add_argument("--csv", default=os.path.join("..", "data", "activities.csv"))
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    parser.add_argument(
+        "--interactive",
+        action="store_true",
+        help="prompt for workout intervals during the import instead of queueing them for review",
+    )
+    add_publish_argument(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    cache_path = os.path.join("..", "strava_cache.sqlite3")
+    cache = SqliteCache(cache_path, json_file=os.path.join("..", "strava_cache.json"))
+    export_path = os.path.join("..", "front", "src", "data", "strava_export.json")
+    store = open_store(os.path.join("..", "data", "store"), export_path)
+
+    streams = StreamStore(os.path.join("..", "data", "streams"))
+    review_queue = None if args.interactive else ReviewQueue(REVIEW_QUEUE_PATH)
+
+    try:
+        with METRICS.span("import"):
+            import_activities_csv(
+                args.csv, store, cache, workers=args.workers, streams=streams, review_queue=review_queue
+            )
+        publish_if_requested(store, export_path, args.publish)
+    finally:
+        cache.save()
+        METRICS.write(args.metrics, args.prometheus)
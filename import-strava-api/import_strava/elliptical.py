@@ -1,16 +1,19 @@
-from .utils import parse_date, extract_common_data
+from .parsers import register_parser
+from .utils import activity_timestamp, format_date, extract_common_data, parse_number
 
+@register_parser("Elliptical", version=1)
 def parse_elliptical(activity):
+    timestamp = activity_timestamp(activity)
     elliptical = {
-        "version": 1,
         "type": "elliptical",
-        "date": parse_date(activity["Activity Date"]),
+        "date": format_date(timestamp),
+        "timestamp": timestamp,
         "data": {
             **extract_common_data(activity),
             "description": activity["Activity Description"],
-            "distance": activity["Distance"],
-            "moving_time": activity["Moving Time"],
-            "average_heartrate": activity["Average Heart Rate"],
+            "distance": parse_number(activity["Distance"]),
+            "moving_time": parse_number(activity["Moving Time"]),
+            "average_heartrate": parse_number(activity["Average Heart Rate"]),
         },
     }
     return elliptical
@@ -0,0 +1,334 @@
+"""Local stand-in for the Strava API, for exercising the importer offline.
+
+Serves /api/v3/athlete/activities, /api/v3/activities/{id},
+/api/v3/activities/{id}/streams, /api/v3/athlete, /api/v3/gear/{id} and
+/oauth/token from deterministic synthetic activities (see synthetic.py) or a
+JSON fixture file. Latency, the advertised rate limits and injected 429s are
+configurable, so paging, retries, token refresh and large backfills can be
+run at full speed without a live account or its daily quota.
+
+Usage:
+    python -m import_strava.fake_strava --activities 5000 --fail-every 20
+    STRAVA_BASE_URL=http://127.0.0.1:8766 python -m import_strava.import_strava
+"""
+
+import argparse
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from .synthetic import GEAR, api_activities
+
+SHORT_WINDOW = 15 * 60
+DAILY_WINDOW = 24 * 60 * 60
+
+# Fields the summary listing leaves out; they are only in /activities/{id}
+DETAIL_ONLY_FIELDS = ("description", "private_note", "average_temp", "gear")
+
+# Activity types that are recorded without GPS or sensors, so have no streams
+NO_STREAM_TYPES = ("WeightTraining", "Workout")
+
+
+def _epoch(iso: str) -> int:
+    return int(datetime.fromisoformat(iso.replace("Z", "+00:00")).timestamp())
+
+
+def _gear(gear_id: str) -> Dict:
+    return {"id": gear_id, "name": GEAR[gear_id], "primary": False, "distance": 0.0}
+
+
+def make_streams(activity: Dict) -> Dict[str, Dict]:
+    """Deterministic per-second streams for an activity, keyed by type as with key_by_type=true."""
+    rng = random.Random(activity["id"])
+    seconds = int(activity.get("moving_time") or 0)
+    speed = (activity.get("distance") or 0.0) / max(seconds, 1)
+    base_hr = activity.get("average_heartrate") or 140.0
+    time_stream = list(range(seconds + 1))
+    streams = {
+        "time": time_stream,
+        "distance": [round(t * speed, 1) for t in time_stream],
+        "heartrate": [round(base_hr + rng.uniform(-8, 8)) for _ in time_stream],
+        "cadence": [rng.randint(84, 92) for _ in time_stream],
+        "altitude": [round(100 + 5 * rng.random(), 1) for _ in time_stream],
+        "latlng": [[round(42.44 + t * 1e-5, 6), round(-76.5 + t * 1e-5, 6)] for t in time_stream],
+    }
+    return {
+        name: {"data": data, "series_type": "time", "original_size": len(data), "resolution": "high"}
+        for name, data in streams.items()
+    }
+
+
+class FakeStravaServer(ThreadingHTTPServer):
+    """HTTP server holding the fake account's activities, tokens and request counters."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        activities: List[Dict],
+        latency: float = 0.0,
+        short_limit: int = 100_000,
+        daily_limit: int = 1_000_000,
+        fail_every: int = 0,
+        retry_after: Optional[int] = 0,
+        token_lifetime: int = 6 * 60 * 60,
+    ):
+        """Create the server.
+
+        Args:
+            address: (host, port) to listen on; port 0 picks a free port
+            activities: Detailed activities in Strava API format, in any order
+            latency: Seconds to wait before answering each request
+            short_limit: Requests per 15 minutes advertised and enforced
+            daily_limit: Requests per day advertised and enforced
+            fail_every: Answer every Nth API request with a 429 (0 disables)
+            retry_after: Retry-After seconds sent with injected 429s (None omits the header)
+            token_lifetime: Seconds until an access token issued here expires
+        """
+        super().__init__(address, FakeStravaHandler)
+        # Newest first, as Strava lists them without "after"
+        self.activities = sorted(activities, key=lambda a: _epoch(a["start_date"]), reverse=True)
+        self.by_id = {int(a["id"]): a for a in self.activities}
+        self.start_epochs = [_epoch(a["start_date"]) for a in self.activities]
+        self.latency = latency
+        self.short_limit = short_limit
+        self.daily_limit = daily_limit
+        self.fail_every = fail_every
+        self.retry_after = retry_after
+        self.token_lifetime = token_lifetime
+
+        # Access token -> expiry; tokens not issued here are accepted as they are
+        self.tokens: Dict[str, int] = {}
+        self.requests = 0
+        self.throttled = 0
+        self.refreshes = 0
+        self._windows = {SHORT_WINDOW: (0, 0), DAILY_WINDOW: (0, 0)}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self) -> Tuple[Tuple[int, int], bool]:
+        """Count an API request against both windows.
+
+        Returns:
+            ((short usage, daily usage), whether to inject a 429)
+        """
+        now = int(time.time())
+        with self._lock:
+            self.requests += 1
+            usage = []
+            for window, (start, used) in self._windows.items():
+                current = now - now % window
+                used = used + 1 if start == current else 1
+                self._windows[window] = (current, used)
+                usage.append(used)
+            injected = bool(self.fail_every) and self.requests % self.fail_every == 0
+            return (usage[0], usage[1]), injected
+
+    def issue_token(self) -> Dict:
+        expires_at = int(time.time()) + self.token_lifetime
+        access_token = f"fake-{secrets.token_hex(8)}"
+        with self._lock:
+            self.tokens[access_token] = expires_at
+            self.refreshes += 1
+        return {
+            "token_type": "Bearer",
+            "access_token": access_token,
+            "refresh_token": f"fake-refresh-{secrets.token_hex(8)}",
+            "expires_at": expires_at,
+            "expires_in": self.token_lifetime,
+        }
+
+    def token_valid(self, token: str) -> bool:
+        expires_at = self.tokens.get(token)
+        return expires_at is None or expires_at > time.time()
+
+    def list_activities(self, params: Dict[str, str]) -> List[Dict]:
+        """One page of /athlete/activities, as summaries."""
+        per_page = min(int(params.get("per_page", 30)), 200)
+        page = max(int(params.get("page", 1)), 1)
+        after = int(params["after"]) if params.get("after") else None
+        before = int(params["before"]) if params.get("before") else None
+
+        selected = [
+            activity
+            for activity, start in zip(self.activities, self.start_epochs)
+            if (after is None or start > after) and (before is None or start < before)
+        ]
+        if after is not None:
+            # Strava lists oldest first when asked for activities after a time
+            selected.reverse()
+        page_activities = selected[(page - 1) * per_page : page * per_page]
+        return [
+            {k: v for k, v in activity.items() if k not in DETAIL_ONLY_FIELDS}
+            for activity in page_activities
+        ]
+
+    def detail(self, activity: Dict) -> Dict:
+        detailed = dict(activity)
+        if activity.get("gear_id") in GEAR:
+            detailed["gear"] = _gear(activity["gear_id"])
+        return detailed
+
+
+class FakeStravaHandler(BaseHTTPRequestHandler):
+    server: FakeStravaServer
+
+    ROUTES = (
+        (re.compile(r"^/api/v3/athlete/activities$"), "activities"),
+        (re.compile(r"^/api/v3/activities/(\d+)$"), "activity"),
+        (re.compile(r"^/api/v3/activities/(\d+)/streams$"), "streams"),
+        (re.compile(r"^/api/v3/athlete$"), "athlete"),
+        (re.compile(r"^/api/v3/gear/(\w+)$"), "gear"),
+    )
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _not_found(self, headers: Optional[Dict[str, str]] = None):
+        self._send(404, {"message": "Record Not Found", "errors": []}, headers)
+
+    def do_POST(self):
+        time.sleep(self.server.latency)
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        if urlparse(self.path).path != "/oauth/token":
+            self._not_found()
+        elif form.get("grant_type") != ["refresh_token"] or not form.get("refresh_token"):
+            self._send(400, {"message": "Bad Request", "errors": [{"field": "grant_type"}]})
+        else:
+            self._send(200, self.server.issue_token())
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        auth = self.headers.get("Authorization", "")
+        if not auth.startswith("Bearer ") or not self.server.token_valid(auth[len("Bearer "):]):
+            self._send(401, {"message": "Authorization Error", "errors": [{"code": "invalid"}]})
+            return
+
+        server = self.server
+        (short_usage, daily_usage), injected = server.count_request()
+        limit_headers = {
+            "X-RateLimit-Limit": f"{server.short_limit},{server.daily_limit}",
+            "X-RateLimit-Usage": f"{short_usage},{daily_usage}",
+            "X-ReadRateLimit-Limit": f"{server.short_limit},{server.daily_limit}",
+            "X-ReadRateLimit-Usage": f"{short_usage},{daily_usage}",
+        }
+        if injected or short_usage > server.short_limit or daily_usage > server.daily_limit:
+            with server._lock:
+                server.throttled += 1
+            headers = dict(limit_headers)
+            if injected and server.retry_after is not None:
+                headers["Retry-After"] = str(server.retry_after)
+            self._send(429, {"message": "Rate Limit Exceeded", "errors": []}, headers)
+            return
+
+        for pattern, route in self.ROUTES:
+            match = pattern.match(url.path)
+            if match:
+                break
+        else:
+            self._not_found(limit_headers)
+            return
+
+        if route == "activities":
+            self._send(200, server.list_activities(params), limit_headers)
+        elif route == "athlete":
+            shoes = [_gear(g) for g in GEAR if g.startswith("g")]
+            bikes = [_gear(g) for g in GEAR if g.startswith("b")]
+            self._send(200, {"id": 1, "firstname": "Fake", "shoes": shoes, "bikes": bikes}, limit_headers)
+        elif route == "gear":
+            if match.group(1) in GEAR:
+                self._send(200, _gear(match.group(1)), limit_headers)
+            else:
+                self._not_found(limit_headers)
+        else:
+            activity = server.by_id.get(int(match.group(1)))
+            if activity is None:
+                self._not_found(limit_headers)
+            elif route == "activity":
+                self._send(200, server.detail(activity), limit_headers)
+            elif activity["type"] in NO_STREAM_TYPES:
+                self._not_found(limit_headers)
+            else:
+                self._send(200, make_streams(activity), limit_headers)
+
+
+def load_fixture(path: str) -> List[Dict]:
+    """Read detailed activities (a JSON list in Strava API format) from a fixture file."""
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def start_fake_server(
+    activities: Optional[List[Dict]] = None, port: int = 0, **kwargs
+) -> FakeStravaServer:
+    """Serve a fake Strava API from a background thread; call .shutdown() when done.
+
+    Args:
+        activities: Detailed activities to serve (default: 1000 synthetic ones)
+        port: Port to listen on (default: any free port)
+        **kwargs: Passed on to FakeStravaServer
+
+    Returns:
+        The running server; its base_url is what STRAVA_BASE_URL should be set to
+    """
+    if activities is None:
+        activities = api_activities(1000)
+    server = FakeStravaServer(("127.0.0.1", port), activities, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake Strava API for offline testing")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--fixture", default=None, help="JSON list of detailed activities to serve")
+    parser.add_argument("--activities", type=int, default=1000, help="synthetic activities (without --fixture)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic activities")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--short-limit", type=int, default=100_000, help="requests per 15 minutes")
+    parser.add_argument("--daily-limit", type=int, default=1_000_000, help="requests per day")
+    parser.add_argument("--fail-every", type=int, default=0, help="inject a 429 every N requests")
+    parser.add_argument("--retry-after", type=int, default=0, help="Retry-After seconds on injected 429s")
+    parser.add_argument("--token-lifetime", type=int, default=6 * 60 * 60, help="seconds until issued tokens expire")
+    args = parser.parse_args()
+
+    activities = load_fixture(args.fixture) if args.fixture else api_activities(args.activities, args.seed)
+    server = FakeStravaServer(
+        ("127.0.0.1", args.port),
+        activities,
+        latency=args.latency,
+        short_limit=args.short_limit,
+        daily_limit=args.daily_limit,
+        fail_every=args.fail_every,
+        retry_after=args.retry_after,
+        token_lifetime=args.token_lifetime,
+    )
+    print(f"Serving {len(activities)} activities on {server.base_url}")
+    print(f"  STRAVA_BASE_URL={server.base_url} python -m import_strava.import_strava")
+    server.serve_forever()
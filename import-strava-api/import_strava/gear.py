@@ -0,0 +1,141 @@
+"""Persistent gear ID -> gear name lookup, so resolving gear costs no API calls per activity."""
+
+import csv
+import os
+from typing import Dict, Iterable, Optional, Set
+
+import requests
+
+from .cache import Cache
+
+GEAR_CACHE_VERSION = "gearv1"
+
+# /gear/{id} statuses that will not change on a retry: deleted gear, or gear of another athlete
+GONE_STATUSES = (403, 404)
+
+
+def _normalize_name(name: str) -> str:
+    return " ".join(name.split()).lower()
+
+
+def read_gear_names(csv_paths: Iterable[str]) -> Set[str]:
+    """Read gear names from the bulk export's shoes.csv / bikes.csv.
+
+    The export names gear by its nickname, or by brand and model when it has
+    none, which is also how activities.csv refers to it.
+
+    Args:
+        csv_paths: Paths to shoes.csv / bikes.csv (missing files are skipped)
+
+    Returns:
+        Set of gear names
+    """
+    names = set()
+    for path in csv_paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader, None)  # Header: Name, Brand, Model, Default Sport Types
+            for row in reader:
+                if len(row) < 3:
+                    continue
+                name = " ".join(row[0].split()) or " ".join(f"{row[1]} {row[2]}".split())
+                if name:
+                    names.add(name)
+    return names
+
+
+class GearLookup:
+    """Resolve Strava gear IDs to names, remembering every answer in the cache.
+
+    Unknown IDs are first looked up in the athlete profile, which lists all
+    active shoes and bikes in one request; retired gear falls back to
+    /gear/{id}. Each gear ID is fetched at most once, ever: gear the API
+    refuses (404 for deleted gear, 403 for someone else's) is cached as None,
+    so it is not requested again on every import. Other failures, such as a
+    dropped connection, are only remembered for the rest of the run.
+    """
+
+    def __init__(self, cache: Cache, api=None, known_names: Iterable[str] = ()):
+        """Initialize the gear lookup.
+
+        Args:
+            cache: Cache the resolved names are stored in
+            api: StravaAPI used to resolve IDs missing from the cache (optional)
+            known_names: Gear names from the bulk export; API gear is given the
+                matching export name so old and new activities agree
+        """
+        self.cache = cache
+        self.api = api
+        self.known_names: Dict[str, str] = {_normalize_name(n): n for n in known_names}
+        self._athlete_seeded = False
+        self._failed: Set[str] = set()
+
+    @staticmethod
+    def _key(gear_id: str) -> str:
+        return f"gear:{gear_id}"
+
+    def gear_name(self, gear: Dict) -> str:
+        """Display name of a gear dictionary from the API, preferring the export's name."""
+        candidates = [
+            gear.get("name") or "",
+            gear.get("nickname") or "",
+            f"{gear.get('brand_name') or ''} {gear.get('model_name') or ''}",
+        ]
+        for candidate in candidates:
+            known = self.known_names.get(_normalize_name(candidate))
+            if known:
+                return known
+        return " ".join(candidates[0].split())
+
+    def _resolved(self, key: str) -> bool:
+        """Whether a gear key has a cached name (not just a cached lookup failure)."""
+        if not self.cache.contains(key, GEAR_CACHE_VERSION):
+            return False
+        return self.cache.get(key, GEAR_CACHE_VERSION) is not None
+
+    def remember(self, gear: Dict):
+        """Cache the name of a gear dictionary that carries an "id", unless already known."""
+        if gear.get("id") and not self._resolved(self._key(gear["id"])):
+            self.cache.set(self._key(gear["id"]), GEAR_CACHE_VERSION, self.gear_name(gear))
+
+    def seed_from_athlete(self, athlete: Dict):
+        """Cache every shoe and bike listed in an /athlete response."""
+        for gear in (athlete.get("shoes") or []) + (athlete.get("bikes") or []):
+            self.remember(gear)
+        self._athlete_seeded = True
+
+    def name(self, gear_id: Optional[str]) -> str:
+        """Name of a gear ID, fetching it only if it has never been seen.
+
+        Args:
+            gear_id: Strava gear ID (e.g. "g12345"), or None
+
+        Returns:
+            The gear name, or "" if there is no gear or it cannot be resolved
+        """
+        if not gear_id:
+            return ""
+        key = self._key(gear_id)
+        if self.cache.contains(key, GEAR_CACHE_VERSION):
+            return self.cache.get(key, GEAR_CACHE_VERSION) or ""
+        if self.api is None or gear_id in self._failed:
+            return ""
+
+        try:
+            if not self._athlete_seeded:
+                self.seed_from_athlete(self.api.get_athlete())
+                if self.cache.contains(key, GEAR_CACHE_VERSION):
+                    return self.cache.get(key, GEAR_CACHE_VERSION)
+            gear = self.api.get_gear(gear_id)
+        except requests.exceptions.RequestException as e:
+            print(f"Warning: Could not look up gear {gear_id}: {e}")
+            response = getattr(e, "response", None)
+            if self._athlete_seeded and response is not None and response.status_code in GONE_STATUSES:
+                # The gear itself is gone or not ours; asking again will not help
+                self.cache.set(key, GEAR_CACHE_VERSION, None)
+            self._failed.add(gear_id)
+            return ""
+        self.remember({**gear, "id": gear_id})
+        return self.cache.get(key, GEAR_CACHE_VERSION)
@@ -1,63 +1,76 @@
 """Strava data import with API integration."""
 
+import argparse
 import json
 import os
-from typing import Any, List, Dict, Set
+from collections.abc import Iterable, Sequence
+from datetime import datetime
+from typing import Iterator, List, Dict, Optional, Set
 from dotenv import load_dotenv
 
-from .run import parse_run
-from .utils import parse_date, extract_common_data
-from .cache import Cache
-from .bike import parse_bike
-from .elliptical import parse_elliptical
+from .run import parse_run_for_workout
+from .utils import parallel_map, parse_display_timestamp, typed_numbers
+from .cache import Cache, SqliteCache
+from .gear import GearLookup, read_gear_names
+from .metrics import METRICS, add_metrics_arguments
+from .parsers import PARSERS, load_parsers, parse_activity
 from .auth import StravaAuth
+from .site_export import add_publish_argument, publish_if_requested
+from .store import ActivityStore, ReviewQueue
+from .streams import StreamStore
 from .strava_api import StravaAPI
 
+load_parsers()
 
-def extract_relevant_activities(activities: Any, cache: Cache):
+REVIEW_QUEUE_PATH = os.path.join("..", "data", "review_queue.json")
+
+# Activities uploaded late can start a little before the newest one already synced
+WATERMARK_OVERLAP = 86400
+
+
+def extract_relevant_activities(
+    activities: Iterable[Dict],
+    cache: Cache,
+    workers: Optional[int] = None,
+    streams: Optional[StreamStore] = None,
+    review_queue: Optional[ReviewQueue] = None,
+) -> Iterator[Dict]:
     """Extract and parse relevant activities from raw activity data.
 
+    Each activity is handled by the parser registered for its type (see
+    parsers.register_parser); types without a parser are skipped. This is a
+    lazy generator, so records can be streamed into the activity store
+    without holding the whole history in memory.
+
+    Lists are processed newest-first (the API and CSV both list oldest-first);
+    any other iterable, such as a streaming CSV reader, is consumed in order.
+
     Args:
-        activities: List of activity dictionaries in CSV format
+        activities: Activity dictionaries in CSV format
         cache: Cache instance for storing workout intervals
+        workers: Number of worker processes to parse with (default: parse inline)
+        streams: Stream store used to detect workout intervals instead of
+            prompting for them (optional)
+        review_queue: Queue flagged runs here instead of prompting (optional)
 
-    Returns:
-        List of processed activity dictionaries
+    Yields:
+        Processed activity dictionaries
     """
-    res = []
-    for activity in reversed(activities):
-        if activity["Activity Type"] == "Run":
-            run = parse_run(activity, cache)
-            if run:
-                res.append(run)
-        elif activity["Activity Type"] == "Ride":
-            run = parse_bike(activity)
-            if run:
-                res.append(run)
-        elif activity["Activity Type"] == "Elliptical":
-            act = parse_elliptical(activity)
-            if act:
-                res.append(act)
-        elif activity["Activity Type"] == "Workout":
-            title = str(activity["Activity Name"])
-            lower_title = title.lower()
-            if "erg" in lower_title or "row" in lower_title:
-                row = {
-                    "version": 1,
-                    "type": "row",
-                    "date": parse_date(activity["Activity Date"]),
-                    "data": {
-                        **extract_common_data(activity),
-                        "description": activity["Activity Description"],
-                        "moving_time": activity["Moving Time"],
-                        "elapsed_time": activity["Elapsed Time"],
-                        "average_heart_rate": activity["Average Heart Rate"],
-                        "max_heart_rate": activity["Max Heart Rate"],
-                    },
-                }
-                res.append(row)
-
-    return res
+    if isinstance(activities, Sequence):
+        activities = reversed(activities)
+
+    if workers is None:
+        built = map(parse_activity, activities)
+    else:
+        built = parallel_map(parse_activity, activities, workers=workers, initializer=load_parsers)
+
+    for activity in built:
+        if not activity:
+            continue
+        if activity["type"] == "run":
+            # Workout intervals may prompt for input, so they stay in this process
+            activity = parse_run_for_workout(activity, cache, streams, review_queue)
+        yield activity
 
 
 def load_existing_json(export_path: str) -> tuple[List[Dict], Set[str]]:
@@ -85,113 +98,218 @@ def load_existing_json(export_path: str) -> tuple[List[Dict], Set[str]]:
     return existing_activities, processed_ids
 
 
-def read_strava_api_incremental(export_path: str, cache: Cache):
-    """Fetch new activities from Strava API and append to existing JSON.
+def open_store(store_dir: str, export_path: str) -> ActivityStore:
+    """Open the activity store, seeding it from the JSON export on first use.
 
-    This function:
-    1. Loads existing JSON file and extracts processed activity IDs
-    2. Fetches activities from Strava API
-    3. Filters out already-processed activities
-    4. Processes new activities through existing parsers
-    5. Appends new activities to existing JSON
-    6. Saves updated JSON
+    A store that is mostly superseded records (from review patches and
+    re-imports) is compacted first.
 
     Args:
+        store_dir: Directory of the activity store
         export_path: Path to the JSON export file
+
+    Returns:
+        ActivityStore instance
+    """
+    store = ActivityStore(store_dir)
+    if store.compact(min_garbage=ActivityStore.COMPACT_GARBAGE):
+        print(f"Compacted activity store to {len(store)} records")
+    if len(store) == 0 and os.path.exists(export_path):
+        existing_activities, _ = load_existing_json(export_path)
+        print(f"Seeding activity store from {export_path}...")
+        seeded = []
+        for activity in existing_activities:
+            activity = typed_numbers(activity)
+            if "timestamp" not in activity:
+                activity["timestamp"] = parse_display_timestamp(activity["date"])
+            seeded.append(activity)
+        store.extend(reversed(seeded))
+    return store
+
+
+def update_watermark(store: ActivityStore, api_activities: List[Dict], retry: Iterable[Dict] = ()):
+    """Advance the store's sync watermark to the newest fetched activity.
+
+    Activities to retry hold the watermark back to before the earliest of
+    them, so the next sync lists them again. Activities already stored are
+    filtered out of that listing, so only the retried ones are fetched.
+
+    Args:
+        store: ActivityStore holding the processed activities
+        api_activities: Activity dictionaries from Strava API
+        retry: Listed activities that could not be imported (optional)
+    """
+    limit = min(
+        (StravaAPI.start_timestamp(activity) for activity in retry if activity.get("start_date")),
+        default=None,
+    )
+    newest = max(
+        (
+            (StravaAPI.start_timestamp(activity), int(activity["id"]))
+            for activity in api_activities
+            if activity.get("start_date")
+            and (limit is None or StravaAPI.start_timestamp(activity) < limit)
+        ),
+        default=None,
+    )
+    if newest:
+        store.set_watermark(*newest)
+
+
+def read_strava_api_incremental(
+    store: ActivityStore,
+    cache: Cache,
+    streams: Optional[StreamStore] = None,
+    review_queue: Optional[ReviewQueue] = None,
+) -> int:
+    """Fetch new activities from Strava API and append them to the store.
+
+    This function:
+    1. Fetches activities from Strava API newer than the store's sync watermark
+    2. Filters out activities already in the store
+    3. Processes new activities through existing parsers
+    4. Appends new activities to the store and advances the watermark
+
+    Args:
+        store: ActivityStore holding the processed activities
         cache: Cache instance for storing workout intervals
+        streams: Stream store to fetch the new activities' streams into and
+            detect workout intervals from (optional)
+        review_queue: Queue runs needing interval review here instead of
+            prompting (optional)
+
+    Returns:
+        Number of activities added
     """
     # Load environment variables
     load_dotenv()
 
-    # Load existing data
-    print("Loading existing activities...")
-    existing_activities, processed_ids = load_existing_json(export_path)
-    print(f"  Found {len(existing_activities)} existing activities")
-    print(f"  {len(processed_ids)} have Strava IDs")
+    print(f"Activity store has {len(store)} activities")
 
     # Initialize API client
     print("\nInitializing Strava API client...")
     auth = StravaAuth()
     api = StravaAPI(auth)
 
-    # Fetch activities from API (only after September 13, 2025)
+    # Fetch only activities newer than what the store has seen
     print("\nFetching activities from Strava API...")
-    from datetime import datetime
-    import pytz
-
-    # Set cutoff date: September 13, 2025 at midnight Eastern time
-    cutoff_date = datetime(2025, 9, 13, 0, 0, 0, tzinfo=pytz.timezone("US/Eastern"))
-    cutoff_timestamp = int(cutoff_date.timestamp())
-
-    print(f"  Only fetching activities after: {cutoff_date.strftime('%b %d, %Y')}")
-    api_activities = api.get_activities(after=cutoff_timestamp, per_page=100, max_pages=None)
-
-    # Normalize and filter activities
+    watermark = store.get_watermark()
+    if watermark:
+        print(f"  Fetching activities after last sync (activity {watermark['strava_id']})")
+        after = watermark["start_timestamp"] - WATERMARK_OVERLAP
+        with METRICS.span("sync", step="list"):
+            api_activities = api.get_activities(after=after, per_page=100)
+    elif len(store):
+        print("  No sync watermark yet, fetching until the first known activity")
+        with METRICS.span("sync", step="list"):
+            api_activities = api.get_activities(per_page=100, stop_at_ids=store)
+    else:
+        import pytz
+
+        # Set cutoff date: September 13, 2025 at midnight Eastern time
+        cutoff_date = datetime(2025, 9, 13, 0, 0, 0, tzinfo=pytz.timezone("US/Eastern"))
+        cutoff_timestamp = int(cutoff_date.timestamp())
+
+        print(f"  Only fetching activities after: {cutoff_date.strftime('%b %d, %Y')}")
+        with METRICS.span("sync", step="list"):
+            api_activities = api.get_activities(after=cutoff_timestamp, per_page=100, max_pages=None)
+
+    # Filter out known activities and types without a parser (which would be
+    # dropped anyway), then fetch full details for the rest
     print("\nProcessing activities...")
-    new_activities_csv = []
-    skipped = 0
-
-    for activity in api_activities:
-        activity_id = str(activity.get("id", ""))
-
-        if activity_id in processed_ids:
-            skipped += 1
-            continue
-
-        # Normalize to CSV format
-        csv_activity = api.normalize_activity(activity)
-        new_activities_csv.append(csv_activity)
-
-    print(f"  {skipped} activities already processed (skipped)")
+    new_activities = [
+        activity
+        for activity in api_activities
+        if str(activity.get("id", "")) not in store and activity.get("type") in PARSERS
+    ]
+    skipped = len(api_activities) - len(new_activities)
+    with METRICS.span("sync", step="details"):
+        details = api.get_activity_details(new_activities)
+    # Failed detail requests are not stored from their summaries; the next sync retries them
+    fetched = {detail["id"] for detail in details}
+    failed = [activity for activity in new_activities if activity["id"] not in fetched]
+    if failed:
+        print(f"  Could not fetch details for {len(failed)} activities; they will be retried next sync")
+    new_activities = details
+
+    # Normalize to CSV format, naming gear from the persistent gear cache
+    data_dir = os.path.join("..", "data")
+    gear = GearLookup(
+        cache,
+        api,
+        known_names=read_gear_names(
+            [os.path.join(data_dir, "shoes.csv"), os.path.join(data_dir, "bikes.csv")]
+        ),
+    )
+    with METRICS.span("sync", step="normalize"):
+        new_activities_csv = [api.normalize_activity(activity, gear) for activity in new_activities]
+
+    print(f"  {skipped} activities already processed or not tracked (skipped)")
     print(f"  {len(new_activities_csv)} new activities to process")
 
     if not new_activities_csv:
+        update_watermark(store, api_activities, failed)
         print("\n✓ No new activities to process!")
-        return
+        return 0
+
+    # Fetch streams first, so workout intervals can be detected from them
+    if streams is not None:
+        # Every type with a parser, without parsing twice; a few of these may
+        # still be skipped by their parser
+        kept = [a["Activity ID"] for a in new_activities_csv if a["Activity Type"] in PARSERS]
+        with METRICS.span("sync", step="streams"):
+            stored = api.fetch_streams(kept, streams)
+        print(f"  Stored streams for {stored} activities")
 
     # Process new activities through parsers
     print("\nProcessing new activities through parsers...")
-    new_processed = extract_relevant_activities(new_activities_csv, cache)
-    print(f"  {len(new_processed)} activities processed successfully")
-
-    # Append to existing activities
-    updated_activities = existing_activities + new_processed
-
-    # Sort by date (chronological order)
-    print("\nSorting activities by date...")
-    from datetime import datetime
-
-    def parse_activity_date(activity):
-        """Parse activity date for sorting."""
-        try:
-            date_str = activity.get("date", "")
-            # Parse format: "Sep 14, 2025, 02:23:26 AM"
-            return datetime.strptime(date_str, "%b %d, %Y, %I:%M:%S %p")
-        except (ValueError, KeyError):
-            # If parsing fails, put at beginning
-            return datetime.min
+    with METRICS.span("sync", step="process"):
+        added = store.extend(
+            extract_relevant_activities(
+                new_activities_csv, cache, streams=streams, review_queue=review_queue
+            )
+        )
+    print(f"  {added} activities processed successfully")
+    if review_queue is not None:
+        review_queue.save()
+        print(f"  {len(review_queue)} runs waiting for interval review")
 
-    updated_activities.sort(key=parse_activity_date, reverse=True)
+    # Record how far this sync got
+    update_watermark(store, api_activities, failed)
 
-    # Save updated JSON
-    print(f"\nSaving sorted JSON to {export_path}...")
-    with open(export_path, "w") as f:
-        json.dump(updated_activities, f, indent=2)
-
-    print(f"\n✓ Complete! Total activities: {len(updated_activities)}")
-    print(f"  (Added {len(new_processed)} new activities)")
+    print(f"\n✓ Complete! Total activities: {len(store)}")
+    print(f"  (Added {added} new activities)")
+    return added
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import new activities from the Strava API")
+    parser.add_argument(
+        "--interactive",
+        action="store_true",
+        help="prompt for workout intervals during the import instead of queueing them for review",
+    )
+    add_publish_argument(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
     # Path to cache file (in parent directory)
-    cache_path = os.path.join("..", "strava_cache.json")
-    cache = Cache(cache_path)
+    cache_path = os.path.join("..", "strava_cache.sqlite3")
+    cache = SqliteCache(cache_path, json_file=os.path.join("..", "strava_cache.json"))
 
-    # Path to export file (in parent directory)
+    # Path to export file and activity store (in parent directory)
     export_path = os.path.join("..", "front", "src", "data", "strava_export.json")
-
-    # Run incremental API import
-    read_strava_api_incremental(export_path, cache)
-
-    # Save cache
-    cache.save()
+    store = open_store(os.path.join("..", "data", "store"), export_path)
+
+    streams = StreamStore(os.path.join("..", "data", "streams"))
+    review_queue = None if args.interactive else ReviewQueue(REVIEW_QUEUE_PATH)
+
+    # Run incremental API import, then regenerate the site data if asked and anything changed
+    try:
+        with METRICS.span("import"):
+            added = read_strava_api_incremental(store, cache, streams, review_queue)
+        if added:
+            publish_if_requested(store, export_path, args.publish)
+    finally:
+        cache.save()
+        METRICS.write(args.metrics, args.prometheus)
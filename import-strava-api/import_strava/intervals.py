@@ -0,0 +1,196 @@
+"""Automatic workout interval detection from a run's speed and heart rate streams."""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .streams import StreamStore
+
+# Stamped on every detected interval, so detected entries can be told apart from
+# hand-entered ones and re-detected when the detector changes
+DETECTOR_VERSION = "auto2"
+
+SMOOTHING_SECONDS = 15  # Centered moving average applied to speed
+MIN_SEGMENT_SECONDS = 20  # Shorter work/recovery segments are merged into their neighbours
+MIN_SPEED_RATIO = 1.4  # Fast running must be this much faster than the slow running
+MIN_SEPARATION = 0.65  # Share of speed variance the fast/slow split has to explain
+HEARTRATE_LAG_SECONDS = 15  # Heart rate trails changes in pace
+MIN_REPS = 2
+STOPPED_SPEED = 1.5  # m/s; slower samples count as recovery and are left out of the threshold
+
+
+def _moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    """Centered moving average, shrinking the window at the edges."""
+    half = window // 2
+    padded = np.concatenate([[0.0], np.cumsum(values)])
+    idx = np.arange(len(values))
+    lo = np.clip(idx - half, 0, len(values))
+    hi = np.clip(idx + half + 1, 0, len(values))
+    return (padded[hi] - padded[lo]) / (hi - lo)
+
+
+def _otsu_threshold(values: np.ndarray, bins: int = 128) -> Optional[Tuple[float, float]]:
+    """Split values into two classes with maximal between-class variance (Otsu's method).
+
+    Returns:
+        The threshold, and the fraction of the total variance explained by the
+        split (1.0 for two perfectly separated clusters), or None if the values
+        are all the same and cannot be split
+    """
+    variance = values.var()
+    if not variance > 0:
+        return None
+    hist, edges = np.histogram(values, bins=bins)
+    centers = (edges[:-1] + edges[1:]) / 2
+    weight = np.cumsum(hist) / hist.sum()
+    mean = np.cumsum(hist * centers) / hist.sum()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mean[-1] * weight - mean) ** 2 / (weight * (1 - weight))
+    between = between[:-1]
+    if not np.any(np.isfinite(between)):
+        return None
+    best = np.nanargmax(np.where(np.isfinite(between), between, np.nan))
+    return float(centers[best]), float(between[best] / variance)
+
+
+def _segment_means(values: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Mean of values[start:end] for each segment, ignoring NaNs."""
+    valid = ~np.isnan(values)
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (sums[ends] - sums[starts]) / (counts[ends] - counts[starts])
+
+
+def _segments(labels: np.ndarray):
+    """Run-length encode a boolean array into (starts, ends, values)."""
+    boundaries = np.flatnonzero(np.diff(labels.astype(np.int8))) + 1
+    starts = np.concatenate([[0], boundaries])
+    ends = np.concatenate([boundaries, [len(labels)]])
+    return starts, ends, labels[starts]
+
+
+def _merge_short_segments(labels: np.ndarray, min_length: int) -> np.ndarray:
+    """Flip segments shorter than min_length, shortest first, until none remain."""
+    labels = labels.copy()
+    while True:
+        starts, ends, values = _segments(labels)
+        lengths = ends - starts
+        # Leading and trailing segments may be short without being noise
+        short = np.flatnonzero(lengths[1:-1] < min_length) + 1
+        if len(short) == 0:
+            return labels
+        i = short[np.argmin(lengths[short])]
+        labels[starts[i] : ends[i]] = not values[i]
+
+
+def _format_distance(meters: float) -> str:
+    if meters < 1500:
+        return f"{int(round(meters / 50) * 50)}m"
+    return f"{meters / 1609.34:.2f}mi"
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return str(seconds)
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def detect_intervals(
+    time: np.ndarray, distance: np.ndarray, heartrate: Optional[np.ndarray] = None
+) -> Optional[List[Dict]]:
+    """Segment a run into alternating work and recovery reps.
+
+    Speed is resampled to 1 Hz and smoothed, split into fast and slow samples
+    at the threshold that best separates the two (Otsu's method), and the
+    resulting change points are cleaned up by merging segments too short to be
+    reps. Runs whose speed does not split cleanly into two paces are not
+    workouts. Warm-up and cool-down (everything before the first and after the last
+    work rep) are left out. When heart rate is available, it has to be higher
+    during work reps than during recoveries.
+
+    Args:
+        time: Seconds since activity start
+        distance: Cumulative distance in meters
+        heartrate: Heart rate in bpm, 0 when missing (optional)
+
+    Returns:
+        Intervals in the manual entry format ({"distance", "time"} plus a
+        "detector" stamp), work and recovery reps alternating, or None if the
+        run does not look like a workout
+    """
+    if len(time) < 2 or distance is None or not np.any(distance > 0):
+        return None
+    grid = np.arange(time[0], time[-1] + 1)
+    dist = np.interp(grid, time, np.nan_to_num(distance.astype(np.float64)))
+    dist = np.maximum.accumulate(dist)
+    speed = _moving_average(np.gradient(dist), SMOOTHING_SECONDS)
+    if len(speed) < 2 * MIN_SEGMENT_SECONDS or np.ptp(speed) == 0:
+        return None
+
+    # Standing still (e.g. between sets) would otherwise make easy running look fast
+    moving = speed > STOPPED_SPEED
+    if moving.sum() < 2 * MIN_SEGMENT_SECONDS:
+        return None
+    split = _otsu_threshold(speed[moving])
+    if split is None:
+        return None
+    threshold, separation = split
+    fast_speed = speed[moving & (speed > threshold)].mean()
+    slow_speed = speed[moving & (speed <= threshold)].mean()
+    if separation < MIN_SEPARATION or fast_speed < MIN_SPEED_RATIO * slow_speed:
+        return None  # One steady pace, or too little difference between them
+
+    fast = _merge_short_segments(speed > threshold, MIN_SEGMENT_SECONDS)
+    starts, ends, values = _segments(fast)
+    work = np.flatnonzero(values)
+    if len(work) < MIN_REPS:
+        return None
+    # Keep everything from the first work rep to the last one
+    first, last = work[0], work[-1]
+    starts, ends, values = starts[first : last + 1], ends[first : last + 1], values[first : last + 1]
+
+    # ends is exclusive, so a segment runs up to the first sample of the next one
+    seg_dist = dist[np.minimum(ends, len(dist) - 1)] - dist[starts]
+    seg_time = (ends - starts).astype(np.float64)
+
+    if heartrate is not None and np.any(heartrate > 0):
+        hr = np.interp(grid, time, heartrate.astype(np.float64))
+        hr[hr <= 0] = np.nan
+        # Compare each segment against the heart rate a little after it
+        seg_hr = _segment_means(
+            hr,
+            np.minimum(starts + HEARTRATE_LAG_SECONDS, len(hr) - 1),
+            np.minimum(ends + HEARTRATE_LAG_SECONDS, len(hr)),
+        )
+        work_hr, rest_hr = seg_hr[values], seg_hr[~values]
+        work_hr, rest_hr = work_hr[np.isfinite(work_hr)], rest_hr[np.isfinite(rest_hr)]
+        # Heart rate that covers no work or no recovery rep cannot confirm the split
+        if len(work_hr) == 0 or len(rest_hr) == 0 or work_hr.mean() <= rest_hr.mean():
+            return None
+
+    return [
+        {
+            "distance": _format_distance(d),
+            "time": _format_duration(t),
+            "detector": DETECTOR_VERSION,
+        }
+        for d, t in zip(seg_dist, seg_time)
+    ]
+
+
+def is_detected(intervals) -> bool:
+    """Whether cached intervals came from the detector rather than manual entry."""
+    return bool(intervals) and all(isinstance(i, dict) and "detector" in i for i in intervals)
+
+
+def detect_run_intervals(streams: StreamStore, strava_id) -> Optional[List[Dict]]:
+    """Detect intervals from a stored activity's streams (None if it has no streams)."""
+    if strava_id not in streams:
+        return None
+    return detect_intervals(
+        streams.column(strava_id, "time"),
+        streams.column(strava_id, "distance"),
+        streams.column(strava_id, "heartrate"),
+    )
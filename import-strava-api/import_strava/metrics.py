@@ -0,0 +1,410 @@
+"""Timing spans and counters for import runs, reported as JSON or Prometheus text.
+
+The importer records into the process-wide METRICS registry:
+
+- spans: how often a stage ran and how long it took in total (and at most),
+  e.g. METRICS.span("http_request", endpoint="/athlete/activities")
+- counters: plain totals such as requests, bytes, retries and sleep seconds,
+  e.g. METRICS.incr("response_bytes", len(response.content))
+
+Each metric can carry labels; METRICS.write() saves everything at the end of
+a run. Work done in parser worker processes (--workers) is not collected.
+
+Per-activity paths use METRICS.tally() and METRICS.sampled_span() instead,
+which cost a dict update per call and are added in when a snapshot is taken.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+METRICS_PATH = os.path.join("..", "data", "import_metrics.json")
+
+# Prefix of every metric name in the Prometheus output
+PROMETHEUS_PREFIX = "strava_import_"
+
+# A sampled span times one call in this many
+SAMPLE_EVERY = 16
+
+Labels = Tuple[Tuple[str, object], ...]
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    # Kept cheap, since spans sit on per-activity paths; each call site passes
+    # its labels in a fixed order, and values are turned into strings on output
+    return tuple(labels.items()) if labels else ()
+
+
+def endpoint_label(endpoint: str) -> str:
+    """API endpoint with IDs replaced, so each kind of request gets one label value.
+
+    "/activities/123/streams" -> "/activities/{id}/streams"
+    """
+    endpoint = re.sub(r"/\d+", "/{id}", endpoint)
+    return re.sub(r"^/gear/[^/]+", "/gear/{id}", endpoint)
+
+
+def _sort_key(item) -> Tuple[str, str]:
+    (name, labels), _ = item
+    return name, str(labels)
+
+
+def _label_dict(labels: Labels) -> Dict[str, str]:
+    return {k: str(v) for k, v in labels}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Tables:
+    """One thread's spans and counters."""
+
+    __slots__ = ("spans", "counters")
+
+    def __init__(self):
+        # (name, labels) -> [count, total seconds, max seconds]
+        self.spans: Dict[Tuple[str, Labels], List[float]] = {}
+        # (name, labels) -> value
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+
+
+class _Span:
+    """Context manager timing one span; cheaper than a @contextmanager generator."""
+
+    __slots__ = ("metrics", "key", "start")
+
+    def __init__(self, metrics: "Metrics", key: Tuple[str, Labels]):
+        self.metrics = metrics
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.metrics._observe(self.key, time.perf_counter() - self.start)
+
+
+class _NotTimed:
+    """Context manager for the calls a sampled span does not time."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NOT_TIMED = _NotTimed()
+
+
+class _Timed:
+    __slots__ = ("timings", "value", "start")
+
+    def __init__(self, timings: Dict[object, List[float]], value: object):
+        self.timings = timings
+        self.value = value
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        timing = self.timings.get(self.value)
+        if timing is None:
+            self.timings[self.value] = [1, seconds, seconds]
+        else:
+            timing[0] += 1
+            timing[1] += seconds
+            if seconds > timing[2]:
+                timing[2] = seconds
+
+
+class Tally:
+    """Counter for per-activity paths, with at most one label.
+
+    add() is a plain dict update, without the thread lookup and label tuple
+    of Metrics.incr(); the counts are added to the registry's counters when a
+    snapshot is taken. Increments from threads racing on the same tally can
+    be lost, so tallies belong on the importing thread's paths.
+    """
+
+    __slots__ = ("name", "label", "counts")
+
+    def __init__(self, name: str, label: Optional[str] = None):
+        self.name = name
+        self.label = label
+        # Label value -> count
+        self.counts: Dict[object, float] = {}
+
+    def add(self, value: object = None, amount: float = 1):
+        counts = self.counts
+        counts[value] = counts.get(value, 0) + amount
+
+    def key(self, value: object) -> Tuple[str, Labels]:
+        return self.name, ((self.label, value),) if self.label else ()
+
+
+class SampledSpan(Tally):
+    """Span for per-activity paths that counts every call but times one in every few.
+
+    The reported count is exact; the total is the timed calls' average times
+    the count, and the maximum is over the timed calls.
+    """
+
+    __slots__ = ("every", "timings")
+
+    def __init__(self, name: str, label: Optional[str] = None, every: int = SAMPLE_EVERY):
+        super().__init__(name, label)
+        self.every = every
+        # Label value -> [count, total seconds, max seconds] of the timed calls
+        self.timings: Dict[object, List[float]] = {}
+
+    def time(self, value: object = None):
+        """Context manager for one call; only the first of every `every` calls is timed."""
+        counts = self.counts
+        calls = counts[value] = counts.get(value, 0) + 1
+        if calls % self.every == 1 or self.every == 1:
+            return _Timed(self.timings, value)
+        return _NOT_TIMED
+
+
+class Metrics:
+    """Thread-safe registry of timing spans and counters.
+
+    Every thread records into its own tables, so the per-activity paths take
+    no lock; snapshot() adds the tables of all threads together.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._tables: List[_Tables] = []
+        self._tallies: List[Tally] = []
+        self.reset()
+
+    def reset(self):
+        """Drop everything recorded so far and restart the run clock."""
+        with self._lock:
+            for tables in self._tables:
+                tables.spans.clear()
+                tables.counters.clear()
+            for tally in self._tallies:
+                tally.counts.clear()
+                if isinstance(tally, SampledSpan):
+                    tally.timings.clear()
+            self.started_at = datetime.now(timezone.utc)
+            self._started = time.perf_counter()
+
+    def _thread_tables(self) -> _Tables:
+        try:
+            return self._local.tables
+        except AttributeError:
+            tables = self._local.tables = _Tables()
+            with self._lock:
+                self._tables.append(tables)
+            return tables
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Record one finished span that was timed elsewhere."""
+        self._observe((name, _labels(labels)), seconds)
+
+    def _observe(self, key: Tuple[str, Labels], seconds: float):
+        spans = self._thread_tables().spans
+        span = spans.get(key)
+        if span is None:
+            spans[key] = [1, seconds, seconds]
+        else:
+            span[0] += 1
+            span[1] += seconds
+            if seconds > span[2]:
+                span[2] = seconds
+
+    def span(self, name: str, **labels) -> _Span:
+        """Time the body of a with block (also when it raises)."""
+        return _Span(self, (name, _labels(labels)))
+
+    def incr(self, name: str, value: float = 1, **labels):
+        """Add to a counter."""
+        counters = self._thread_tables().counters
+        key = (name, _labels(labels))
+        counters[key] = counters.get(key, 0) + value
+
+    def tally(self, name: str, label: Optional[str] = None) -> Tally:
+        """Create a counter for a per-activity path (see Tally)."""
+        tally = Tally(name, label)
+        with self._lock:
+            self._tallies.append(tally)
+        return tally
+
+    def sampled_span(
+        self, name: str, label: Optional[str] = None, every: int = SAMPLE_EVERY
+    ) -> SampledSpan:
+        """Create a span for a per-activity path that times one call in every few (see SampledSpan)."""
+        span = SampledSpan(name, label, every)
+        with self._lock:
+            self._tallies.append(span)
+        return span
+
+    def _merged(self) -> Tuple[Dict, Dict]:
+        spans: Dict[Tuple[str, Labels], List[float]] = {}
+        counters: Dict[Tuple[str, Labels], float] = {}
+        with self._lock:
+            tables = list(self._tables)
+            tallies = list(self._tallies)
+        for table in tables:
+            # Copied first, in case another thread is still recording
+            for key, (count, total, longest) in list(table.spans.items()):
+                merged = spans.setdefault(key, [0, 0.0, 0.0])
+                merged[0] += count
+                merged[1] += total
+                merged[2] = max(merged[2], longest)
+            for key, value in list(table.counters.items()):
+                counters[key] = counters.get(key, 0) + value
+        for tally in tallies:
+            if isinstance(tally, SampledSpan):
+                timings = dict(tally.timings)
+                for value, calls in list(tally.counts.items()):
+                    timed, total, longest = timings.get(value, (0, 0.0, 0.0))
+                    merged = spans.setdefault(tally.key(value), [0, 0.0, 0.0])
+                    merged[0] += calls
+                    merged[1] += total * calls / timed if timed else 0.0
+                    merged[2] = max(merged[2], longest)
+            else:
+                for value, count in list(tally.counts.items()):
+                    key = tally.key(value)
+                    counters[key] = counters.get(key, 0) + count
+        return spans, counters
+
+    def snapshot(self) -> Dict:
+        """Everything recorded so far, as a JSON-serializable dictionary.
+
+        Cache hit ratios are derived from the cache_lookups and cache_hits
+        counters, per label set.
+        """
+        spans, counters = self._merged()
+
+        span_list: Dict[str, List[Dict]] = {}
+        for (name, labels), (count, total, longest) in sorted(spans.items(), key=_sort_key):
+            span_list.setdefault(name, []).append(
+                {
+                    "labels": _label_dict(labels),
+                    "count": int(count),
+                    "total_seconds": round(total, 6),
+                    "max_seconds": round(longest, 6),
+                }
+            )
+        counter_list: Dict[str, List[Dict]] = {}
+        for (name, labels), value in sorted(counters.items(), key=_sort_key):
+            counter_list.setdefault(name, []).append({"labels": _label_dict(labels), "value": value})
+
+        hit_ratios = [
+            {
+                "labels": _label_dict(labels),
+                "value": round(counters.get(("cache_hits", labels), 0) / lookups, 4),
+            }
+            for (name, labels), lookups in sorted(counters.items(), key=_sort_key)
+            if name == "cache_lookups" and lookups
+        ]
+        return {
+            "started_at": self.started_at.isoformat(),
+            "wall_seconds": round(time.perf_counter() - self._started, 6),
+            "spans": span_list,
+            "counters": counter_list,
+            "cache_hit_ratio": hit_ratios,
+        }
+
+    def to_prometheus(self, snapshot: Optional[Dict] = None) -> str:
+        """Render a snapshot in the Prometheus text exposition format.
+
+        Spans become <name>_seconds_count/_sum (with a _max gauge), counters
+        <name>_total, and hit ratios a cache_hit_ratio gauge. The output suits
+        node_exporter's textfile collector.
+        """
+        snapshot = snapshot or self.snapshot()
+        lines: List[str] = []
+
+        def sample(name: str, labels: Dict[str, str], value: float):
+            if labels:
+                body = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f"{PROMETHEUS_PREFIX}{name}{{{body}}} {value}")
+            else:
+                lines.append(f"{PROMETHEUS_PREFIX}{name} {value}")
+
+        for name, series in snapshot["spans"].items():
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}{name}_seconds summary")
+            for s in series:
+                sample(f"{name}_seconds_count", s["labels"], s["count"])
+                sample(f"{name}_seconds_sum", s["labels"], s["total_seconds"])
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}{name}_seconds_max gauge")
+            for s in series:
+                sample(f"{name}_seconds_max", s["labels"], s["max_seconds"])
+        for name, series in snapshot["counters"].items():
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}{name}_total counter")
+            for s in series:
+                sample(f"{name}_total", s["labels"], s["value"])
+        if snapshot["cache_hit_ratio"]:
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}cache_hit_ratio gauge")
+            for s in snapshot["cache_hit_ratio"]:
+                sample("cache_hit_ratio", s["labels"], s["value"])
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}wall_seconds gauge")
+        sample("wall_seconds", {}, snapshot["wall_seconds"])
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str = METRICS_PATH, prometheus_path: Optional[str] = None):
+        """Save the run's metrics as JSON, and optionally as Prometheus text.
+
+        Args:
+            path: JSON output path
+            prometheus_path: Prometheus text output path (optional)
+        """
+        snapshot = self.snapshot()
+        for out_path, text in (
+            (path, json.dumps(snapshot, indent=2)),
+            (prometheus_path, self.to_prometheus(snapshot) if prometheus_path else None),
+        ):
+            if out_path is None:
+                continue
+            os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+            tmp_path = f"{out_path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(text)
+            os.replace(tmp_path, out_path)
+        print(f"\nMetrics written to {path}")
+        self.print_summary(snapshot)
+
+    def print_summary(self, snapshot: Optional[Dict] = None, limit: int = 10):
+        """Print where the run's time went: the spans with the largest totals."""
+        snapshot = snapshot or self.snapshot()
+        rows = [
+            (s["total_seconds"], name, s)
+            for name, series in snapshot["spans"].items()
+            for s in series
+        ]
+        rows.sort(key=lambda row: row[0], reverse=True)
+        print(f"  Run took {snapshot['wall_seconds']:.2f}s")
+        for total, name, s in rows[:limit]:
+            labels = ",".join(f"{k}={v}" for k, v in s["labels"].items())
+            label = f"{name}{{{labels}}}" if labels else name
+            print(f"  {label:<48} {total:>9.3f}s  {s['count']:>7} calls")
+        for s in snapshot["cache_hit_ratio"]:
+            labels = ",".join(f"{k}={v}" for k, v in s["labels"].items())
+            print(f"  cache hit ratio {labels:<32} {s['value']:>9.1%}")
+
+
+def add_metrics_arguments(parser):
+    """Add the --metrics and --prometheus output options to a command's argument parser."""
+    parser.add_argument("--metrics", default=METRICS_PATH, help="where to write this run's metrics (JSON)")
+    parser.add_argument(
+        "--prometheus", default=None, help="also write the metrics in Prometheus text format here"
+    )
+
+
+# Process-wide registry used by the importer
+METRICS = Metrics()
@@ -0,0 +1,79 @@
+"""Registry of activity parsers, keyed by Strava activity type."""
+
+import importlib
+from typing import Callable, Dict, NamedTuple, Optional
+
+from .metrics import METRICS
+
+# Parsing runs once per activity, so it is timed by sampling
+_PARSE = METRICS.sampled_span("parse", "type")
+_SKIPPED = METRICS.tally("parse_skipped", "type")
+
+# Modules whose parsers are registered when they are imported
+PARSER_MODULES = ("run", "bike", "elliptical", "row")
+
+
+class Parser(NamedTuple):
+    """A registered parser and the record version it produces."""
+
+    activity_type: str
+    version: int
+    parse: Callable[[Dict], Optional[Dict]]
+
+
+# Strava activity type (e.g. "Run") -> parser
+PARSERS: Dict[str, Parser] = {}
+
+
+def register_parser(activity_type: str, version: int):
+    """Register a function as the parser for a Strava activity type.
+
+    The function takes a CSV-format activity and returns a processed record
+    (without "version"), or None if the activity should not be tracked. It
+    must not touch the workout cache, since it may run in a worker process.
+
+    Args:
+        activity_type: Strava activity type, as in the "Activity Type" column
+        version: Record version the parser produces
+    """
+
+    def decorator(parse: Callable[[Dict], Optional[Dict]]):
+        if activity_type in PARSERS:
+            raise ValueError(f"A parser for {activity_type} is already registered")
+        PARSERS[activity_type] = Parser(activity_type, version, parse)
+        return parse
+
+    return decorator
+
+
+def load_parsers():
+    """Import every parser module, so PARSERS holds all registered parsers.
+
+    Worker processes started with spawn (the default on macOS and Windows)
+    only import the module of the function they run, so process pools that
+    call parse_activity use this as their initializer.
+    """
+    for name in PARSER_MODULES:
+        importlib.import_module(f"{__package__}.{name}")
+
+
+def parse_activity(activity: Dict) -> Optional[Dict]:
+    """Parse a CSV-format activity with the parser registered for its type.
+
+    Args:
+        activity: Activity dictionary in CSV format
+
+    Returns:
+        Processed record stamped with its parser's version, or None if no
+        parser handles the activity
+    """
+    parser = PARSERS.get(activity["Activity Type"])
+    if parser is None:
+        _SKIPPED.add(activity["Activity Type"])
+        return None
+    with _PARSE.time(parser.activity_type):
+        record = parser.parse(activity)
+    if record is None:
+        _SKIPPED.add(parser.activity_type)
+        return None
+    return {"version": parser.version, **record}
@@ -0,0 +1,187 @@
+"""Strava rate limiting shared across threads and processes."""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Mapping, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+SHORT_WINDOW = 900  # 15 minutes, aligned to the quarter hour
+DAILY_WINDOW = 86400  # resets at midnight UTC
+
+
+class RateLimitExceeded(Exception):
+    """Raised when the daily request budget is used up."""
+
+
+class TokenBucket:
+    """Request budget for one Strava rate-limit window.
+
+    Strava refills the whole budget at fixed window boundaries, so the bucket
+    only tracks how many tokens were used since the last boundary. Every
+    operation is O(1).
+    """
+
+    def __init__(self, window: int, limit: int, used: int = 0, reset_at: float = 0):
+        self.window = window
+        self.limit = limit
+        self.used = used
+        self.reset_at = reset_at
+
+    def _refill(self, now: float):
+        if now >= self.reset_at:
+            self.used = 0
+            self.reset_at = (now // self.window + 1) * self.window
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(now)
+        return 0.0 if self.used < self.limit else self.reset_at - now
+
+    def take(self, now: float):
+        self._refill(now)
+        self.used += 1
+
+    def observe(self, limit: int, used: int, now: float):
+        """Adopt the server's view of the limit and usage for the current window."""
+        self._refill(now)
+        self.limit = limit
+        self.used = used
+
+    def to_dict(self) -> Dict:
+        return {"limit": self.limit, "used": self.used, "reset_at": self.reset_at}
+
+
+def parse_rate_limit_headers(headers: Mapping[str, str]) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """Extract ((short_limit, daily_limit), (short_usage, daily_usage)) from a response.
+
+    The read-specific headers are preferred, since the importer only reads.
+
+    Returns:
+        The limits and usage, or None if the headers are missing or malformed
+    """
+    for prefix in ("X-ReadRateLimit", "X-RateLimit"):
+        limit = headers.get(f"{prefix}-Limit")
+        usage = headers.get(f"{prefix}-Usage")
+        if limit and usage:
+            try:
+                short_limit, daily_limit = (int(v) for v in limit.split(","))
+                short_usage, daily_usage = (int(v) for v in usage.split(","))
+            except ValueError:
+                continue
+            return (short_limit, daily_limit), (short_usage, daily_usage)
+    return None
+
+
+class RateLimiter:
+    """Token-bucket limiter for the 15-minute and daily Strava windows.
+
+    The buckets are seeded from Strava's X-RateLimit headers after every
+    response and persisted in a small state file guarded by a file lock, so
+    separate importer runs (and concurrent ones) share a single budget.
+    """
+
+    def __init__(
+        self,
+        state_file: Optional[str] = ".strava_rate_limit.json",
+        short_limit: int = 100,
+        daily_limit: int = 1000,
+    ):
+        """Initialize the rate limiter.
+
+        Args:
+            state_file: Path of the shared state file, or None to keep state in memory
+            short_limit: Requests per 15 minutes until the server reports otherwise
+            daily_limit: Requests per day until the server reports otherwise
+        """
+        self.state_file = state_file
+        self.short = TokenBucket(SHORT_WINDOW, short_limit)
+        self.daily = TokenBucket(DAILY_WINDOW, daily_limit)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked_state(self):
+        """Hold the thread and file locks while reading and writing the shared state."""
+        with self._lock:
+            if self.state_file is None:
+                yield
+                return
+            with open(f"{self.state_file}.lock", "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._load()
+                    yield
+                    self._save()
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self):
+        if not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        for name in ("short", "daily"):
+            if name in state:
+                bucket = getattr(self, name)
+                bucket.limit = state[name]["limit"]
+                bucket.used = state[name]["used"]
+                bucket.reset_at = state[name]["reset_at"]
+
+    def _save(self):
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"short": self.short.to_dict(), "daily": self.daily.to_dict()}, f)
+        os.replace(tmp_path, self.state_file)
+
+    def acquire(self) -> float:
+        """Take a token from both buckets, sleeping until one is available.
+
+        Returns:
+            Total seconds spent sleeping
+
+        Raises:
+            RateLimitExceeded: If the daily budget is used up
+        """
+        slept = 0.0
+        while True:
+            with self._locked_state():
+                now = time.time()
+                if self.daily.wait_time(now) > 0:
+                    raise RateLimitExceeded(
+                        f"Daily rate limit of {self.daily.limit} requests exceeded"
+                    )
+                wait = self.short.wait_time(now)
+                if wait <= 0:
+                    self.short.take(now)
+                    self.daily.take(now)
+                    return slept
+            print(f"Rate limit approaching, waiting {wait:.0f} seconds...")
+            time.sleep(wait)
+            slept += wait
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Seed the buckets from a response's rate-limit headers."""
+        parsed = parse_rate_limit_headers(headers)
+        if parsed is None:
+            return
+        (short_limit, daily_limit), (short_usage, daily_usage) = parsed
+        with self._locked_state():
+            now = time.time()
+            self.short.observe(short_limit, short_usage, now)
+            self.daily.observe(daily_limit, daily_usage, now)
+
+    def seconds_until_available(self) -> float:
+        """Seconds until the short-term bucket has a token again."""
+        with self._locked_state():
+            return self.short.wait_time(time.time())
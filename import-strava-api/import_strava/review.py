@@ -0,0 +1,72 @@
+"""Review queued runs: enter their workout intervals and patch them into the store and export."""
+
+import argparse
+import os
+
+from .cache import Cache, SqliteCache
+from .import_strava import REVIEW_QUEUE_PATH, open_store
+from .run import CACHE_VERSION_STRING, prompt_for_intervals
+from .site_export import add_publish_argument, publish_if_requested
+from .store import ActivityStore, ReviewQueue
+
+
+def review_intervals(queue: ReviewQueue, store: ActivityStore, cache: Cache) -> int:
+    """Prompt for the intervals of each queued run.
+
+    Answered runs leave the queue and are re-appended to the store with their
+    intervals (None for runs that are not workouts, as an import writes them);
+    skipped runs stay queued. Choosing [F]inish stops early, and nothing is
+    prompted when NO_INPUT is set.
+
+    Args:
+        queue: Queue of runs waiting for review
+        store: ActivityStore holding the processed activities
+        cache: Cache instance for storing workout intervals
+
+    Returns:
+        Number of runs whose intervals changed
+    """
+    print(f"{len(queue)} runs waiting for review")
+    if os.getenv("NO_INPUT", None):
+        print("NO_INPUT is set, nothing to prompt for")
+        return 0
+    updated = 0
+    for strava_id in queue:
+        run = store.get(strava_id)
+        if run is None or cache.contains(strava_id, CACHE_VERSION_STRING):
+            # Gone from the store, or answered some other way since it was queued
+            queue.remove(strava_id)
+            queue.save()
+            continue
+
+        prompt_for_intervals(run, cache)
+        if os.getenv("NO_INPUT", None):
+            break
+        if not cache.contains(strava_id, CACHE_VERSION_STRING):
+            continue  # Skipped
+
+        run["data"]["intervals"] = cache.get(strava_id, CACHE_VERSION_STRING)
+        store.append(run)
+        updated += 1
+        queue.remove(strava_id)
+        queue.save()
+
+    print(f"\n✓ Reviewed! {updated} runs updated, {len(queue)} still waiting")
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enter the intervals of runs queued for review")
+    add_publish_argument(parser)
+    args = parser.parse_args()
+
+    cache_path = os.path.join("..", "strava_cache.sqlite3")
+    cache = SqliteCache(cache_path, json_file=os.path.join("..", "strava_cache.json"))
+    export_path = os.path.join("..", "front", "src", "data", "strava_export.json")
+    store = open_store(os.path.join("..", "data", "store"), export_path)
+
+    try:
+        if review_intervals(ReviewQueue(REVIEW_QUEUE_PATH), store, cache):
+            publish_if_requested(store, export_path, args.publish)
+    finally:
+        cache.save()
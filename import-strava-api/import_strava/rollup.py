@@ -0,0 +1,403 @@
+"""Precomputed daily, weekly and monthly training aggregates for the frontend.
+
+The metrics mirror front/src/analysis/metrics.tsx (total_mileage,
+total_moving_time, training_heart_beats, average_pace, fastest_pace,
+num_strides), bucketed like splitDataByPeriod in periods.tsx (weeks start on
+Monday). Aggregates are kept per activity type and per gear item.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Bump when the metrics change, so the next update recomputes every bucket
+ROLLUP_VERSION = 1
+
+PERIODS = ("day", "week", "month")
+
+# Summed across activities; fastest_pace is a minimum and average_pace is derived
+SUM_METRICS = ("count", "distance", "moving_time", "heart_beats", "strides")
+
+# Same assumptions as training_heart_beat_helper in metrics.tsx
+HEARTRATE_GUESS = 120
+BASELINE_HEARTRATE = 100
+STRIDE_PACE = 15 / 100  # s/m; intervals at least this fast count as strides
+LIFT_SECONDS_PER_REP = 10  # lift_time's estimate when no duration was logged
+
+# Units understood by parse_unit in front/src/parse/main.tsx, in meters
+_LENGTH_UNITS = {"m": 1.0, "meters": 1.0, "k": 1000.0, "mi": 1609.344, "miles": 1609.344}
+_UNIT = re.compile(r"^\s*([\d.]+)\s*([a-zA-Z]*)$")
+
+_DATE_FORMATS = (
+    "%b %d, %Y, %I:%M:%S %p",
+    "%B %d, %Y, %I:%M:%S %p",
+    "%b %d, %Y %I:%M:%S %p",
+    "%b %d, %Y",
+    "%B %d, %Y",
+)
+
+
+def _number(value) -> Optional[float]:
+    """parseFloat-like conversion of stored values ("" and junk become None)."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _data(record: Dict) -> Dict:
+    # Pain logs keep a list of snapshots under "data"
+    data = record.get("data")
+    return data if isinstance(data, dict) else {}
+
+
+def activity_datetime(record: Dict) -> Optional[datetime]:
+    """Local (naive) date and time of a record, from its display date."""
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(record.get("date", ""), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def activity_day(record: Dict) -> Optional[date]:
+    """Local calendar day of a record, from its display date."""
+    local = activity_datetime(record)
+    return local.date() if local is not None else None
+
+
+def period_keys(day: date) -> Dict[str, str]:
+    """Bucket key of a day for each period (weeks are named by their Monday)."""
+    monday = day - timedelta(days=day.weekday())
+    return {"day": day.isoformat(), "week": monday.isoformat(), "month": day.strftime("%Y-%m")}
+
+
+def _interval_distance(value) -> Optional[float]:
+    if value in (None, "?"):
+        return None
+    if value == "0":
+        return 0.0
+    match = _UNIT.match(str(value))
+    if match is None or match.group(2) not in _LENGTH_UNITS:
+        return None
+    return float(match.group(1)) * _LENGTH_UNITS[match.group(2)]
+
+
+def _interval_duration(value) -> Optional[float]:
+    if value in (None, "?"):
+        return None
+    value = str(value)
+    if ":" in value:
+        minutes, seconds = value.split(":")[:2]
+        minutes, seconds = _number(minutes), _number(seconds)
+        return None if minutes is None or seconds is None else minutes * 60 + seconds
+    return _number(value)
+
+
+def _interval_paces(intervals: List) -> List[Optional[float]]:
+    """Pace (s/m) of each interval, None where distance or time is unknown."""
+    paces = []
+    for interval in intervals:
+        distance = _interval_distance(interval.get("distance")) if isinstance(interval, dict) else None
+        duration = _interval_duration(interval.get("time")) if isinstance(interval, dict) else None
+        if distance is None or duration is None:
+            paces.append(None)
+        else:
+            paces.append(duration / distance if distance > 0 else math.inf)
+    return paces
+
+
+def _leading_int(text: str) -> int:
+    """parseInt: the leading digits of text, or 0."""
+    match = re.match(r"\s*(\d+)", text)
+    return int(match.group(1)) if match else 0
+
+
+def _lift_reps(exercises: List) -> int:
+    """Total reps of a lift, counted like natural_reps_parse in the frontend."""
+    total = 0
+    for exercise in exercises:
+        if isinstance(exercise, str):
+            _, _, reps = exercise.partition(":")
+            for rep in reps.split(","):
+                if not rep.strip():
+                    continue
+                parts = rep.split("x")
+                if len(parts) == 3:
+                    total += _leading_int(parts[0]) * _leading_int(parts[1])
+                else:
+                    total += _leading_int(parts[0])
+        elif isinstance(exercise, dict):
+            reps = exercise.get("reps")
+            values = reps if isinstance(reps, list) else [reps]
+            total += sum(_leading_int(str(r)) for r in values)
+    return total
+
+
+def _moving_time(record: Dict) -> float:
+    """Training time in seconds, like training_time in metrics.tsx."""
+    data = _data(record)
+    kind = record.get("type")
+    if kind == "run" and record.get("version") == 1:
+        return _number(data.get("duration")) or 0.0
+    if kind in ("run", "row", "bike", "elliptical"):
+        return _number(data.get("moving_time")) or 0.0
+    if kind == "kayak":
+        return (_number(data.get("duration")) or 0.0) * 60
+    if kind == "lift":
+        minutes = _number(data.get("duration")) or 0.0
+        if minutes < 1:
+            return float(_lift_reps(data.get("exercises") or []) * LIFT_SECONDS_PER_REP)
+        return minutes * 60
+    return 0.0  # sleep, pain and notes are not training
+
+
+def activity_metrics(record: Dict) -> Dict[str, Optional[float]]:
+    """One activity's contribution to the aggregates.
+
+    Args:
+        record: Processed activity (strava_export.json) or log entry (log.json)
+
+    Returns:
+        Dictionary with count, distance (m), moving_time (s), heart_beats,
+        strides and fastest_pace (s/m, runs only)
+    """
+    data = _data(record)
+    kind = record.get("type")
+    moving_time = _moving_time(record)
+
+    heart_beats = 0.0
+    if kind in ("run", "bike", "elliptical"):
+        heartrate = _number(data.get("average_heartrate") or data.get("average_heart_rate"))
+        heart_beats = moving_time / 60 * ((heartrate or HEARTRATE_GUESS) - BASELINE_HEARTRATE)
+    elif kind in ("kayak", "row", "lift"):
+        heart_beats = moving_time / 60 * (HEARTRATE_GUESS - BASELINE_HEARTRATE)
+
+    distance = _number(data.get("distance")) if kind in ("run", "bike", "elliptical") else None
+    strides, fastest_pace = 0, None
+    if kind == "run":
+        baseline = moving_time / distance if distance else math.inf
+        paces = [baseline]
+        if data.get("intervals"):
+            interval_paces = _interval_paces(data["intervals"])
+            strides = sum(1 for p in interval_paces if p is not None and p <= STRIDE_PACE)
+            paces = [baseline if p is None else p for p in interval_paces]
+        fastest_pace = min(paces)
+        if not math.isfinite(fastest_pace):
+            fastest_pace = None
+
+    return {
+        "count": 1,
+        "distance": distance or 0.0,
+        "moving_time": moving_time,
+        "heart_beats": heart_beats,
+        "strides": strides,
+        "fastest_pace": fastest_pace,
+    }
+
+
+def activity_groups(record: Dict) -> List[str]:
+    """Aggregate groups an activity counts towards: its type, and its gear if known."""
+    groups = [record.get("type", "unknown")]
+    gear = _data(record).get("shoe") or _data(record).get("gear")
+    if gear:
+        groups.append(f"gear:{gear}")
+    return groups
+
+
+def merge_metrics(contributions: Iterable[Dict[str, Optional[float]]]) -> Dict[str, Optional[float]]:
+    """Aggregate activity contributions into one bucket."""
+    contributions = list(contributions)
+    # fsum is exact, so a bucket comes out the same whatever order it was built in
+    totals: Dict[str, Optional[float]] = {
+        name: math.fsum(m[name] for m in contributions) for name in SUM_METRICS
+    }
+    paces = [m["fastest_pace"] for m in contributions if m["fastest_pace"] is not None]
+    for name in ("count", "strides"):
+        totals[name] = int(totals[name])
+    for name in ("distance", "moving_time", "heart_beats"):
+        totals[name] = round(totals[name], 1)
+    totals["fastest_pace"] = round(min(paces), 4) if paces else None
+    totals["average_pace"] = (
+        round(totals["moving_time"] / totals["distance"], 4) if totals["distance"] else None
+    )
+    return totals
+
+
+def _fingerprints(records: Iterable[Dict]) -> Iterator[Tuple[str, Dict]]:
+    """Content hash of each record; repeats of the same record get distinct keys."""
+    seen: Dict[str, int] = defaultdict(int)
+    for record in records:
+        digest = hashlib.blake2b(
+            json.dumps(record, sort_keys=True).encode(), digest_size=12
+        ).hexdigest()
+        seen[digest] += 1
+        yield (digest if seen[digest] == 1 else f"{digest}#{seen[digest]}"), record
+
+
+class Rollup:
+    """Incrementally maintained aggregates, one JSON file per period.
+
+    Every activity's contribution is remembered under a hash of its content,
+    so an update only computes contributions for new or changed activities
+    and only re-aggregates the buckets they (or removed activities) fall in.
+    """
+
+    def __init__(self, state_path: str, output_dir: str):
+        """Load the previous rollup, if any.
+
+        Args:
+            state_path: JSON file with each activity's contribution
+            output_dir: Directory receiving day.json, week.json and month.json
+        """
+        self.state_path = state_path
+        self.output_dir = output_dir
+        self.contributions: Dict[str, Dict] = {}
+        self.aggregates: Dict[str, Dict[str, Dict[str, Dict]]] = {p: {} for p in PERIODS}
+
+        state = None
+        if os.path.exists(state_path):
+            with open(state_path, "r") as f:
+                state = json.load(f)
+        if state is not None and state.get("version") == ROLLUP_VERSION:
+            self.contributions = state["activities"]
+            for period in PERIODS:
+                path = self._output_path(period)
+                if not os.path.exists(path):
+                    # Outputs were deleted; rebuild them from the remembered contributions
+                    self.contributions = {}
+                    break
+                with open(path, "r") as f:
+                    self.aggregates[period] = json.load(f)["groups"]
+
+    def _output_path(self, period: str) -> str:
+        return os.path.join(self.output_dir, f"{period}.json")
+
+    def update(self, records: Iterable[Dict]) -> int:
+        """Bring the aggregates in line with the current set of records.
+
+        Args:
+            records: Every activity and log entry, in any order
+
+        Returns:
+            Number of buckets recomputed
+        """
+        current = dict(_fingerprints(records))
+        touched: Set[Tuple[str, str]] = set()  # (group, day)
+
+        for key in self.contributions.keys() - current.keys():
+            removed = self.contributions.pop(key)
+            touched.update((group, removed["day"]) for group in removed["groups"])
+        for key in current.keys() - self.contributions.keys():
+            day = activity_day(current[key])
+            if day is None:
+                continue
+            added = {
+                "day": day.isoformat(),
+                "groups": activity_groups(current[key]),
+                "metrics": activity_metrics(current[key]),
+            }
+            self.contributions[key] = added
+            touched.update((group, added["day"]) for group in added["groups"])
+        if not touched:
+            return 0
+
+        # (period, group, bucket) -> contributions, for the touched buckets only
+        buckets = {
+            (period, group, bucket)
+            for group, day in touched
+            for period, bucket in period_keys(date.fromisoformat(day)).items()
+        }
+        members: Dict[Tuple[str, str, str], List[Dict]] = defaultdict(list)
+        for contribution in self.contributions.values():
+            keys = period_keys(date.fromisoformat(contribution["day"]))
+            for group in contribution["groups"]:
+                for period, bucket in keys.items():
+                    if (period, group, bucket) in buckets:
+                        members[(period, group, bucket)].append(contribution["metrics"])
+
+        for period, group, bucket in buckets:
+            rows = self.aggregates[period].setdefault(group, {})
+            if members[(period, group, bucket)]:
+                rows[bucket] = merge_metrics(members[(period, group, bucket)])
+            else:
+                rows.pop(bucket, None)
+                if not rows:
+                    del self.aggregates[period][group]
+        return len(buckets)
+
+    def save(self):
+        """Write the per-period aggregates and the contribution state atomically."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        for period in PERIODS:
+            groups = {
+                group: dict(sorted(rows.items()))
+                for group, rows in sorted(self.aggregates[period].items())
+            }
+            _write_json(
+                self._output_path(period),
+                {"version": ROLLUP_VERSION, "period": period, "groups": groups},
+            )
+        _write_json(self.state_path, {"version": ROLLUP_VERSION, "activities": self.contributions})
+
+
+def _write_json(path: str, payload: Dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def read_log_records(paths: Iterable[str]) -> Iterator[Dict]:
+    """Stream the records of JSON log files that exist (e.g. log.json, strava_neltoid.json)."""
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                yield from json.load(f)
+
+
+DATA_DIR = os.path.join("..", "front", "src", "data")
+LOG_PATHS = (os.path.join(DATA_DIR, "strava_neltoid.json"), os.path.join(DATA_DIR, "log.json"))
+STATE_PATH = os.path.join("..", "data", "rollup_state.json")
+OUTPUT_DIR = os.path.join("..", "front", "public", "data", "rollup")
+
+
+def update_rollup(activities: Iterable[Dict], log_paths: Iterable[str] = LOG_PATHS) -> int:
+    """Refresh the rollup after an import.
+
+    Args:
+        activities: Processed Strava activities (e.g. ActivityStore.iter_activities())
+        log_paths: Hand-written and legacy logs to include
+
+    Returns:
+        Number of buckets recomputed
+    """
+    rollup = Rollup(STATE_PATH, OUTPUT_DIR)
+    changed = rollup.update(chain(activities, read_log_records(log_paths)))
+    if changed:
+        rollup.save()
+    print(f"Rollup: {changed} buckets recomputed")
+    return changed
+
+
+if __name__ == "__main__":
+    from .import_strava import open_store
+
+    parser = argparse.ArgumentParser(description="Rebuild the precomputed training rollups")
+    parser.add_argument("--full", action="store_true", help="recompute every bucket from scratch")
+    args = parser.parse_args()
+
+    if args.full and os.path.exists(STATE_PATH):
+        os.remove(STATE_PATH)
+    export_path = os.path.join(DATA_DIR, "strava_export.json")
+    store = open_store(os.path.join("..", "data", "store"), export_path)
+    update_rollup(store.iter_activities())
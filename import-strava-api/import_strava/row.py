@@ -0,0 +1,25 @@
+from .classify import CLASSIFIER
+from .parsers import register_parser
+from .utils import activity_timestamp, format_date, extract_common_data, parse_number
+
+
+@register_parser("Workout", version=1)
+def parse_row(activity):
+    # Only "Workout" activities that are rowing sessions are tracked
+    if not CLASSIFIER.matches("row", str(activity["Activity Name"])):
+        return None
+    timestamp = activity_timestamp(activity)
+    row = {
+        "type": "row",
+        "date": format_date(timestamp),
+        "timestamp": timestamp,
+        "data": {
+            **extract_common_data(activity),
+            "description": activity["Activity Description"],
+            "moving_time": parse_number(activity["Moving Time"]),
+            "elapsed_time": parse_number(activity["Elapsed Time"]),
+            "average_heart_rate": parse_number(activity["Average Heart Rate"]),
+            "max_heart_rate": parse_number(activity["Max Heart Rate"]),
+        },
+    }
+    return row
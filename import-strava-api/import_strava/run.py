@@ -1,6 +1,11 @@
-from typing import Any
-from .utils import contains_keywords, parse_date, extract_common_data
+from typing import Any, Optional
+from .utils import activity_timestamp, format_date, extract_common_data, parse_number
 from .cache import Cache
+from .classify import CLASSIFIER
+from .parsers import register_parser
+from .intervals import DETECTOR_VERSION, detect_run_intervals, is_detected
+from .store import ReviewQueue
+from .streams import StreamStore
 import os
 
 CACHE_VERSION_STRING = "runv1"
@@ -67,55 +72,89 @@ def could_be_workout(run: dict[str, Any])-> bool:
     description = run["data"]["description"]
     private_note = run["data"]["private_note"]
     title = run["data"]["title"]
-    keywords = ["workout", "strides", "tempo", "x(", "race", "mile", "4x4", "800m"]
-    return contains_keywords((description + private_note + title).lower(), keywords) or private_note != ""
+    text = description + private_note + title
+    return CLASSIFIER.matches("workout", text) or private_note != ""
 
 
-def parse_run_for_workout(run: dict[str, Any], cache: Cache):
+def detect_workout(strava_id, cache: Cache, streams: StreamStore) -> bool:
+    """Fill in the cache from the run's streams, unless it holds manual intervals.
+
+    Detected intervals from an older detector version are re-detected.
+
+    Returns:
+        True if the cache now holds intervals (or a "not a workout" answer) for
+        the run, so there is no need to prompt for it
+    """
+    if strava_id not in streams:
+        return False
+    if cache.contains(strava_id, CACHE_VERSION_STRING):
+        cached = cache.get(strava_id, CACHE_VERSION_STRING)
+        if not is_detected(cached) or cached[0]["detector"] == DETECTOR_VERSION:
+            return True
+    intervals = detect_run_intervals(streams, strava_id)
+    if intervals is None:
+        return False
+    cache.set(strava_id, CACHE_VERSION_STRING, intervals)
+    return True
+
+
+def prompt_for_intervals(run: dict[str, Any], cache: Cache):
+    """Ask for a run's workout intervals and cache the answer (if any)."""
+    strava_id = run["data"]["strava_id"]
+    print(f"{run['date']}: {run['data']['title']}")
+    print(f"description: {run['data']['description']}")
+    print(f"private_note: {run['data']['private_note']}")
+    intervals = input_intervals(strava_id)
+    if intervals == NOT_A_WORKOUT:
+        cache.set(strava_id, CACHE_VERSION_STRING, None)
+    elif intervals is not None:
+        cache.set(strava_id, CACHE_VERSION_STRING, intervals)
+
+
+def parse_run_for_workout(
+    run: dict[str, Any],
+    cache: Cache,
+    streams: Optional[StreamStore] = None,
+    review_queue: Optional[ReviewQueue] = None,
+):
     assert run["type"] == "run"
-    description = run["data"]["description"]
-    private_note = run["data"]["private_note"]
-    title = run["data"]["title"]
 
     strava_id = run["data"]["strava_id"]
     if could_be_workout(run):
-        if not os.getenv("NO_INPUT", None) and not cache.contains(
-            strava_id, CACHE_VERSION_STRING
-        ):
-            print(f"{run['date']}: {title}")
-            print(f"description: {description}")
-            print(f"private_note: {private_note}")
-            intervals = input_intervals(strava_id)
-            if intervals == NOT_A_WORKOUT:
-                cache.set(strava_id, CACHE_VERSION_STRING, None)
-            elif intervals is not None:
-                cache.set(strava_id, CACHE_VERSION_STRING, intervals)
+        detected = streams is not None and detect_workout(strava_id, cache, streams)
+        needs_intervals = not detected and not cache.contains(strava_id, CACHE_VERSION_STRING)
+        if needs_intervals and review_queue is not None:
+            # Two-phase mode: leave the prompt to the review command
+            review_queue.add(strava_id)
+        elif needs_intervals and not os.getenv("NO_INPUT", None):
+            prompt_for_intervals(run, cache)
 
     if cache.contains(strava_id, CACHE_VERSION_STRING):
-        run["data"]["intervals"] = cache.get(strava_id)
+        run["data"]["intervals"] = cache.get(strava_id, CACHE_VERSION_STRING)
     return run
 
 
-def parse_run(activity, cache: Cache):
+@register_parser("Run", version=2)
+def build_run(activity):
     activity_id = int(activity["Activity ID"])
     if activity_id == 13220250113:
         return
-    run = {
-        "version": 2,
+    timestamp = activity_timestamp(activity)
+    return {
         "type": "run",
-        "date": parse_date(activity["Activity Date"]),
+        "date": format_date(timestamp),
+        "timestamp": timestamp,
         "data": {
             **extract_common_data(activity),
-            "distance": activity["Distance"],
-            "moving_time": activity["Moving Time"],
-            "elapsed_time": activity["Elapsed Time"],
-            "temperature": activity["Average Temperature"],
-            "feels_like": activity["Apparent Temperature"],
+            "distance": parse_number(activity["Distance"]),
+            "moving_time": parse_number(activity["Moving Time"]),
+            "elapsed_time": parse_number(activity["Elapsed Time"]),
+            "temperature": parse_number(activity["Average Temperature"]),
+            "feels_like": parse_number(activity["Apparent Temperature"]),
             "description": activity["Activity Description"],
             "private_note": activity["Activity Private Note"],
             "shoe": activity["Activity Gear"],
-            "average_heartrate": activity["Average Heart Rate"],
+            "average_heartrate": parse_number(activity["Average Heart Rate"]),
         },
     }
-    run = parse_run_for_workout(run, cache)
-    return run
+
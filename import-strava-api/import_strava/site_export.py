@@ -0,0 +1,173 @@
+"""Month-sharded static export of every record, with a manifest for lazy loading by the site."""
+
+import argparse
+import hashlib
+import json
+import os
+from collections import defaultdict
+from datetime import datetime
+from itertools import chain
+from typing import Dict, Iterable, List, Optional
+
+from .columnar import export_columnar
+from .metrics import METRICS
+from .rollup import LOG_PATHS, activity_datetime, read_log_records, update_rollup
+from .store import ActivityStore
+from .utils import typed_numbers
+
+MANIFEST_VERSION = 1
+
+SITE_DATA_DIR = os.path.join("..", "front", "public", "data")
+
+# Records without a usable date still need a home
+UNDATED_SHARD = "undated"
+
+
+def shard_name(local: Optional[datetime]) -> str:
+    """Shard a record belongs to: "YYYY/MM" by its local date."""
+    return f"{local:%Y/%m}" if local is not None else UNDATED_SHARD
+
+
+def _serialize(records: List[Dict]) -> bytes:
+    return json.dumps(records, separators=(",", ":")).encode()
+
+
+def export_shards(records: Iterable[Dict], output_dir: str = SITE_DATA_DIR) -> int:
+    """Write records as one JSON file per month, plus manifest.json.
+
+    Shards hold their records newest first, like strava_export.json. A shard
+    file is only rewritten when its content hash changes, and shards whose
+    month no longer has any records are deleted, so a sync touches only the
+    months it actually changed.
+
+    Args:
+        records: Every activity and log entry to publish
+        output_dir: Site data directory; shards go under shards/YYYY/MM.json
+
+    Returns:
+        Number of shard files written or deleted
+    """
+    dated: Dict[str, List] = defaultdict(list)
+    for record in records:
+        local = activity_datetime(record)
+        dated[shard_name(local)].append((local or datetime.min, record))
+
+    manifest_path = os.path.join(output_dir, "manifest.json")
+    previous: Dict[str, Dict] = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r") as f:
+            previous = {shard["name"]: shard for shard in json.load(f)["shards"]}
+
+    shards = []
+    changed = 0
+    # Newest month first, undated records last
+    for name in sorted(dated, key=lambda name: (name != UNDATED_SHARD, name), reverse=True):
+        # Stable sort, so records with the same timestamp keep their input order
+        entries = sorted(dated[name], key=lambda entry: entry[0], reverse=True)
+        payload = _serialize([record for _, record in entries])
+        path = f"shards/{name}.json"
+        full_path = os.path.join(output_dir, *path.split("/"))
+        digest = hashlib.sha256(payload).hexdigest()
+
+        old = previous.get(name)
+        if old is None or old["sha256"] != digest or not os.path.exists(full_path):
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            tmp_path = f"{full_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, full_path)
+            METRICS.incr("export_bytes_written", len(payload), file="shards")
+            changed += 1
+
+        dates = [local for local, _ in entries if local != datetime.min]
+        shards.append(
+            {
+                "name": name,
+                "path": path,
+                "count": len(entries),
+                "first": min(dates).isoformat() if dates else None,
+                "last": max(dates).isoformat() if dates else None,
+                "bytes": len(payload),
+                "sha256": digest,
+            }
+        )
+
+    for name in previous.keys() - dated.keys():
+        stale_path = os.path.join(output_dir, *previous[name]["path"].split("/"))
+        if os.path.exists(stale_path):
+            os.remove(stale_path)
+        changed += 1
+
+    if changed or not os.path.exists(manifest_path):
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "count": sum(shard["count"] for shard in shards),
+            "shards": shards,
+        }
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+    print(f"Shards: {changed} of {len(shards)} rewritten")
+    return changed
+
+
+def publish(store: ActivityStore, export_path: str, log_paths: Iterable[str] = LOG_PATHS):
+    """Regenerate everything the site reads after the store changed.
+
+    Writes the monolithic export and its columnar twin, the month shards with
+    their manifest, and the rollups. Numeric fields are published as numbers,
+    whatever form older store rows hold them in.
+
+    Args:
+        store: ActivityStore holding the processed activities
+        export_path: Path to strava_export.json
+        log_paths: Hand-written and legacy logs published alongside the activities
+    """
+    print(f"\nExporting activities to {export_path}...")
+    store.export_json(export_path, transform=typed_numbers)
+    with METRICS.span("publish", step="load"):
+        activities = [typed_numbers(activity) for activity in store.iter_activities()]
+        logs = [typed_numbers(record) for record in read_log_records(log_paths)]
+    with METRICS.span("publish", step="columnar"):
+        export_columnar(activities, columnar_path(export_path))
+    with METRICS.span("publish", step="shards"):
+        export_shards(chain(activities, logs))
+    with METRICS.span("publish", step="rollup"):
+        update_rollup(activities, log_paths)
+
+
+def add_publish_argument(parser):
+    """Add the --publish option to a command that changes the activity store."""
+    parser.add_argument(
+        "--publish", action="store_true", help="regenerate the site data when the command finishes"
+    )
+
+
+def publish_if_requested(store: ActivityStore, export_path: str, requested: bool):
+    """Publish now if --publish was given, otherwise say how to publish later.
+
+    Publishing rewrites every export file, so commands that change the store
+    leave it to an explicit step instead of paying for it on every sync.
+    """
+    if requested:
+        publish(store, export_path)
+    else:
+        print("\nSite data not regenerated; run python -m import_strava.site_export to publish")
+
+
+def columnar_path(export_path: str) -> str:
+    """strava_export.json -> strava_export.columns.json"""
+    root, ext = os.path.splitext(export_path)
+    return f"{root}.columns{ext}"
+
+
+
+if __name__ == "__main__":
+    from .import_strava import open_store
+
+    parser = argparse.ArgumentParser(description="Regenerate the site data from the activity store")
+    parser.parse_args()
+
+    export_path = os.path.join("..", "front", "src", "data", "strava_export.json")
+    publish(open_store(os.path.join("..", "data", "store"), export_path), export_path)
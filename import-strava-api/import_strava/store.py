@@ -0,0 +1,381 @@
+"""Append-only, indexed storage for processed activities."""
+
+import bisect
+import hashlib
+import json
+import os
+import struct
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .metrics import METRICS
+from .utils import parse_display_timestamp
+
+# strava_id (or synthetic key), timestamp, segment number, byte offset, byte length
+_ENTRY = struct.Struct("<qqIQI")
+
+
+def activity_key(activity: Dict) -> int:
+    """Index key of a processed activity.
+
+    This is the Strava ID. A few old entries predate strava_id; those get a
+    stable negative key derived from their type and date instead.
+    """
+    strava_id = activity.get("data", {}).get("strava_id")
+    if strava_id is not None and str(strava_id) != "":
+        return int(strava_id)
+    digest = hashlib.blake2b(
+        f"{activity.get('type')}|{activity.get('date')}".encode(), digest_size=8
+    ).digest()
+    return -(int.from_bytes(digest, "little") >> 1) - 1
+
+
+def record_timestamp(activity: Dict) -> int:
+    """Sort timestamp of a processed activity record (0 if it has no usable date).
+
+    Unlike utils.activity_timestamp, which reads CSV-format activities, this
+    reads the "timestamp" and display "date" of records already in the store.
+    """
+    timestamp = activity.get("timestamp")
+    if timestamp is not None:
+        return timestamp
+    try:
+        return parse_display_timestamp(activity.get("date", ""))
+    except (ValueError, TypeError):
+        return 0
+
+
+class ActivityStore:
+    """Append-only segment log of processed activities.
+
+    Each activity is written once as a JSON line to the current segment file,
+    and a fixed-size entry (key, timestamp, segment, offset, length) is
+    appended to the index file. Appending N activities costs O(N) I/O no matter
+    how large the history is. Re-appending an activity supersedes the earlier
+    copy; removing one appends a zero-length tombstone entry. compact()
+    reclaims the space of superseded and removed records.
+
+    The index is read into memory on open and kept both as a key -> location
+    map and as a timestamp-ordered list of keys. Only one process should write
+    to a store at a time.
+    """
+
+    INDEX_FILE = "index.bin"
+    WATERMARK_FILE = "watermark.json"
+    SEGMENT_BYTES = 8 * 1024 * 1024
+    # open_store compacts once superseded records take up this share of the segments
+    COMPACT_GARBAGE = 0.5
+
+    def __init__(self, directory: str):
+        """Open (or create) an activity store.
+
+        Args:
+            directory: Directory holding the index and segment files
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, self.INDEX_FILE)
+        self.watermark_path = os.path.join(directory, self.WATERMARK_FILE)
+
+        self.locations: Dict[int, Tuple[int, int, int, int]] = {}
+        self.ordered: List[Tuple[int, int]] = []
+        self.segment = 0
+        self._load_index()
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"segment-{segment:05d}.jsonl")
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "rb") as f:
+            data = f.read()
+
+        segment_sizes: Dict[int, int] = {}
+        usable = len(data) - len(data) % _ENTRY.size
+        for key, timestamp, segment, offset, length in _ENTRY.iter_unpack(data[:usable]):
+            if segment not in segment_sizes:
+                path = self._segment_path(segment)
+                segment_sizes[segment] = os.path.getsize(path) if os.path.exists(path) else 0
+            if offset + length > segment_sizes[segment]:
+                # Index entry for a record whose write never completed
+                continue
+            if length == 0:
+                self.locations.pop(key, None)
+            else:
+                self.locations[key] = (timestamp, segment, offset, length)
+            self.segment = max(self.segment, segment)
+
+        self.ordered = sorted((loc[0], key) for key, loc in self.locations.items())
+
+    def __contains__(self, strava_id) -> bool:
+        try:
+            return int(strava_id) in self.locations
+        except (TypeError, ValueError):
+            return False
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def ids(self) -> Iterator[int]:
+        """Keys of all stored activities."""
+        return iter(self.locations)
+
+    def _unorder(self, key: int):
+        timestamp = self.locations[key][0]
+        i = bisect.bisect_left(self.ordered, (timestamp, key))
+        if i < len(self.ordered) and self.ordered[i] == (timestamp, key):
+            del self.ordered[i]
+
+    def extend(self, activities: Iterable[Dict]) -> int:
+        """Append activities to the log.
+
+        Activities are consumed one at a time, so a generator can be passed in
+        without materializing it.
+
+        Args:
+            activities: Processed activity dictionaries
+
+        Returns:
+            Number of activities appended
+        """
+        count = 0
+        written = 0
+        segment_file = open(self._segment_path(self.segment), "ab")
+        index_file = open(self.index_path, "ab")
+        try:
+            for activity in activities:
+                if segment_file.tell() >= self.SEGMENT_BYTES:
+                    segment_file.close()
+                    self.segment += 1
+                    segment_file = open(self._segment_path(self.segment), "ab")
+
+                key = activity_key(activity)
+                timestamp = record_timestamp(activity)
+                line = json.dumps(activity).encode() + b"\n"
+                offset = segment_file.tell()
+                segment_file.write(line)
+                written += len(line)
+                index_file.write(_ENTRY.pack(key, timestamp, self.segment, offset, len(line)))
+
+                if key in self.locations:
+                    self._unorder(key)
+                self.locations[key] = (timestamp, self.segment, offset, len(line))
+                bisect.insort(self.ordered, (timestamp, key))
+                count += 1
+        finally:
+            # Segment data must be durable before the index entries pointing at it
+            with METRICS.span("store_fsync"):
+                segment_file.flush()
+                os.fsync(segment_file.fileno())
+                segment_file.close()
+                index_file.flush()
+                os.fsync(index_file.fileno())
+                index_file.close()
+            METRICS.incr("store_appends", count)
+            METRICS.incr("store_bytes_written", written)
+        return count
+
+    def append(self, activity: Dict):
+        """Append a single activity to the log."""
+        self.extend([activity])
+
+    def remove(self, *keys: int):
+        """Remove activities by key; keys that are not stored are ignored."""
+        keys = [key for key in keys if key in self.locations]
+        if not keys:
+            return
+        with open(self.index_path, "ab") as f:
+            for key in keys:
+                f.write(_ENTRY.pack(key, 0, self.segment, 0, 0))
+            # Like appends, a tombstone must be durable before it counts
+            f.flush()
+            os.fsync(f.fileno())
+        for key in keys:
+            self._unorder(key)
+            del self.locations[key]
+
+    def garbage_fraction(self) -> float:
+        """Share of the segment bytes held by superseded or removed records."""
+        total = sum(os.path.getsize(path) for path in self._segment_paths())
+        live = sum(location[3] for location in self.locations.values())
+        return 1 - live / total if total else 0.0
+
+    def _segment_paths(self) -> List[str]:
+        return [
+            os.path.join(self.directory, name)
+            for name in sorted(os.listdir(self.directory))
+            if name.startswith("segment-") and name.endswith(".jsonl")
+        ]
+
+    def compact(self, min_garbage: float = 0.0) -> bool:
+        """Rewrite the live records into fresh segments and a fresh index.
+
+        Re-appended and removed records leave their old bytes and index
+        entries behind, so the store grows with every patch. Compaction copies
+        only the live records, in timestamp order, into segments numbered
+        after the current ones, then atomically replaces the index and
+        deletes the old segments. A crash before the index is replaced leaves
+        the old store intact.
+
+        Args:
+            min_garbage: Only compact if at least this share of the segment
+                bytes is garbage (see garbage_fraction)
+
+        Returns:
+            Whether the store was compacted
+        """
+        if self.garbage_fraction() <= min_garbage or not self.locations:
+            return False
+        old_paths = self._segment_paths()
+        segment = self.segment + 1
+        locations: Dict[int, Tuple[int, int, int, int]] = {}
+        tmp_index_path = f"{self.index_path}.tmp"
+        handles = {}
+        segment_file = open(self._segment_path(segment), "wb")
+        index_file = open(tmp_index_path, "wb")
+        try:
+            for timestamp, key in self.ordered:
+                _, old_segment, offset, length = self.locations[key]
+                if old_segment not in handles:
+                    handles[old_segment] = open(self._segment_path(old_segment), "rb")
+                f = handles[old_segment]
+                f.seek(offset)
+                line = f.read(length)
+                if segment_file.tell() >= self.SEGMENT_BYTES:
+                    segment_file.flush()
+                    os.fsync(segment_file.fileno())
+                    segment_file.close()
+                    segment += 1
+                    segment_file = open(self._segment_path(segment), "wb")
+                offset = segment_file.tell()
+                segment_file.write(line)
+                index_file.write(_ENTRY.pack(key, timestamp, segment, offset, length))
+                locations[key] = (timestamp, segment, offset, length)
+        finally:
+            for f in handles.values():
+                f.close()
+            segment_file.flush()
+            os.fsync(segment_file.fileno())
+            segment_file.close()
+            index_file.flush()
+            os.fsync(index_file.fileno())
+            index_file.close()
+        os.replace(tmp_index_path, self.index_path)
+
+        live = {self._segment_path(s) for s in range(self.segment + 1, segment + 1)}
+        for path in old_paths:
+            if path not in live:
+                os.remove(path)
+        self.locations = locations
+        self.segment = segment
+        return True
+
+    def _read(self, location: Tuple[int, int, int, int]) -> Dict:
+        _, segment, offset, length = location
+        with open(self._segment_path(segment), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def get(self, strava_id) -> Optional[Dict]:
+        """Read one activity by Strava ID, or None if it is not stored."""
+        location = self.locations.get(int(strava_id))
+        return self._read(location) if location else None
+
+    def iter_activities(self, newest_first: bool = True) -> Iterator[Dict]:
+        """Iterate over stored activities in timestamp order."""
+        keys = reversed(self.ordered) if newest_first else iter(self.ordered)
+        handles = {}
+        try:
+            for _, key in keys:
+                _, segment, offset, length = self.locations[key]
+                if segment not in handles:
+                    handles[segment] = open(self._segment_path(segment), "rb")
+                f = handles[segment]
+                f.seek(offset)
+                yield json.loads(f.read(length))
+        finally:
+            for f in handles.values():
+                f.close()
+
+    def get_watermark(self) -> Optional[Dict]:
+        """Sync watermark: the newest Strava start time (and its activity ID) seen so far.
+
+        Returns:
+            Dictionary with "start_timestamp" (true UTC epoch seconds) and
+            "strava_id", or None if no sync has recorded one yet
+        """
+        if not os.path.exists(self.watermark_path):
+            return None
+        with open(self.watermark_path, "r") as f:
+            return json.load(f)
+
+    def set_watermark(self, start_timestamp: int, strava_id: int):
+        """Advance the sync watermark (it never moves backwards)."""
+        current = self.get_watermark()
+        if current and current["start_timestamp"] >= start_timestamp:
+            return
+        tmp_path = f"{self.watermark_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"start_timestamp": start_timestamp, "strava_id": strava_id}, f)
+        os.replace(tmp_path, self.watermark_path)
+
+    def export_json(self, export_path: str, transform: Optional[Callable[[Dict], Dict]] = None):
+        """Write every stored activity, newest first, to a JSON export file.
+
+        Args:
+            export_path: Path to the JSON export file
+            transform: Applied to each activity before it is written (optional)
+        """
+        activities = self.iter_activities()
+        if transform is not None:
+            activities = map(transform, activities)
+        tmp_path = f"{export_path}.tmp"
+        with METRICS.span("export_json"):
+            with open(tmp_path, "w") as f:
+                json.dump(list(activities), f, indent=2)
+            os.replace(tmp_path, export_path)
+        METRICS.incr("export_bytes_written", os.path.getsize(export_path), file="strava_export.json")
+
+
+class ReviewQueue:
+    """Persistent queue of runs waiting for someone to review their workout intervals.
+
+    Imports add flagged runs here instead of prompting, and the review
+    command (python -m import_strava.review) works through them later.
+    """
+
+    def __init__(self, path: str):
+        """Open (or create) a review queue.
+
+        Args:
+            path: Path of the JSON file holding the queued Strava IDs
+        """
+        self.path = path
+        self.pending: Dict[int, None] = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                self.pending = dict.fromkeys(json.load(f))
+
+    def __contains__(self, strava_id) -> bool:
+        return int(strava_id) in self.pending
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(list(self.pending))
+
+    def add(self, strava_id):
+        """Queue a run for review (call save() to persist)."""
+        self.pending[int(strava_id)] = None
+
+    def remove(self, strava_id):
+        """Drop a run from the queue (call save() to persist)."""
+        self.pending.pop(int(strava_id), None)
+
+    def save(self):
+        """Persist the queue."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(list(self.pending), f)
+        os.replace(tmp_path, self.path)
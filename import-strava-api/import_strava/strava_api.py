@@ -1,53 +1,80 @@
 """Strava API client for fetching activity data."""
 
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Container, Iterable, List, Dict, Optional
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
 
-from .auth import StravaAuth
+from .auth import DEFAULT_BASE_URL, StravaAuth, strava_base_url
+from .gear import GearLookup
+from .metrics import METRICS, endpoint_label
+from .rate_limit import RateLimiter
+from .streams import StreamStore
+
+# Stream types requested from /activities/{id}/streams
+STREAM_KEYS = ("time", "distance", "heartrate", "cadence", "altitude", "latlng")
 
 
 class StravaAPI:
     """Client for interacting with the Strava API."""
 
-    BASE_URL = "https://www.strava.com/api/v3"
+    API_PATH = "/api/v3"
+
+    MAX_RETRIES = 5
 
-    def __init__(self, auth: StravaAuth):
+    def __init__(
+        self,
+        auth: StravaAuth,
+        max_workers: int = 4,
+        rate_limiter: Optional[RateLimiter] = None,
+        base_url: Optional[str] = None,
+    ):
         """Initialize the API client.
 
         Args:
             auth: StravaAuth instance for authentication
+            max_workers: Maximum number of concurrent detail requests
+            rate_limiter: Shared rate limiter (default: one persisted in
+                .strava_rate_limit.json, or an in-memory one for any server
+                other than Strava)
+            base_url: Server to talk to (default: see auth.strava_base_url)
         """
         self.auth = auth
-        self.rate_limit_short = []  # Track requests in 15-min window
-        self.rate_limit_daily = []  # Track requests in 24-hour window
+        self.max_workers = max_workers
+        base_url = strava_base_url(base_url)
+        self.base_url = f"{base_url}{self.API_PATH}"
+        if rate_limiter is None:
+            # A stand-in server must not use up the real account's recorded budget
+            rate_limiter = RateLimiter() if base_url == DEFAULT_BASE_URL else RateLimiter(state_file=None)
+        self.rate_limiter = rate_limiter
+
+        # One keep-alive connection pool shared by all requests and worker threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
     def _wait_for_rate_limit(self):
-        """Wait if approaching rate limits (100 per 15min, 1000 per day)."""
-        now = time.time()
-
-        # Clean old requests
-        cutoff_short = now - 900  # 15 minutes
-        cutoff_daily = now - 86400  # 24 hours
-
-        self.rate_limit_short = [t for t in self.rate_limit_short if t > cutoff_short]
-        self.rate_limit_daily = [t for t in self.rate_limit_daily if t > cutoff_daily]
-
-        # Check short-term limit (100 per 15 min)
-        if len(self.rate_limit_short) >= 100:
-            sleep_time = 900 - (now - self.rate_limit_short[0])
-            if sleep_time > 0:
-                print(f"Rate limit approaching, waiting {sleep_time:.0f} seconds...")
-                time.sleep(sleep_time)
+        """Wait until the shared rate limiter grants a request.
 
-        # Check daily limit (1000 per day)
-        if len(self.rate_limit_daily) >= 1000:
-            raise Exception("Daily rate limit of 1000 requests exceeded")
+        Raises:
+            RateLimitExceeded: If the daily limit has been reached
+        """
+        with METRICS.span("rate_limit_wait"):
+            slept = self.rate_limiter.acquire()
+        if slept:
+            METRICS.incr("rate_limit_sleep_seconds", slept)
 
     def _make_request(self, endpoint: str, params: Optional[Dict] = None) -> requests.Response:
         """Make an authenticated API request with rate limiting.
 
+        Rate-limit headers from every response are fed back into the limiter. On
+        a 429 the request is retried after the limiter's window resets (or the
+        server's Retry-After), backing off exponentially if neither is known.
+
         Args:
             endpoint: API endpoint (e.g., "/athlete/activities")
             params: Optional query parameters
@@ -57,26 +84,32 @@ class StravaAPI:
 
         Raises:
             requests.exceptions.RequestException: If request fails
+            RateLimitExceeded: If the daily limit has been reached
         """
-        self._wait_for_rate_limit()
-
-        access_token = self.auth.get_access_token()
-        headers = {"Authorization": f"Bearer {access_token}"}
-
-        url = f"{self.BASE_URL}{endpoint}"
-        response = requests.get(url, headers=headers, params=params or {}, timeout=30)
-
-        # Record this request
-        now = time.time()
-        self.rate_limit_short.append(now)
-        self.rate_limit_daily.append(now)
+        url = f"{self.base_url}{endpoint}"
+        label = endpoint_label(endpoint)
+        backoff = 1.0
+        for attempt in range(self.MAX_RETRIES + 1):
+            self._wait_for_rate_limit()
+
+            access_token = self.auth.get_access_token()
+            headers = {"Authorization": f"Bearer {access_token}"}
+            with METRICS.span("http_request", endpoint=label):
+                response = self.session.get(url, headers=headers, params=params or {}, timeout=30)
+            METRICS.incr("http_requests", endpoint=label, status=response.status_code)
+            METRICS.incr("response_bytes", len(response.content), endpoint=label)
+            self.rate_limiter.update_from_headers(response.headers)
+
+            if response.status_code != 429 or attempt == self.MAX_RETRIES:
+                break
 
-        # Handle rate limiting response
-        if response.status_code == 429:
-            retry_after = int(response.headers.get("Retry-After", 900))
-            print(f"Rate limited by Strava. Waiting {retry_after} seconds...")
-            time.sleep(retry_after)
-            return self._make_request(endpoint, params)  # Retry
+            retry_after = response.headers.get("Retry-After")
+            wait = float(retry_after) if retry_after else self.rate_limiter.seconds_until_available()
+            wait = max(wait, backoff)
+            backoff *= 2
+            print(f"Rate limited by Strava. Waiting {wait:.0f} seconds...")
+            METRICS.incr("retry_sleep_seconds", wait)
+            time.sleep(wait)
 
         response.raise_for_status()
         return response
@@ -85,14 +118,20 @@ class StravaAPI:
         self,
         after: Optional[int] = None,
         per_page: int = 100,
-        max_pages: Optional[int] = None
+        max_pages: Optional[int] = None,
+        stop_at_ids: Optional[Container[str]] = None,
     ) -> List[Dict]:
         """Fetch activities from Strava API.
 
+        Without `after`, Strava lists activities newest first, so paging can
+        stop as soon as an already-known activity shows up.
+
         Args:
             after: Unix timestamp to fetch activities after (optional)
             per_page: Number of activities per page (max 200, default 100)
             max_pages: Maximum number of pages to fetch (default: all)
+            stop_at_ids: Known activity IDs; when listing newest first, stop at
+                the first of these (it and older activities are not returned)
 
         Returns:
             List of activity dictionaries from Strava API
@@ -115,6 +154,13 @@ class StravaAPI:
             if not page_activities:
                 break  # No more activities
 
+            if stop_at_ids is not None and not after:
+                known = [str(a.get("id", "")) in stop_at_ids for a in page_activities]
+                if any(known):
+                    activities.extend(page_activities[: known.index(True)])
+                    print("  Reached already-known activities, stopping")
+                    break
+
             activities.extend(page_activities)
             print(f"  Fetched {len(page_activities)} activities")
 
@@ -126,11 +172,147 @@ class StravaAPI:
         print(f"Total activities fetched: {len(activities)}")
         return activities
 
-    def normalize_activity(self, activity: Dict) -> Dict:
+    def get_activity(self, activity_id) -> Dict:
+        """Fetch a single detailed activity.
+
+        Args:
+            activity_id: Strava activity ID
+
+        Returns:
+            Detailed activity dictionary from Strava API
+        """
+        return self._make_request(f"/activities/{activity_id}").json()
+
+    def get_athlete(self) -> Dict:
+        """Fetch the authenticated athlete's profile, including their shoes and bikes."""
+        return self._make_request("/athlete").json()
+
+    def get_gear(self, gear_id: str) -> Dict:
+        """Fetch a single piece of gear (shoe or bike).
+
+        Args:
+            gear_id: Strava gear ID (e.g. "g12345")
+
+        Returns:
+            Gear dictionary from Strava API
+        """
+        return self._make_request(f"/gear/{gear_id}").json()
+
+    def get_activity_details(self, activities: Iterable[Dict]) -> List[Dict]:
+        """Fetch the detailed versions of summary activities.
+
+        The summary listing leaves out fields such as the description, private
+        note, temperature and gear, so each activity is fetched individually,
+        up to max_workers at a time. The rate limiter is shared by all threads.
+
+        Args:
+            activities: Summary activity dictionaries from get_activities
+
+        Returns:
+            Detailed activity dictionaries in the same order. An activity whose
+            detail request fails is left out rather than returned as its
+            incomplete summary, so the caller can retry it later.
+        """
+        activities = list(activities)
+        if not activities:
+            return []
+
+        print(f"Fetching details for {len(activities)} activities...")
+        details: List[Optional[Dict]] = [None] * len(activities)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.get_activity, activity["id"]): i
+                for i, activity in enumerate(activities)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    details[i] = future.result()
+                except requests.exceptions.RequestException as e:
+                    print(f"Warning: Could not fetch details for {activities[i]['id']}: {e}")
+        return [detail for detail in details if detail is not None]
+
+    def get_activity_streams(self, activity_id) -> Dict[str, np.ndarray]:
+        """Fetch an activity's second-by-second streams.
+
+        Args:
+            activity_id: Strava activity ID
+
+        Returns:
+            Mapping of stream name (see streams.STREAM_SCHEMA) to array, with
+            lat/lng in degrees; empty if the activity has no streams
+        """
+        try:
+            response = self._make_request(
+                f"/activities/{activity_id}/streams",
+                {"keys": ",".join(STREAM_KEYS), "key_by_type": "true"},
+            )
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return {}  # Manual activities have no streams
+            raise
+
+        data = {name: stream.get("data") or [] for name, stream in response.json().items()}
+        if not data.get("time"):
+            return {}
+        streams = {"time": np.asarray(data["time"], dtype=np.int64)}
+        for name in ("distance", "heartrate", "cadence", "altitude"):
+            if data.get(name):
+                streams[name] = np.asarray(data[name], dtype=np.float64)
+        if data.get("latlng"):
+            latlng = np.asarray(data["latlng"], dtype=np.float64).reshape(-1, 2)
+            streams["lat"], streams["lng"] = latlng[:, 0], latlng[:, 1]
+        return streams
+
+    def fetch_streams(self, activity_ids: Iterable, store: StreamStore) -> int:
+        """Fetch streams for activities not yet in a stream store and write them to it.
+
+        Requests run up to max_workers at a time; only the calling thread
+        writes to the store.
+
+        Args:
+            activity_ids: Strava activity IDs
+            store: Stream store to write into
+
+        Returns:
+            Number of activities stored
+        """
+        activity_ids = [i for i in dict.fromkeys(activity_ids) if i not in store]
+        if not activity_ids:
+            return 0
+
+        print(f"Fetching streams for {len(activity_ids)} activities...")
+        written = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.get_activity_streams, activity_id): activity_id
+                for activity_id in activity_ids
+            }
+            for future in as_completed(futures):
+                activity_id = futures[future]
+                try:
+                    streams = future.result()
+                except requests.exceptions.RequestException as e:
+                    print(f"Warning: Could not fetch streams for {activity_id}: {e}")
+                    continue
+                if streams:
+                    store.write(activity_id, streams)
+                    written += 1
+        store.flush()
+        return written
+
+    @staticmethod
+    def start_timestamp(activity: Dict) -> int:
+        """Epoch seconds of an API activity's start (true UTC, from start_date)."""
+        start_date = activity["start_date"].replace("Z", "+00:00")
+        return int(datetime.fromisoformat(start_date).timestamp())
+
+    def normalize_activity(self, activity: Dict, gear: Optional[GearLookup] = None) -> Dict:
         """Convert API activity format to CSV-compatible dictionary.
 
         Args:
-            activity: Activity dictionary from Strava API
+            activity: Activity dictionary from Strava API (summary or detailed)
+            gear: Lookup used to name the activity's gear_id (optional)
 
         Returns:
             Dictionary matching the CSV format expected by existing parsers
@@ -138,7 +320,10 @@ class StravaAPI:
         # Convert ISO timestamp to CSV format "MMM DD, YYYY, HH:MM:SS AM"
         # Example API: "2025-09-14T02:23:26Z"
         # Example CSV: "Sep 14, 2025, 02:23:26 AM"
+        # The timestamp is true epoch from start_date, like CSV rows and the sync
+        # watermark; start_date_local is wall-clock time and only used for display
         start_date = activity.get("start_date_local", "")
+        timestamp = self.start_timestamp(activity) if activity.get("start_date") else None
         if start_date:
             try:
                 dt = datetime.fromisoformat(start_date.replace("Z", ""))
@@ -149,19 +334,28 @@ class StravaAPI:
         else:
             formatted_date = ""
 
+        if gear is not None:
+            if activity.get("gear"):
+                gear.remember(activity["gear"])  # Detailed activities embed their gear
+            gear_name = gear.name(activity.get("gear_id"))
+        else:
+            gear_name = (activity.get("gear") or {}).get("name", "")
+
         return {
             "Activity ID": str(activity.get("id", "")),
             "Activity Date": formatted_date,
+            "Activity Timestamp": timestamp,
             "Activity Name": activity.get("name", ""),
             "Activity Type": activity.get("type", ""),
             "Activity Description": activity.get("description", "") or "",
-            "Activity Private Note": "",  # Not available in API summary
-            "Distance": str(activity.get("distance", "")),
-            "Moving Time": str(activity.get("moving_time", "")),
-            "Elapsed Time": str(activity.get("elapsed_time", "")),
-            "Average Heart Rate": str(activity.get("average_heartrate", "") or ""),
-            "Max Heart Rate": str(activity.get("max_heartrate", "") or ""),
-            "Average Temperature": "",  # Not available in API summary
-            "Apparent Temperature": "",  # Not available in API summary
-            "Activity Gear": "",  # API has gear_id, would need separate lookup
+            "Activity Private Note": activity.get("private_note", "") or "",  # Detailed only
+            # Numbers stay numbers; the parsers accept these as well as CSV strings
+            "Distance": activity.get("distance"),
+            "Moving Time": activity.get("moving_time"),
+            "Elapsed Time": activity.get("elapsed_time"),
+            "Average Heart Rate": activity.get("average_heartrate"),
+            "Max Heart Rate": activity.get("max_heartrate"),
+            "Average Temperature": activity.get("average_temp"),  # Detailed only
+            "Apparent Temperature": None,  # Not available in the API
+            "Activity Gear": gear_name,
         }
@@ -0,0 +1,191 @@
+"""Columnar, memory-mapped storage for per-second activity streams."""
+
+import json
+import os
+from typing import Dict, Optional
+
+import numpy as np
+
+# Encoding and storage dtype for each stream. "delta" columns are stored as a
+# base value plus the differences between consecutive values, in the narrowest
+# integer type that fits; "raw" columns are stored as-is and can be read
+# without copying.
+STREAM_SCHEMA = {
+    "time": ("delta", None),  # seconds since activity start
+    "distance": ("raw", "float32"),  # meters
+    "heartrate": ("raw", "uint8"),  # bpm, 0 when missing
+    "cadence": ("raw", "uint8"),  # rpm, 0 when missing
+    "altitude": ("raw", "float32"),  # meters, NaN when missing
+    "lat": ("delta", None),  # degrees * 1e7, MISSING_POSITION when missing
+    "lng": ("delta", None),  # degrees * 1e7, MISSING_POSITION when missing
+}
+
+MISSING_POSITION = np.iinfo(np.int32).min
+POSITION_SCALE = 1e7
+
+_ALIGNMENT = 8
+
+
+def _narrowest_int(values: np.ndarray) -> np.dtype:
+    if values.size == 0:
+        return np.dtype("int8")
+    lo, hi = int(values.min()), int(values.max())
+    for dtype in ("int8", "int16", "int32"):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return np.dtype(dtype)
+    return np.dtype("int64")
+
+
+def encode_positions(degrees: np.ndarray) -> np.ndarray:
+    """Convert latitude or longitude degrees (NaN when missing) to scaled ints."""
+    degrees = np.asarray(degrees, dtype=np.float64)
+    scaled = np.full(degrees.shape, MISSING_POSITION, dtype=np.int64)
+    valid = ~np.isnan(degrees)
+    scaled[valid] = np.rint(degrees[valid] * POSITION_SCALE)
+    return scaled
+
+
+def decode_positions(scaled: np.ndarray) -> np.ndarray:
+    """Inverse of encode_positions: scaled ints back to degrees, NaN when missing."""
+    degrees = scaled.astype(np.float64) / POSITION_SCALE
+    degrees[scaled == MISSING_POSITION] = np.nan
+    return degrees
+
+
+class StreamStore:
+    """Append-only store of activity streams keyed by Strava activity ID.
+
+    All column data lives in a single binary file that is memory-mapped for
+    reading, with a small JSON index describing where each column starts.
+    Raw columns are returned as zero-copy views into the mapping.
+    """
+
+    DATA_FILE = "streams.bin"
+    INDEX_FILE = "streams_index.json"
+
+    def __init__(self, directory: str):
+        """Open (or create) a stream store.
+
+        Args:
+            directory: Directory holding the data and index files
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.data_path = os.path.join(directory, self.DATA_FILE)
+        self.index_path = os.path.join(directory, self.INDEX_FILE)
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                self.index: Dict[str, Dict] = json.load(f)
+        else:
+            self.index = {}
+        self._mmap: Optional[np.memmap] = None
+
+    def __contains__(self, strava_id) -> bool:
+        return str(strava_id) in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def ids(self):
+        return self.index.keys()
+
+    def _data_size(self) -> int:
+        return os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+
+    def write(self, strava_id, streams: Dict[str, np.ndarray]):
+        """Append one activity's streams to the data file.
+
+        Call flush() to persist the index once a batch of writes is done.
+
+        Args:
+            strava_id: Strava activity ID
+            streams: Mapping of stream name (see STREAM_SCHEMA) to a 1-D array;
+                lat/lng are given in degrees, everything else in schema units
+        """
+        columns = {}
+        length = None
+        offset = self._data_size()
+        with open(self.data_path, "ab") as f:
+            for name, values in streams.items():
+                if name not in STREAM_SCHEMA:
+                    raise ValueError(f"Unknown stream: {name}")
+                encoding, dtype = STREAM_SCHEMA[name]
+                values = np.asarray(values)
+                if length is None:
+                    length = len(values)
+                elif len(values) != length:
+                    raise ValueError(f"Stream {name} has {len(values)} samples, expected {length}")
+
+                if name in ("lat", "lng"):
+                    values = encode_positions(values)
+                column = {"encoding": encoding}
+                if encoding == "delta":
+                    values = values.astype(np.int64)
+                    base = int(values[0]) if len(values) else 0
+                    deltas = np.diff(values, prepend=np.int64(base))
+                    data = deltas.astype(_narrowest_int(deltas))
+                    column["base"] = base
+                else:
+                    data = values.astype(dtype)
+
+                padding = -offset % _ALIGNMENT
+                f.write(b"\0" * padding)
+                offset += padding
+                f.write(data.tobytes())
+                columns[name] = {**column, "offset": offset, "dtype": data.dtype.str}
+                offset += data.nbytes
+
+        self.index[str(strava_id)] = {"length": length or 0, "columns": columns}
+        self._mmap = None
+
+    def flush(self):
+        """Persist the index."""
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _mapping(self) -> np.memmap:
+        if self._mmap is None:
+            self._mmap = np.memmap(self.data_path, dtype=np.uint8, mode="r")
+        return self._mmap
+
+    def column(self, strava_id, name: str) -> Optional[np.ndarray]:
+        """Read a single stream of an activity.
+
+        Args:
+            strava_id: Strava activity ID
+            name: Stream name
+
+        Returns:
+            The decoded stream (lat/lng in degrees), or None if the activity
+            has no such stream
+        """
+        entry = self.index.get(str(strava_id))
+        if entry is None or name not in entry["columns"]:
+            return None
+        col = entry["columns"][name]
+        dtype = np.dtype(col["dtype"])
+        start = col["offset"]
+        values = self._mapping()[start : start + entry["length"] * dtype.itemsize].view(dtype)
+        if col["encoding"] == "delta":
+            values = np.cumsum(values, dtype=np.int64) + col["base"]
+        if name in ("lat", "lng"):
+            values = decode_positions(values)
+        return values
+
+    def read(self, strava_id) -> Optional[Dict[str, np.ndarray]]:
+        """Read all streams of an activity.
+
+        Args:
+            strava_id: Strava activity ID
+
+        Returns:
+            Mapping of stream name to array, or None if the activity is not stored
+        """
+        entry = self.index.get(str(strava_id))
+        if entry is None:
+            return None
+        return {name: self.column(strava_id, name) for name in entry["columns"]}
@@ -0,0 +1,131 @@
+"""Deterministic synthetic activities shaped like Strava API responses and bulk-export CSV rows.
+
+The same seed always produces the same activities, so benchmark runs compare
+like with like. The mix of types, titles, notes and gear roughly follows a
+real training history: mostly runs, some rides, rows and elliptical sessions,
+and a few activity types that no parser tracks.
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+# (Strava type, weight)
+ACTIVITY_TYPES = (
+    ("Run", 70),
+    ("Ride", 10),
+    ("Workout", 8),
+    ("Elliptical", 5),
+    ("Walk", 4),
+    ("WeightTraining", 3),
+)
+
+RUN_TITLES = ("Morning Run", "Afternoon Run", "Evening Run", "Easy run", "Long run", "Tempo workout", "Race")
+WORKOUT_TITLES = ("Erg", "Row intervals", "Evening Workout", "Core")
+OTHER_TITLES = ("Morning Ride", "Commute", "Elliptical", "Walk", "Lift")
+DESCRIPTIONS = ("", "", "", "felt good", "legs heavy", "6x(800m @ 5k pace, 2 min jog)", "4x4 min strides")
+PRIVATE_NOTES = ("", "", "", "", "left calf tight")
+
+GEAR = {
+    "g1001": "Nike Pegasus 40",
+    "g1002": "ASICS Novablast 4",
+    "g1003": "Saucony Endorphin Speed 3",
+    "b2001": "Trek Domane",
+}
+SHOES = ("g1001", "g1002", "g1003")
+
+FIRST_ID = 10_000_000_000
+START = datetime(2015, 1, 1, 6, 0, 0)
+
+
+def _activity_type(rng: random.Random) -> str:
+    types, weights = zip(*ACTIVITY_TYPES)
+    return rng.choices(types, weights)[0]
+
+
+def _title(rng: random.Random, activity_type: str) -> str:
+    if activity_type == "Run":
+        return rng.choice(RUN_TITLES)
+    if activity_type == "Workout":
+        return rng.choice(WORKOUT_TITLES)
+    return rng.choice(OTHER_TITLES)
+
+
+def iter_api_activities(count: int, seed: int = 0) -> Iterator[Dict]:
+    """Yield detailed-activity dictionaries as returned by /activities/{id}, oldest first.
+
+    Args:
+        count: Number of activities
+        seed: Random seed; the same seed gives the same activities
+
+    Yields:
+        Activity dictionaries in Strava API format
+    """
+    rng = random.Random(seed)
+    start = START
+    for i in range(count):
+        # Roughly one or two activities a day
+        start += timedelta(seconds=rng.randint(4 * 3600, 30 * 3600))
+        activity_type = _activity_type(rng)
+        moving_time = rng.randint(900, 7200)
+        distance = round(moving_time * rng.uniform(2.2, 4.5), 1) if activity_type in ("Run", "Ride", "Walk") else 0.0
+        gear_id = rng.choice(SHOES) if activity_type in ("Run", "Walk") else ("b2001" if activity_type == "Ride" else None)
+        utc = start + timedelta(hours=5)
+        activity = {
+            "id": FIRST_ID + i,
+            "name": _title(rng, activity_type),
+            "type": activity_type,
+            "start_date": utc.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "start_date_local": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "distance": distance,
+            "moving_time": moving_time,
+            "elapsed_time": moving_time + rng.randint(0, 600),
+            "description": rng.choice(DESCRIPTIONS),
+            "private_note": rng.choice(PRIVATE_NOTES),
+            "gear_id": gear_id,
+        }
+        if rng.random() < 0.9:
+            activity["average_heartrate"] = round(rng.uniform(120, 175), 1)
+            activity["max_heartrate"] = activity["average_heartrate"] + rng.randint(5, 25)
+        if rng.random() < 0.5:
+            activity["average_temp"] = rng.randint(-10, 32)
+        yield activity
+
+
+def api_activities(count: int, seed: int = 0) -> List[Dict]:
+    """List of count synthetic API activities, oldest first (see iter_api_activities)."""
+    return list(iter_api_activities(count, seed))
+
+
+def _csv_number(value) -> str:
+    return "" if value is None else str(value)
+
+
+def csv_row(activity: Dict) -> Dict[str, str]:
+    """Bulk-export CSV row (parser columns only) for a synthetic API activity.
+
+    Every value is a string, as csv.reader produces, and the date is UTC as in
+    the export.
+    """
+    utc = datetime.strptime(activity["start_date"], "%Y-%m-%dT%H:%M:%SZ")
+    return {
+        "Activity ID": str(activity["id"]),
+        "Activity Date": utc.strftime("%b %d, %Y, %I:%M:%S %p"),
+        "Activity Name": activity["name"],
+        "Activity Type": activity["type"],
+        "Activity Description": activity["description"],
+        "Activity Private Note": activity["private_note"],
+        "Distance": _csv_number(activity["distance"]),
+        "Moving Time": _csv_number(activity["moving_time"]),
+        "Elapsed Time": _csv_number(activity["elapsed_time"]),
+        "Average Heart Rate": _csv_number(activity.get("average_heartrate")),
+        "Max Heart Rate": _csv_number(activity.get("max_heartrate")),
+        "Average Temperature": _csv_number(activity.get("average_temp")),
+        "Apparent Temperature": "",
+        "Activity Gear": GEAR.get(activity["gear_id"], ""),
+    }
+
+
+def csv_rows(count: int, seed: int = 0) -> List[Dict[str, str]]:
+    """List of count synthetic CSV rows, oldest first, matching api_activities(count, seed)."""
+    return [csv_row(activity) for activity in iter_api_activities(count, seed)]
@@ -1,21 +1,144 @@
+import os
 import pytz
-from datetime import datetime
-from typing import Dict, Any
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, Any, List, Optional, TypeVar, Union
 
+from .metrics import METRICS
 
-def contains_keywords(text: str, keywords: list[str]) -> bool:
-    for keyword in keywords:
-        if keyword in text:
-            return True
-    return False
+# Converting a CSV date string runs once per row, so it is timed by sampling
+_PARSE_DATE = METRICS.sampled_span("parse_date")
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+DATE_FORMAT = "%b %d, %Y, %I:%M:%S %p"
+DISPLAY_TIMEZONE = pytz.timezone("US/Eastern")
+
+_MONTHS = {
+    month: i + 1
+    for i, month in enumerate(
+        ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+    )
+}
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+
+
+def parse_timestamp(time: str) -> int:
+    """Convert a UTC date in CSV format ("Sep 14, 2025, 02:23:26 AM") to epoch seconds.
+
+    This is called once per activity at ingest, so the common format is split
+    by hand rather than going through strptime.
+    """
+    try:
+        month_day, year, clock = time.split(", ")
+        month, day = month_day.split(" ")
+        hms, meridiem = clock.split(" ")
+        hour, minute, second = hms.split(":")
+        hour = int(hour) % 12 + (12 if meridiem == "PM" else 0)
+        days = datetime(int(year), _MONTHS[month], int(day)).toordinal() - _EPOCH_ORDINAL
+        return days * 86400 + hour * 3600 + int(minute) * 60 + int(second)
+    except (ValueError, KeyError):
+        # Anything unusual goes through strptime, which raises on invalid dates
+        dt = datetime.strptime(time, DATE_FORMAT)
+        return int((dt - _EPOCH).total_seconds())
+
+
+def parse_display_timestamp(date: str) -> int:
+    """Convert a display date (US/Eastern, as stored in processed activities) to epoch seconds."""
+    dt = DISPLAY_TIMEZONE.localize(datetime.strptime(date, DATE_FORMAT))
+    return int(dt.timestamp())
+
+
+@lru_cache(maxsize=None)
+def _display_offset(hour: int) -> int:
+    # DST transitions happen on the hour, so the offset is constant within a UTC hour
+    dt = datetime.fromtimestamp(hour * 3600, tz=DISPLAY_TIMEZONE)
+    return int(dt.utcoffset().total_seconds())
+
+
+def format_date(timestamp: int) -> str:
+    """Format epoch seconds as a US/Eastern display date ("Sep 13, 2025, 10:23:26 PM").
+
+    Timestamps are unique per activity, so only the UTC offset is memoized.
+    """
+    local = timestamp + _display_offset(timestamp // 3600)
+    return (_EPOCH + timedelta(seconds=local)).strftime(DATE_FORMAT)
 
 
 def parse_date(time: str) -> str:
-    date_format = "%b %d, %Y, %I:%M:%S %p"
-    dt_naive = datetime.strptime(time, date_format)
-    dt_aware = dt_naive.replace(tzinfo=pytz.UTC)
-    dt_pst = dt_aware.astimezone(pytz.timezone("US/Eastern"))
-    return dt_pst.strftime(date_format)
+    return format_date(parse_timestamp(time))
+
+
+def activity_timestamp(activity: Dict[str, Any]) -> int:
+    """Epoch seconds of an activity in CSV format.
+
+    API activities carry a precomputed "Activity Timestamp"; CSV rows only have
+    the date string, which is parsed here.
+    """
+    timestamp = activity.get("Activity Timestamp")
+    if timestamp is not None:
+        return timestamp
+    with _PARSE_DATE.time():
+        return parse_timestamp(activity["Activity Date"])
+
+
+# Numeric fields of processed activity data (older records store them as strings)
+NUMERIC_FIELDS = (
+    "distance",
+    "moving_time",
+    "elapsed_time",
+    "temperature",
+    "feels_like",
+    "average_heartrate",
+    "average_heart_rate",
+    "max_heart_rate",
+)
+
+
+def parse_number(value: Any) -> Optional[Union[int, float]]:
+    """Convert a CSV string or API value to a number.
+
+    Whole numbers become ints ("2332.0" -> 2332) so the export stays compact.
+
+    Args:
+        value: String from the bulk export, number from the API, or None
+
+    Returns:
+        The number, or None for empty and missing values
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+
+def typed_numbers(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a processed record with its numeric data fields as numbers.
+
+    Values that are not numbers (e.g. "?") are left alone.
+    """
+    data = record.get("data")
+    if not isinstance(data, dict):
+        return record
+    typed = dict(data)
+    for field in NUMERIC_FIELDS:
+        if field in typed and not isinstance(typed[field], (int, float)):
+            try:
+                typed[field] = parse_number(typed[field])
+            except ValueError:
+                pass
+    return {**record, "data": typed}
 
 
 def extract_common_data(activity: Dict[str, Any]) -> Dict[str, Any]:
@@ -31,3 +154,53 @@ def extract_common_data(activity: Dict[str, Any]) -> Dict[str, Any]:
         "strava_id": int(activity["Activity ID"]),
         "title": activity["Activity Name"],
     }
+
+
+def _map_chunk(func: Callable[[T], R], chunk: List[T]) -> List[R]:
+    return [func(item) for item in chunk]
+
+
+def parallel_map(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    workers: Optional[int] = None,
+    chunksize: int = 64,
+    initializer: Optional[Callable[[], None]] = None,
+) -> Iterator[R]:
+    """Lazily map a function over items across a process pool, preserving order.
+
+    Unlike ProcessPoolExecutor.map, the input is consumed incrementally: only a
+    couple of chunks per worker are in flight at once, so memory stays bounded
+    no matter how long the input stream is.
+
+    Args:
+        func: Picklable (module-level) function to apply
+        items: Input iterable, consumed lazily
+        workers: Number of worker processes (default: CPU count)
+        chunksize: Number of items sent to a worker per task
+        initializer: Called once in each worker process before it takes work
+            (optional); not called when mapping inline
+
+    Yields:
+        func(item) for each item, in input order
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from map(func, items)
+        return
+
+    max_pending = 2 * workers
+    iterator = iter(items)
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as pool:
+        pending = deque()
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                chunk = list(islice(iterator, chunksize))
+                if not chunk:
+                    exhausted = True
+                    break
+                pending.append(pool.submit(_map_chunk, func, chunk))
+            if not pending:
+                break
+            yield from pending.popleft().result()
@@ -0,0 +1,35 @@
+import struct
+
+import pytest
+
+from import_strava.activity_files import decode_fit
+
+
+def _fit(records: bytes) -> bytes:
+    return struct.pack("<BBHI4s", 12, 0x10, 2100, len(records), b".FIT") + records + b"\0\0"
+
+
+# Local type 0: record message with a timestamp and heart rate
+RECORD_DEFINITION = bytes([0x40, 0, 0]) + struct.pack("<HB", 20, 2) + bytes([253, 4, 0x86, 3, 1, 2])
+
+
+def test_decodes_records():
+    # The second record uses a compressed timestamp header (offset 9 -> t=1001)
+    compressed = bytes([0x89]) + struct.pack("<IB", 0xFFFFFFFF, 160)
+    data = _fit(RECORD_DEFINITION + b"\0" + struct.pack("<IB", 1000, 150) + compressed)
+    streams = decode_fit(data)
+    assert list(streams["time"]) == [0, 1]
+    assert list(streams["heartrate"]) == [150, 160]
+
+
+@pytest.mark.parametrize("header", [0x01, 0xA0])
+def test_undefined_local_type_is_rejected(header):
+    data = _fit(RECORD_DEFINITION + bytes([header]) + struct.pack("<IB", 1000, 150))
+    with pytest.raises(ValueError, match="undefined local type"):
+        decode_fit(data)
+
+
+def test_truncated_file_is_rejected():
+    data = _fit(RECORD_DEFINITION + b"\0" + struct.pack("<IB", 1000, 150))
+    with pytest.raises(ValueError, match="truncated"):
+        decode_fit(data[:-4])
@@ -0,0 +1,49 @@
+import json
+import os
+
+import pytest
+
+from import_strava.columnar import COLUMNAR_VERSION, from_columns, to_columns
+
+EXPORT_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", "front", "src", "data", "strava_export.json"
+)
+
+
+def round_trip(records):
+    # Through JSON, as the front reads it
+    return from_columns(json.loads(json.dumps(to_columns(records))))
+
+
+def test_null_and_missing_fields_round_trip():
+    records = [
+        {"version": 2, "type": "run", "data": {"title": "Track", "intervals": None, "temperature": 4}},
+        {"version": 2, "type": "run", "data": {"title": "Easy"}},
+        {"type": "bike", "note": None, "data": {"title": "Easy", "temperature": None}},
+    ]
+    assert round_trip(records) == records
+
+
+def test_absent_fields_are_stored_as_ranges():
+    records = [{"data": {"a": 1}}, {"data": {}}, {"data": {}}, {"data": {"a": None}}, {"data": {}}]
+    payload = to_columns(records)
+    assert payload["absent"]["data"] == {"a": [[1, 3], [4, 5]]}
+
+
+def test_strings_are_interned():
+    records = [{"type": "run", "data": {"shoe": "Novablast 4"}} for _ in range(3)]
+    payload = to_columns(records)
+    assert payload["dictionaries"]["shoe"] == ["Novablast 4"]
+    assert payload["data"]["shoe"] == [0, 0, 0]
+
+
+def test_unknown_version_is_rejected():
+    with pytest.raises(ValueError):
+        from_columns({"version": COLUMNAR_VERSION + 1})
+
+
+@pytest.mark.skipif(not os.path.exists(EXPORT_PATH), reason="no site export")
+def test_real_export_round_trips():
+    with open(EXPORT_PATH) as f:
+        records = json.load(f)
+    assert round_trip(records) == records